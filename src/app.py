@@ -53,6 +53,14 @@ def main():
                 "Cache cleared. RAG Service will reload on next query."
             )
 
+        decoding = st.selectbox(
+            "Decoding",
+            ["default"] + list(Config.DECODING_PROFILES),
+            help="Beam search is slower (beam-5 is ~5x greedy decode "
+            "compute) and streams greedily.",
+        )
+        decoding_profile = None if decoding == "default" else decoding
+
         st.divider()
         st.subheader("Evaluation Pipeline")
         if st.button("Run Evaluation"):
@@ -84,21 +92,38 @@ def main():
     )
 
     if user_query:
-        with st.spinner("Processing query..."):
-            start_time = time.time()
-            result = rag_service.answer_question_with_details(user_query)
-            total_latency = time.time() - start_time
+        start_time = time.time()
+        answer_placeholder = st.empty()
+        answer_text = ""
+        result = None
+
+        # Tokens are rendered as they are generated
+        with st.spinner("Retrieving context..."):
+            events = rag_service.stream_answer_with_details(
+                user_query, decoding_profile=decoding_profile
+            )
+            next(events)  # Retrieval done
+        for event in events:
+            if event["event"] == "token":
+                answer_text += event["text"]
+                answer_placeholder.markdown(f"**Answer:** {answer_text}▌")
+            elif event["event"] == "done":
+                result = event
+        total_latency = time.time() - start_time
 
         # Display Answer
-        st.success(f"**Answer:** {result['answer']}")
+        answer_placeholder.success(f"**Answer:** {result['answer']}")
 
         # Latency breakdown
         timing = result.get("timing", {})
-        col1, col2, col3, col4 = st.columns(4)
+        col1, col2, col3, col4, col5 = st.columns(5)
         col1.metric("Total", f"{total_latency:.2f}s")
-        col2.metric("Dense", f"{timing.get('dense_ms', 0):.0f}ms")
-        col3.metric("Sparse", f"{timing.get('sparse_ms', 0):.0f}ms")
-        col4.metric("Generation", f"{result.get('generation_ms', 0):.0f}ms")
+        col2.metric(
+            "First Token", f"{result.get('time_to_first_token_ms', 0):.0f}ms"
+        )
+        col3.metric("Dense", f"{timing.get('dense_ms', 0):.0f}ms")
+        col4.metric("Sparse", f"{timing.get('sparse_ms', 0):.0f}ms")
+        col5.metric("Generation", f"{result.get('generation_ms', 0):.0f}ms")
 
         # Display Retrieved Context with individual scores
         with st.expander("🔍 Retrieved Context (Hybrid RRF)", expanded=True):
@@ -25,7 +25,16 @@ class Config:
     DATA_DIR = DATA_DIR
     FIXED_URLS_PATH = DATA_DIR / "fixed_urls.json"
     CORPUS_PATH = DATA_DIR / "corpus.json"
+    # Binary corpus (metadata arrays + block-compressed text); preferred
+    # over corpus.json once it exists
+    CORPUS_STORE_PATH = DATA_DIR / "corpus_store"
     VECTOR_DB_PATH = DATA_DIR / "vector_index.faiss"
+    VECTOR_META_PATH = DATA_DIR / "vector_index.json"
+    VECTOR_IDS_PATH = DATA_DIR / "vector_index.ids.json"
+    VECTOR_EMBEDDINGS_PATH = DATA_DIR / "vector_embeddings.npy"
+    BM25_INDEX_PATH = DATA_DIR / "bm25_index"  # Directory of .npy arrays
+    # Generator token ids of every chunk (directory of .npy arrays)
+    CHUNK_TOKENS_PATH = DATA_DIR / "chunk_tokens"
 
     # Models
     EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
@@ -34,13 +43,128 @@ class Config:
     # GENERATION_MODEL = "gpt2"
     GENERATION_MODEL = "google/flan-t5-base"  # M4 handles this perfectly
 
+    # Generator inference precision: "fp32", "int8" (dynamic quantization
+    # of Linear layers, CPU only) or "bf16" (falls back to fp32 when the
+    # device has no native bf16 support)
+    GENERATION_PRECISION = "fp32"
+
+    # Named decoding profiles (model.generate arguments), selectable per
+    # request; a profile's max_new_tokens caps the requested length.
+    # DECODING_PROFILE None keeps the model default: "beam-5" for T5,
+    # "sample" for GPT-2. Beam search costs roughly num_beams x the decode
+    # compute of greedy; compare profiles with
+    # python -m src.evaluation.decoding_benchmark
+    DECODING_PROFILES = {
+        "greedy": {"num_beams": 1, "do_sample": False},
+        "beam-2": {"num_beams": 2, "early_stopping": True},
+        "beam-5": {"num_beams": 5, "early_stopping": True},
+        "contrastive": {"penalty_alpha": 0.6, "top_k": 4},
+        "length-capped": {
+            "num_beams": 1,
+            "do_sample": False,
+            "max_new_tokens": 48,
+        },
+        "sample": {"do_sample": True, "top_k": 50, "top_p": 0.95},
+        "assisted": {"num_beams": 1, "do_sample": False, "assisted": True},
+    }
+    DECODING_PROFILE = None
+    # "assisted" profile: ASSISTANT_MODEL (same tokenizer, smaller) drafts
+    # tokens that the generator verifies in one forward pass; the output
+    # equals greedy decoding of the generator. Benchmark acceptance rate
+    # and speedup with python -m src.evaluation.assisted_benchmark
+    ASSISTANT_MODEL = "google/flan-t5-small"
+
+    # Inference backend for the encoder and generator: "torch", or "onnx"
+    # to run exports from ONNX_DIR on ONNX Runtime (python -m
+    # src.onnx_backend; falls back to torch when no export exists).
+    # ONNX_INT8 uses the int8 dynamically quantized export, built for
+    # ONNX_QUANTIZATION_ARCH ("avx512_vnni", "avx512", "avx2", "arm64")
+    INFERENCE_BACKEND = "torch"
+    ONNX_DIR = DATA_DIR / "onnx"
+    ONNX_INT8 = False
+    ONNX_QUANTIZATION_ARCH = "avx512_vnni"
+
     # Legacy LLM name for backward compatibility
     LLM_MODEL_NAME = "google/flan-t5-base"
 
+    # Dense Index Type: "flat" (exact), "ivf" (IVF-Flat), "hnsw" (HNSW-Flat)
+    # or a compressed variant: "sq8" (8-bit scalar), "fp16", "ivf_pq"
+    # The type used at build time is persisted in VECTOR_META_PATH
+    VECTOR_INDEX_TYPE = "flat"
+    IVF_NLIST = 256  # Coarse centroids (capped for small corpora)
+    IVF_NPROBE = 16  # Lists scanned per query
+    HNSW_M = 32  # Graph neighbours per node
+    HNSW_EF_CONSTRUCTION = 200
+    HNSW_EF_SEARCH = 64  # Candidate queue size per query
+    PQ_M = 48  # Sub-quantizers for IVF-PQ (must divide embedding dimension)
+    PQ_NBITS = 8  # Bits per sub-quantizer code
+
+    # Exact re-scoring for compressed indexes: fetch k * RESCORE_FACTOR
+    # candidates, then re-rank them against the float32 embeddings on disk
+    VECTOR_RESCORE = True
+    RESCORE_FACTOR = 4
+
+    # Memory-map index artifacts on load: near-constant startup time and
+    # physical pages shared by all worker processes on a host
+    INDEX_MMAP = True
+
+    # Binary corpus text compression ("zlib" or None) and rows per block;
+    # reading one chunk decompresses only its block
+    CORPUS_COMPRESSION = "zlib"
+    CORPUS_BLOCK_ROWS = 64
+
+    # Query embedding cache: in-memory LRU plus optional SQLite store
+    QUERY_CACHE_SIZE = 4096
+    QUERY_CACHE_PATH = DATA_DIR / "query_embeddings.sqlite"  # None = RAM only
+
+    # Chunk embeddings keyed by content hash + model, reused across rebuilds
+    CHUNK_EMBEDDING_CACHE_PATH = DATA_DIR / "chunk_embeddings.sqlite"
+
+    # Final retrieval results of repeat queries (0 = disabled); entries are
+    # keyed by index version, so rebuilds invalidate them
+    RESULT_CACHE_SIZE = 1024
+    RESULT_CACHE_TTL_SECONDS = 3600  # None = until evicted
+
+    # Semantic answer cache: reuse a full RAG answer when a new query's
+    # embedding is this cosine-similar to a recent one (size 0 = disabled)
+    ANSWER_CACHE_SIZE = 512
+    ANSWER_CACHE_THRESHOLD = 0.95
+
     # Retrieval Parameters
     RRF_K = 60
     TOP_N_RETRIEVAL = 10
-    MAX_CONTEXT_CHARS = 2000
+    MAX_CONTEXT_CHARS = 2000  # Text prompts (construct_prompt) only
+    # Generation prompts are assembled from pre-tokenized chunks up to this
+    # many tokens (further capped by the generator's context window); a
+    # chunk that doesn't fit whole is truncated if at least
+    # MIN_PARTIAL_CHUNK_TOKENS of it fit
+    MAX_PROMPT_TOKENS = 512
+    MIN_PARTIAL_CHUNK_TOKENS = 32
+    # Token ids of chunks tokenized after the cache was built (new chunks,
+    # merged spans) are kept for at most this many chunks (LRU)
+    TOKEN_CACHE_EXTRA_SIZE = 4096
+    # Merge overlapping/adjacent retrieved chunks of one article into a
+    # single span (and drop duplicates) before building the prompt
+    CONSOLIDATE_CONTEXT = True
+    # Optionally keep only the retrieved sentences most similar to the
+    # query (MiniLM), up to COMPRESSION_MAX_TOKENS generator tokens;
+    # sentence embeddings of COMPRESSION_CACHE_SIZE chunks stay cached
+    COMPRESS_CONTEXT = False
+    COMPRESSION_MAX_TOKENS = 256
+    COMPRESSION_CACHE_SIZE = 2048
+    # Threads running retrieval legs, shared by all concurrent requests
+    # (sync calls run the sparse leg on the calling thread)
+    RETRIEVAL_WORKERS = 4
+    # Async API: concurrent generate() calls sharing the loaded model, and
+    # the default per-call timeout in seconds (None = no limit)
+    GENERATION_WORKERS = 1
+    ASYNC_TIMEOUT_SECONDS = None
+    # Batched generation: max prompts and max padded input tokens per
+    # model.generate call
+    GENERATION_BATCH_SIZE = 16
+    GENERATION_TOKEN_BUDGET = 8192
+    # Questions answered per batch by evaluation runs
+    EVAL_BATCH_SIZE = 16
 
     # RRF Weights - Dense (semantic) vs Sparse (keyword)
     # Balanced weights work better when Q&A comes from fixed URLs
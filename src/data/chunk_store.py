@@ -0,0 +1,519 @@
+"""
+Columnar chunk store.
+
+Holds the corpus once per process as flat arrays instead of a list of
+dicts: chunk ids as a fixed-width byte array, URLs and titles interned
+into small string tables addressed by integer codes, and all chunk text
+in a single UTF-8 blob sliced by offsets. Indexes and the RAG service
+share one store and address chunks by integer row; dicts are only
+materialized for the results that are actually returned.
+
+On disk (Config.CORPUS_STORE_PATH) the store is a directory of .npy
+metadata arrays, a JSON string table and ``content.bin``, the chunk text
+zlib-compressed in blocks of CORPUS_BLOCK_ROWS rows. Everything is
+memory-mapped on load; reading one chunk decompresses only its block, so
+startup doesn't parse or inflate the corpus.
+"""
+
+import json
+import sys
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../.."))
+from src.config import Config
+
+STORE_ARRAYS = (
+    "chunk_ids",
+    "url_codes",
+    "title_codes",
+    "token_counts",
+    "start_tokens",
+    "content_offsets",
+    "block_offsets",
+)
+BLOCK_CACHE_SIZE = 32  # Decompressed blocks kept per store
+
+
+def _intern(
+    values: List[str], table: List[str], codes: Dict[str, int]
+) -> np.ndarray:
+    """Returns codes for values, adding unseen strings to the table."""
+    result = np.empty(len(values), dtype=np.int32)
+    for i, value in enumerate(values):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(table)
+            table.append(value)
+        result[i] = code
+    return result
+
+
+class ChunkStore:
+    """
+    Corpus chunks addressed by row.
+
+    Row ``r`` has id ``chunk_ids[r]``, URL ``urls[url_codes[r]]``, title
+    ``titles[title_codes[r]]`` and text
+    ``content[content_offsets[r]:content_offsets[r + 1]]`` (UTF-8). The
+    chunk covers words ``[start_tokens[r], start_tokens[r] +
+    token_counts[r])`` of its document (start -1 when unknown).
+
+    When loaded from a compressed binary store, ``content`` holds the
+    compressed blocks instead: block ``b`` covers rows
+    ``[b * block_rows, (b + 1) * block_rows)`` and is stored at
+    ``content[block_offsets[b]:block_offsets[b + 1]]``. Offsets still
+    index the uncompressed text.
+    """
+
+    def __init__(self):
+        self.chunk_ids = np.zeros(0, dtype="S1")
+        self.urls: List[str] = []
+        self.url_codes = np.zeros(0, dtype=np.int32)
+        self.titles: List[str] = []
+        self.title_codes = np.zeros(0, dtype=np.int32)
+        self.token_counts = np.zeros(0, dtype=np.int32)
+        self.start_tokens = np.zeros(0, dtype=np.int32)
+        self.content = b""
+        self.content_offsets = np.zeros(1, dtype=np.int64)
+        self.compression = None
+        self.block_rows = 0
+        self.block_offsets = np.zeros(1, dtype=np.int64)
+
+        self._url_lookup: Dict[str, int] = {}
+        self._title_lookup: Dict[str, int] = {}
+        self._id_order = None  # argsort of chunk_ids, built on demand
+        self._blocks: "OrderedDict[int, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.chunk_ids)
+
+    @classmethod
+    def from_chunks(cls, chunks: List[Dict]) -> "ChunkStore":
+        """Builds a store from chunk dicts (as produced by the Chunker)."""
+        store = cls()
+        store.extend(chunks)
+        return store
+
+    def load(self, path: Optional[Path] = None) -> "ChunkStore":
+        """
+        Replaces the contents of this store with the corpus at path.
+
+        Loads in place, so indexes already holding this store see the new
+        corpus.
+
+        Args:
+            path: Binary store directory or corpus JSON file. Defaults to
+                Config.CORPUS_STORE_PATH, falling back to reading
+                Config.CORPUS_PATH (nothing is written; convert it once
+                with convert_corpus()).
+        """
+        if path is None:
+            if (Config.CORPUS_STORE_PATH / "store.json").exists():
+                return self._read_binary(Config.CORPUS_STORE_PATH)
+            print(
+                f"No binary store at {Config.CORPUS_STORE_PATH}; reading "
+                f"{Config.CORPUS_PATH} (run python src/data/chunk_store.py "
+                f"to convert it for faster loads)."
+            )
+            return self.load(Config.CORPUS_PATH)
+        path = Path(path)
+
+        if path.is_dir():
+            return self._read_binary(path)
+        if not path.exists():
+            raise FileNotFoundError(f"Corpus not found at {path}")
+
+        with open(path, "r") as f:
+            chunks = json.load(f)
+        self.__init__()
+        self.extend(chunks)
+        return self
+
+    def save(self, path: Optional[Path] = None):
+        """
+        Writes the store in the binary format.
+
+        Files are written aside and renamed into place, so processes that
+        still map the old store keep a consistent view.
+
+        Args:
+            path: Store directory (default Config.CORPUS_STORE_PATH).
+        """
+        directory = Path(path or Config.CORPUS_STORE_PATH)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        content = self._content_bytes()
+        compression = Config.CORPUS_COMPRESSION
+        block_rows = Config.CORPUS_BLOCK_ROWS if compression else 0
+        if compression == "zlib":
+            blocks = [
+                zlib.compress(
+                    content[
+                        self.content_offsets[start] : self.content_offsets[
+                            min(start + block_rows, len(self))
+                        ]
+                    ]
+                )
+                for start in range(0, len(self), block_rows)
+            ]
+            blob = b"".join(blocks)
+            block_offsets = np.concatenate(
+                ([0], np.cumsum([len(block) for block in blocks]))
+            ).astype(np.int64)
+        elif compression is None:
+            blob = content
+            block_offsets = np.array([0, len(blob)], dtype=np.int64)
+        else:
+            raise ValueError(f"Unknown corpus compression '{compression}'")
+
+        arrays = {
+            "chunk_ids": self.chunk_ids,
+            "url_codes": self.url_codes,
+            "title_codes": self.title_codes,
+            "token_counts": self.token_counts,
+            "start_tokens": self.start_tokens,
+            "content_offsets": self.content_offsets,
+            "block_offsets": block_offsets,
+        }
+        for name in STORE_ARRAYS:
+            tmp_path = directory / f".{name}.npy"
+            np.save(tmp_path, arrays[name])
+            os.replace(tmp_path, directory / f"{name}.npy")
+
+        tmp_path = directory / ".content.bin"
+        with open(tmp_path, "wb") as f:
+            f.write(blob)
+        os.replace(tmp_path, directory / "content.bin")
+
+        with open(directory / "strings.json", "w") as f:
+            json.dump({"urls": self.urls, "titles": self.titles}, f)
+        # Header goes last: its presence marks a complete store
+        with open(directory / "store.json", "w") as f:
+            json.dump(
+                {
+                    "num_chunks": len(self),
+                    "compression": compression,
+                    "block_rows": block_rows,
+                },
+                f,
+                indent=2,
+            )
+
+    def export_json(self, path: Path = Config.CORPUS_PATH):
+        """Writes the store as a corpus JSON file (list of chunk dicts)."""
+        with open(path, "w") as f:
+            json.dump(self.get_many(range(len(self))), f, indent=2)
+
+    def _read_binary(self, directory: Path) -> "ChunkStore":
+        """Maps a store written by save(); no chunk text is read yet."""
+        with open(directory / "store.json", "r") as f:
+            header = json.load(f)
+        with open(directory / "strings.json", "r") as f:
+            strings = json.load(f)
+
+        self.__init__()
+        mmap_mode = "r" if Config.INDEX_MMAP else None
+        for name in STORE_ARRAYS:
+            array_path = directory / f"{name}.npy"
+            if name == "start_tokens" and not array_path.exists():
+                # Stores written before chunk positions were recorded
+                self.start_tokens = np.full(
+                    header["num_chunks"], -1, dtype=np.int32
+                )
+                continue
+            setattr(self, name, np.load(array_path, mmap_mode=mmap_mode))
+        self.urls = strings["urls"]
+        self.titles = strings["titles"]
+        self._url_lookup = {url: i for i, url in enumerate(self.urls)}
+        self._title_lookup = {t: i for i, t in enumerate(self.titles)}
+        self.compression = header["compression"]
+        self.block_rows = header["block_rows"]
+
+        content_path = directory / "content.bin"
+        if not content_path.stat().st_size:
+            self.content = b""
+        elif mmap_mode:
+            self.content = np.memmap(content_path, dtype=np.uint8, mode="r")
+        else:
+            self.content = content_path.read_bytes()
+        return self
+
+    def _block(self, block: int) -> bytes:
+        """Decompressed text of one block, via a small LRU."""
+        with self._lock:
+            data = self._blocks.get(block)
+            if data is not None:
+                self._blocks.move_to_end(block)
+                return data
+
+        start, end = self.block_offsets[block], self.block_offsets[block + 1]
+        data = zlib.decompress(self.content[start:end])
+
+        with self._lock:
+            self._blocks[block] = data
+            while len(self._blocks) > BLOCK_CACHE_SIZE:
+                self._blocks.popitem(last=False)
+        return data
+
+    def _content_bytes(self) -> bytes:
+        """All chunk text as one uncompressed UTF-8 blob."""
+        if self.compression:
+            num_blocks = len(self.block_offsets) - 1
+            return b"".join(
+                zlib.decompress(
+                    self.content[
+                        self.block_offsets[b] : self.block_offsets[b + 1]
+                    ]
+                )
+                for b in range(num_blocks)
+            )
+        return bytes(self.content)
+
+    def _make_mutable(self):
+        """Inflates mapped or compressed text before the store is edited."""
+        if self.compression or not isinstance(self.content, bytes):
+            self.content = self._content_bytes()
+            self.compression = None
+            self.block_rows = 0
+            self.block_offsets = np.array(
+                [0, len(self.content)], dtype=np.int64
+            )
+            self._blocks.clear()
+
+    def extend(self, chunks: List[Dict]) -> np.ndarray:
+        """
+        Appends chunks whose chunk_id is not stored yet.
+
+        Returns:
+            Row of every given chunk (existing or newly appended).
+        """
+        rows = self.rows_for_chunk_ids([c["chunk_id"] for c in chunks])
+        new_chunks, seen = [], {}
+        for i, chunk in enumerate(chunks):
+            if rows[i] >= 0:
+                continue
+            # Duplicates within the batch share one row
+            if chunk["chunk_id"] in seen:
+                rows[i] = seen[chunk["chunk_id"]]
+                continue
+            rows[i] = seen[chunk["chunk_id"]] = len(self) + len(new_chunks)
+            new_chunks.append(chunk)
+        if not new_chunks:
+            return rows
+
+        self._make_mutable()
+        encoded = [c["content"].encode("utf-8") for c in new_chunks]
+        lengths = np.array([len(text) for text in encoded], dtype=np.int64)
+
+        self.chunk_ids = np.concatenate(
+            [
+                self.chunk_ids,
+                np.array([c["chunk_id"].encode() for c in new_chunks]),
+            ]
+        )
+        self.url_codes = np.concatenate(
+            [
+                self.url_codes,
+                _intern(
+                    [c["url"] for c in new_chunks],
+                    self.urls,
+                    self._url_lookup,
+                ),
+            ]
+        )
+        self.title_codes = np.concatenate(
+            [
+                self.title_codes,
+                _intern(
+                    [c["title"] for c in new_chunks],
+                    self.titles,
+                    self._title_lookup,
+                ),
+            ]
+        )
+        self.token_counts = np.concatenate(
+            [
+                self.token_counts,
+                np.array(
+                    [c.get("token_count", 0) for c in new_chunks],
+                    dtype=np.int32,
+                ),
+            ]
+        )
+        self.start_tokens = np.concatenate(
+            [
+                self.start_tokens,
+                np.array(
+                    [c.get("start_token", -1) for c in new_chunks],
+                    dtype=np.int32,
+                ),
+            ]
+        )
+        self.content = self.content + b"".join(encoded)
+        self.content_offsets = np.concatenate(
+            [
+                self.content_offsets,
+                self.content_offsets[-1] + np.cumsum(lengths),
+            ]
+        )
+        self._id_order = None
+        return rows
+
+    def remove_rows(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Drops rows, compacting every column.
+
+        Returns:
+            Array mapping each old row to its new row (-1 if removed).
+        """
+        self._make_mutable()
+        keep = np.ones(len(self), dtype=bool)
+        keep[np.asarray(rows, dtype=np.int64)] = False
+
+        remap = np.full(len(self), -1, dtype=np.int64)
+        remap[keep] = np.arange(int(keep.sum()))
+
+        lengths = np.diff(self.content_offsets)
+        blob = np.frombuffer(self.content, dtype=np.uint8)
+        self.content = blob[np.repeat(keep, lengths)].tobytes()
+        self.content_offsets = np.concatenate(
+            ([0], np.cumsum(lengths[keep]))
+        ).astype(np.int64)
+
+        self.chunk_ids = self.chunk_ids[keep]
+        self.url_codes = self.url_codes[keep]
+        self.title_codes = self.title_codes[keep]
+        self.token_counts = self.token_counts[keep]
+        self.start_tokens = self.start_tokens[keep]
+        self._id_order = None
+        return remap
+
+    def rows_for_chunk_ids(self, chunk_ids: List[str]) -> np.ndarray:
+        """Maps chunk ids to rows, -1 for ids not in the store."""
+        rows = np.full(len(chunk_ids), -1, dtype=np.int64)
+        if not chunk_ids or not len(self):
+            return rows
+
+        if self._id_order is None:
+            self._id_order = np.argsort(self.chunk_ids, kind="stable")
+        sorted_ids = self.chunk_ids[self._id_order]
+
+        keys = np.array([chunk_id.encode() for chunk_id in chunk_ids])
+        positions = np.searchsorted(sorted_ids, keys)
+        positions = np.minimum(positions, len(self) - 1)
+        found = sorted_ids[positions] == keys
+        rows[found] = self._id_order[positions[found]]
+        return rows
+
+    def rows_for_url(self, url: str) -> np.ndarray:
+        """Rows of every chunk of a document."""
+        code = self._url_lookup.get(url)
+        if code is None:
+            return np.zeros(0, dtype=np.int64)
+        return np.flatnonzero(self.url_codes == code)
+
+    def chunk_id(self, row: int) -> str:
+        return self.chunk_ids[row].decode()
+
+    def url(self, row: int) -> str:
+        return self.urls[self.url_codes[row]]
+
+    def title(self, row: int) -> str:
+        return self.titles[self.title_codes[row]]
+
+    def text(self, row: int) -> str:
+        start, end = self.content_offsets[row], self.content_offsets[row + 1]
+        if self.compression:
+            block = row // self.block_rows
+            base = self.content_offsets[block * self.block_rows]
+            return self._block(block)[start - base : end - base].decode(
+                "utf-8"
+            )
+        return bytes(self.content[start:end]).decode("utf-8")
+
+    def texts(self, rows: Optional[List[int]] = None) -> Iterator[str]:
+        """Chunk texts of the given rows (default all), decoded lazily."""
+        if rows is None:
+            rows = range(len(self))
+        for row in rows:
+            yield self.text(row)
+
+    def get(self, row: int) -> Dict:
+        """Materializes one row as a chunk dict."""
+        return {
+            "chunk_id": self.chunk_id(row),
+            "url": self.url(row),
+            "title": self.title(row),
+            "content": self.text(row),
+            "token_count": int(self.token_counts[row]),
+            "start_token": int(self.start_tokens[row]),
+        }
+
+    def get_many(self, rows) -> List[Dict]:
+        return [self.get(row) for row in rows]
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Approximate bytes held per column, for monitoring."""
+        return {
+            "chunk_ids": self.chunk_ids.nbytes,
+            "urls": sum(len(u) for u in self.urls) + self.url_codes.nbytes,
+            "titles": sum(len(t) for t in self.titles)
+            + self.title_codes.nbytes,
+            "content": len(self.content) + self.content_offsets.nbytes,
+        }
+
+
+def materialize(
+    store: ChunkStore, rows: np.ndarray, scores: np.ndarray
+) -> List[Tuple[Dict, float]]:
+    """Turns parallel (row, score) arrays into (chunk, score) pairs."""
+    return [
+        (store.get(int(row)), float(score)) for row, score in zip(rows, scores)
+    ]
+
+
+def convert_corpus(
+    json_path: Path = Config.CORPUS_PATH,
+    store_path: Path = Config.CORPUS_STORE_PATH,
+) -> ChunkStore:
+    """Converts a corpus JSON file into the binary store format."""
+    print(f"Converting {json_path} -> {store_path}...")
+    store = ChunkStore().load(json_path)
+    store.save(store_path)
+    return store
+
+
+if __name__ == "__main__":
+    import time
+
+    # Convert corpus.json, then compare cold-start costs of both formats
+    store = convert_corpus()
+    json_mb = Config.CORPUS_PATH.stat().st_size / 1024**2
+    store_mb = (
+        sum(p.stat().st_size for p in Config.CORPUS_STORE_PATH.iterdir())
+        / 1024**2
+    )
+    print(f"{len(store)} chunks from {len(store.urls)} documents.")
+    print(f"corpus.json: {json_mb:.2f} MB, corpus_store: {store_mb:.2f} MB")
+
+    start = time.time()
+    with open(Config.CORPUS_PATH, "r") as f:
+        json.load(f)
+    print(f"Parse corpus.json:  {(time.time() - start) * 1000:8.2f} ms")
+
+    start = time.time()
+    store = ChunkStore().load(Config.CORPUS_STORE_PATH)
+    print(f"Open corpus_store:  {(time.time() - start) * 1000:8.2f} ms")
+
+    start = time.time()
+    text = store.text(len(store) // 2)
+    print(f"Read one chunk:     {(time.time() - start) * 1000:8.2f} ms")
@@ -35,6 +35,7 @@ class Chunker:
                     "title": meta["title"],
                     "content": chunk_text,
                     "token_count": len(tokens),
+                    "start_token": 0,
                 }
             )
             return chunks
@@ -53,6 +54,9 @@ class Chunker:
                     "title": meta["title"],
                     "content": chunk_text,
                     "token_count": len(chunk_tokens),
+                    # Word offset in the document, so overlapping chunks
+                    # can be merged back into one span
+                    "start_token": start,
                 }
             )
 
@@ -84,7 +88,10 @@ if __name__ == "__main__":
     print(f"Chunk Config: Size=10, Overlap=2")
     print(f"Chunks Generated: {len(result)}")
     for i, c in enumerate(result):
-        print(f"Chunk {i}: {c['content']} (Len: {c['token_count']})")
+        print(
+            f"Chunk {i}: {c['content']} (Len: {c['token_count']}, "
+            f"Start: {c['start_token']})"
+        )
 
     # Validation check
     # Chunk 0: 1..10
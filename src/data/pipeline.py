@@ -12,6 +12,7 @@ from src.config import Config
 from src.data.url_loader import URLLoader
 from src.data.scraping import Scraper
 from src.data.chunking import Chunker
+from src.data.chunk_store import ChunkStore
 
 
 class DataPipeline:
@@ -93,10 +94,16 @@ class DataPipeline:
         print(f"\nProcessed {len(processed_urls)}/{target_urls} documents.")
         print(f"Generated {len(all_chunks)} chunks.")
 
+        # Binary store is what the indexes load; corpus.json stays as a
+        # human-readable export
+        ChunkStore.from_chunks(all_chunks).save(Config.CORPUS_STORE_PATH)
         with open(Config.CORPUS_PATH, "w") as f:
             json.dump(all_chunks, f, indent=2)
 
-        print(f"Corpus saved to {Config.CORPUS_PATH}")
+        print(
+            f"Corpus saved to {Config.CORPUS_STORE_PATH} "
+            f"(JSON export: {Config.CORPUS_PATH})"
+        )
         return len(all_chunks)
 
 
@@ -15,10 +15,12 @@ import os
 from typing import List, Dict
 from datetime import datetime
 import tqdm
+import numpy as np
 
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), "../.."))
 from src.config import Config
+from src.data.chunk_store import ChunkStore
 from src.retrieval.vector_index import VectorIndex
 from src.retrieval.sparse_index import SparseIndex
 from src.retrieval.rrf import RRFGrouper
@@ -38,8 +40,10 @@ class AblationStudy:
     """
 
     def __init__(self):
-        self.vector_index = VectorIndex()
-        self.sparse_index = SparseIndex()
+        # Both indexes share one copy of the corpus
+        self.chunk_store = ChunkStore()
+        self.vector_index = VectorIndex(chunk_store=self.chunk_store)
+        self.sparse_index = SparseIndex(chunk_store=self.chunk_store)
         self.metrics = MetricsEvaluator()
         self.qa_path = Config.DATA_DIR / "qa_dataset.json"
         self.results_path = Config.DATA_DIR / "ablation_results.json"
@@ -55,7 +59,7 @@ class AblationStudy:
                 "Vector index not found. Run data pipeline first."
             )
 
-        if (Config.DATA_DIR / "bm25_index.pkl").exists():
+        if Config.BM25_INDEX_PATH.exists():
             self.sparse_index.load_index()
         else:
             raise FileNotFoundError(
@@ -87,6 +91,13 @@ class AblationStudy:
 
         print(f"\nRunning ablation study on {len(dataset)} questions...")
 
+        # Retrieve candidates for all questions once, in batch; every
+        # method below only truncates or fuses these candidate lists
+        queries = [item["question"] for item in dataset]
+        print("Retrieving dense and sparse candidates...")
+        dense_batch = self.vector_index.search_ids_batch(queries, k=100)
+        sparse_batch = self.sparse_index.search_ids_batch(queries, k=100)
+
         # Define methods to compare
         # Includes different k values AND different weight ratios
         methods = [
@@ -94,23 +105,23 @@ class AblationStudy:
             ("sparse_only", self._retrieve_sparse_only),
             (
                 "hybrid_balanced",
-                lambda q: self._retrieve_hybrid_weighted(
-                    q, dense_w=1.0, sparse_w=1.0
+                lambda d, s: self._retrieve_hybrid_weighted(
+                    d, s, dense_w=1.0, sparse_w=1.0
                 ),
             ),
             (
                 "hybrid_dense_heavy",
-                lambda q: self._retrieve_hybrid_weighted(
-                    q, dense_w=2.0, sparse_w=1.0
+                lambda d, s: self._retrieve_hybrid_weighted(
+                    d, s, dense_w=2.0, sparse_w=1.0
                 ),
             ),
             (
                 "hybrid_sparse_heavy",
-                lambda q: self._retrieve_hybrid_weighted(
-                    q, dense_w=1.0, sparse_w=2.0
+                lambda d, s: self._retrieve_hybrid_weighted(
+                    d, s, dense_w=1.0, sparse_w=2.0
                 ),
             ),
-            ("hybrid_k60", lambda q: self._retrieve_hybrid(q, k=60)),
+            ("hybrid_k60", lambda d, s: self._retrieve_hybrid(d, s, k=60)),
         ]
 
         results = {}
@@ -123,12 +134,15 @@ class AblationStudy:
             ground_truth_urls = []
             retrieved_results = []
 
-            for item in tqdm.tqdm(dataset, desc=method_name):
-                query = item["question"]
-                chunks = retrieval_fn(query)
+            for item, (dense_rows, _), (sparse_rows, _) in tqdm.tqdm(
+                zip(dataset, dense_batch, sparse_batch),
+                total=len(dataset),
+                desc=method_name,
+            ):
+                rows = retrieval_fn(dense_rows, sparse_rows)
 
                 ground_truth_urls.append(item["url"])
-                retrieved_results.append(chunks)
+                retrieved_results.append(self.chunk_store.get_many(rows))
 
             # Calculate MRR for this method
             mrr = self.metrics.calculate_mrr(
@@ -158,45 +172,46 @@ class AblationStudy:
 
         return output
 
-    def _retrieve_dense_only(self, query: str, k: int = 5) -> List[Dict]:
+    def _retrieve_dense_only(
+        self, dense_rows: np.ndarray, sparse_rows: np.ndarray, k: int = 5
+    ) -> np.ndarray:
         """Retrieve using only dense (vector) search."""
-        results = self.vector_index.search(query, k=k)
-        return [chunk for chunk, score in results]
+        return dense_rows[:k]
 
-    def _retrieve_sparse_only(self, query: str, k: int = 5) -> List[Dict]:
+    def _retrieve_sparse_only(
+        self, dense_rows: np.ndarray, sparse_rows: np.ndarray, k: int = 5
+    ) -> np.ndarray:
         """Retrieve using only sparse (BM25) search."""
-        results = self.sparse_index.search(query, k=k)
-        return [chunk for chunk, score in results]
+        return sparse_rows[:k]
 
     def _retrieve_hybrid(
-        self, query: str, k: int = 60, top_n: int = 5
-    ) -> List[Dict]:
+        self,
+        dense_rows: np.ndarray,
+        sparse_rows: np.ndarray,
+        k: int = 60,
+        top_n: int = 5,
+    ) -> np.ndarray:
         """Retrieve using hybrid RRF with specified k constant."""
-        dense_results = self.vector_index.search(query, k=100)
-        sparse_results = self.sparse_index.search(query, k=100)
-
         rrf = RRFGrouper(k_const=k)
-        fused = rrf.fuse(dense_results, sparse_results, top_n_out=top_n)
+        rows, _ = rrf.fuse_ids(dense_rows, sparse_rows, top_n_out=top_n)
 
-        return [chunk for chunk, score in fused]
+        return rows
 
     def _retrieve_hybrid_weighted(
         self,
-        query: str,
+        dense_rows: np.ndarray,
+        sparse_rows: np.ndarray,
         dense_w: float = 1.0,
         sparse_w: float = 1.0,
         top_n: int = 5,
-    ) -> List[Dict]:
+    ) -> np.ndarray:
         """Retrieve using hybrid RRF with specified weight configuration."""
-        dense_results = self.vector_index.search(query, k=100)
-        sparse_results = self.sparse_index.search(query, k=100)
-
         rrf = RRFGrouper(
             k_const=60, weight_dense=dense_w, weight_sparse=sparse_w
         )
-        fused = rrf.fuse(dense_results, sparse_results, top_n_out=top_n)
+        rows, _ = rrf.fuse_ids(dense_rows, sparse_rows, top_n_out=top_n)
 
-        return [chunk for chunk, score in fused]
+        return rows
 
     def _generate_analysis(self, results: Dict) -> Dict:
         """Generate analysis comparing methods."""
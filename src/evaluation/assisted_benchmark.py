@@ -0,0 +1,189 @@
+"""
+Assisted Decoding Benchmark for Hybrid RAG System.
+
+Answers the Q&A questions with greedy decoding of the generator, with the
+"assisted" profile (Config.ASSISTANT_MODEL drafts tokens, the generator
+verifies them) and with the assistant alone, and reports:
+- Acceptance rate: share of the generator's greedy tokens the assistant
+  predicts itself (teacher-forced on the generator's output), i.e. the
+  chance a drafted token is accepted
+- Mean latency per question and wall-clock speedup vs greedy
+- Share of assisted answers identical to greedy (should be 1.0, up to
+  floating-point ties)
+
+Prompts are built once from the same retrieved context.
+"""
+
+import json
+import sys
+import os
+import time
+from typing import Dict, Tuple
+from datetime import datetime
+
+import torch
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../.."))
+from src.config import Config
+from src.generation.model_service import ModelService
+from src.evaluation.generation_benchmark import GenerationBenchmark
+
+
+class AssistedBenchmark:
+    """Measures acceptance rate and speedup of assisted decoding."""
+
+    def __init__(self):
+        self.results_path = Config.DATA_DIR / "assisted_benchmark.json"
+
+    def run(self, sample_size: int = 50) -> Dict:
+        """
+        Answer every benchmark question greedily, assisted and with the
+        assistant alone.
+
+        Args:
+            sample_size: Number of questions to use (None = all).
+
+        Returns:
+            Dictionary with acceptance rate, latencies and speedup.
+        """
+        prompts, _ = GenerationBenchmark().build_prompts(sample_size)
+
+        model_service = ModelService()
+        model_service.initialize()
+        assistant = model_service.load_assistant()
+        if assistant is None:
+            print("Assisted decoding unavailable; nothing to benchmark.")
+            return {}
+        print(
+            f"Benchmarking {Config.ASSISTANT_MODEL} assisting "
+            f"{Config.GENERATION_MODEL} on {len(prompts)} questions..."
+        )
+
+        timings = {"greedy": [], "assisted": [], "assistant_only": []}
+        accepted = drafted = identical = 0
+
+        with torch.inference_mode():
+            # Warm up both models
+            model_service.generate_ids(prompts[0], max_new_tokens=8)
+            model_service.generate_ids(
+                prompts[0], max_new_tokens=8, profile="assisted"
+            )
+
+            for i, prompt in enumerate(prompts):
+                input_ids = torch.tensor([prompt], device=model_service.device)
+
+                start = time.time()
+                greedy_ids = model_service.generate_ids(
+                    prompt, max_new_tokens=150, profile="greedy"
+                )
+                timings["greedy"].append(time.time() - start)
+
+                start = time.time()
+                assisted_ids = model_service.generate_ids(
+                    prompt, max_new_tokens=150, profile="assisted"
+                )
+                timings["assisted"].append(time.time() - start)
+
+                start = time.time()
+                assistant.generate(
+                    input_ids, max_new_tokens=150, num_beams=1, do_sample=False
+                )
+                timings["assistant_only"].append(time.time() - start)
+
+                identical += int(torch.equal(greedy_ids, assisted_ids))
+                hits, total = self._draft_agreement(
+                    model_service, input_ids, greedy_ids
+                )
+                accepted += hits
+                drafted += total
+
+                if (i + 1) % 10 == 0:
+                    print(f"  {i + 1}/{len(prompts)} questions")
+
+        mean_ms = {
+            name: sum(values) * 1000 / len(values)
+            for name, values in timings.items()
+        }
+        output = {
+            "timestamp": datetime.now().isoformat(),
+            "generation_model": Config.GENERATION_MODEL,
+            "assistant_model": Config.ASSISTANT_MODEL,
+            "device": model_service.device,
+            "num_questions": len(prompts),
+            "acceptance_rate": round(accepted / max(drafted, 1), 4),
+            "identical_to_greedy": round(identical / len(prompts), 4),
+            "greedy_ms_per_question": round(mean_ms["greedy"], 1),
+            "assisted_ms_per_question": round(mean_ms["assisted"], 1),
+            "assistant_only_ms_per_question": round(
+                mean_ms["assistant_only"], 1
+            ),
+            "speedup_vs_greedy": round(
+                mean_ms["greedy"] / mean_ms["assisted"], 2
+            ),
+        }
+
+        with open(self.results_path, "w") as f:
+            json.dump(output, f, indent=2)
+        print(f"\nResults saved to {self.results_path}")
+
+        self._print_summary(output)
+        return output
+
+    def _draft_agreement(
+        self,
+        model_service: ModelService,
+        input_ids: torch.Tensor,
+        output_ids: torch.Tensor,
+    ) -> Tuple[int, int]:
+        """
+        Counts the generator's greedy tokens that the assistant predicts
+        given the same prefix (one teacher-forced forward pass). While the
+        assistant agrees, its drafts follow that same prefix, so this is
+        the per-token acceptance rate of greedy assisted decoding.
+
+        Returns:
+            Tuple of (tokens the assistant agrees on, generated tokens).
+        """
+        assistant = model_service.assistant_model
+        if model_service.is_t5:
+            # Output starts with the decoder start token
+            logits = assistant(
+                input_ids=input_ids, decoder_input_ids=output_ids[:, :-1]
+            ).logits
+            targets = output_ids[0, 1:]
+        else:
+            # Output continues the prompt
+            prompt_len = input_ids.shape[1]
+            logits = assistant(input_ids=output_ids[:, :-1]).logits
+            logits = logits[:, prompt_len - 1 :]
+            targets = output_ids[0, prompt_len:]
+        predicted = logits[0].argmax(dim=-1)
+        return int((predicted == targets).sum()), len(targets)
+
+    def _print_summary(self, output: Dict):
+        """Print formatted summary table."""
+        print("\n" + "=" * 60)
+        print("               ASSISTED DECODING BENCHMARK")
+        print("=" * 60)
+        print(f"Acceptance rate:      {output['acceptance_rate']:.2%}")
+        print(f"Identical to greedy:  {output['identical_to_greedy']:.2%}")
+        print("-" * 60)
+        base = Config.GENERATION_MODEL.split("/")[-1]
+        small = Config.ASSISTANT_MODEL.split("/")[-1]
+        rows = [
+            (f"greedy ({base})", output["greedy_ms_per_question"]),
+            ("assisted", output["assisted_ms_per_question"]),
+            (f"greedy ({small})", output["assistant_only_ms_per_question"]),
+        ]
+        print(f"{'Decoding':<28} {'ms/q':>10}")
+        for name, ms in rows:
+            print(f"{name:<28} {ms:>10.1f}")
+        print("-" * 60)
+        print(f"Speedup vs greedy:    {output['speedup_vs_greedy']:.2f}x")
+        print("=" * 60)
+
+
+if __name__ == "__main__":
+    benchmark = AssistedBenchmark()
+    benchmark.run(sample_size=50)
@@ -0,0 +1,148 @@
+"""
+Decoding Profile Benchmark for Hybrid RAG System.
+
+Answers the same Q&A questions with each decoding profile in
+Config.DECODING_PROFILES (greedy, beam search, contrastive, ...) and
+compares:
+- Generated tokens per second
+- p50/p95 generation latency per question
+- ROUGE-L and BERTScore against the reference answers
+
+Prompts are built once from the same retrieved context and the generator
+is loaded once, so differences come from decoding alone. Helps pick a
+DECODING_PROFILE knowing what the extra decode compute buys.
+"""
+
+import json
+import sys
+import os
+import time
+from typing import Dict, List
+from datetime import datetime
+
+import numpy as np
+import torch
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../.."))
+from src.config import Config
+from src.generation.model_service import ModelService
+from src.evaluation.generation_benchmark import GenerationBenchmark
+from src.evaluation.metrics import MetricsEvaluator
+
+
+class DecodingBenchmark:
+    """Measures throughput, latency and answer quality per profile."""
+
+    def __init__(self):
+        self.metrics_evaluator = MetricsEvaluator()
+        self.results_path = Config.DATA_DIR / "decoding_benchmark.json"
+
+    def run(self, profiles: List[str] = None, sample_size: int = 50) -> Dict:
+        """
+        Answer every benchmark question with each decoding profile.
+
+        Args:
+            profiles: Profile names (default: all of
+                Config.DECODING_PROFILES).
+            sample_size: Number of questions to use (None = all).
+
+        Returns:
+            Dictionary with per-profile metrics.
+        """
+        profiles = profiles or list(Config.DECODING_PROFILES)
+        prompts, references = GenerationBenchmark().build_prompts(sample_size)
+
+        model_service = ModelService()
+        model_service.initialize()
+        print(
+            f"Benchmarking {len(profiles)} decoding profiles of "
+            f"{Config.GENERATION_MODEL} on {len(prompts)} questions..."
+        )
+
+        results = {}
+        with torch.inference_mode():
+            # Warm up so the first profile doesn't pay one-time costs
+            model_service.generate(prompts[0], max_new_tokens=8)
+
+            for profile in profiles:
+                print(f"\nProfile '{profile}'...")
+                answers, latencies = [], []
+                for prompt in prompts:
+                    start = time.time()
+                    answers.append(
+                        model_service.generate(
+                            prompt, max_new_tokens=150, profile=profile
+                        )
+                    )
+                    latencies.append((time.time() - start) * 1000)
+
+                # Answer tokens, re-tokenized from the decoded text
+                num_tokens = sum(
+                    len(ids)
+                    for ids in model_service.tokenizer(
+                        answers, add_special_tokens=False
+                    ).input_ids
+                )
+
+                record = {
+                    "tokens_per_second": round(
+                        num_tokens / (sum(latencies) / 1000), 1
+                    ),
+                    "mean_answer_tokens": round(num_tokens / len(answers), 1),
+                    "p50_ms": round(float(np.percentile(latencies, 50)), 1),
+                    "p95_ms": round(float(np.percentile(latencies, 95)), 1),
+                    "rouge_l": round(
+                        self.metrics_evaluator.calculate_rouge(
+                            references, answers
+                        ),
+                        4,
+                    ),
+                    "bert_score": round(
+                        self.metrics_evaluator.calculate_bertscore(
+                            references, answers
+                        ),
+                        4,
+                    ),
+                }
+                results[profile] = record
+                print(f"  {record}")
+
+        output = {
+            "timestamp": datetime.now().isoformat(),
+            "generation_model": Config.GENERATION_MODEL,
+            "device": model_service.device,
+            "num_questions": len(prompts),
+            "profiles": results,
+        }
+
+        with open(self.results_path, "w") as f:
+            json.dump(output, f, indent=2)
+        print(f"\nResults saved to {self.results_path}")
+
+        self._print_summary(results)
+        return output
+
+    def _print_summary(self, results: Dict):
+        """Print formatted summary table."""
+        print("\n" + "=" * 70)
+        print("                  DECODING PROFILE BENCHMARK")
+        print("=" * 70)
+        print(
+            f"{'Profile':<14} {'tok/s':>8} {'p50 ms':>9} {'p95 ms':>9} "
+            f"{'Tokens':>7} {'ROUGE-L':>8} {'BERT':>7}"
+        )
+        print("-" * 70)
+        for profile, data in results.items():
+            print(
+                f"{profile:<14} {data['tokens_per_second']:>8.1f} "
+                f"{data['p50_ms']:>9.1f} {data['p95_ms']:>9.1f} "
+                f"{data['mean_answer_tokens']:>7.1f} "
+                f"{data['rouge_l']:>8.4f} {data['bert_score']:>7.4f}"
+            )
+        print("=" * 70)
+
+
+if __name__ == "__main__":
+    benchmark = DecodingBenchmark()
+    benchmark.run(sample_size=50)
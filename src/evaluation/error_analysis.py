@@ -75,13 +75,24 @@ class ErrorAnalyzer:
         error_counts = defaultdict(int)
         errors_by_type = defaultdict(list)
 
-        for i, item in enumerate(dataset):
+        # Run RAG in batches (uncached, like the evaluation runner)
+        results = []
+        batch_size = Config.EVAL_BATCH_SIZE
+        for start in range(0, len(dataset), batch_size):
+            batch = dataset[start : start + batch_size]
+            results.extend(
+                self.rag_service.answer_questions(
+                    [item["question"] for item in batch]
+                )
+            )
+            print(f"Answered: {len(results)}/{len(dataset)}", end="\r")
+        print()
+
+        for i, (item, result) in enumerate(zip(dataset, results)):
             query = item["question"]
             ground_truth_url = item["url"]
             question_type = item.get("question_type", "unknown")
 
-            # Run RAG
-            result = self.rag_service.answer_question(query)
             retrieved_urls = [c["url"] for c in result["retrieved_chunks"]]
 
             # Categorize result
@@ -0,0 +1,210 @@
+"""
+Generation Precision Benchmark for Hybrid RAG System.
+
+Answers the same Q&A questions with the generator loaded at each
+inference precision (fp32, int8 dynamic quantization, bf16) and compares:
+- Mean generation latency per question and speedup vs fp32
+- Serialized model size
+- ROUGE-L and BERTScore against the reference answers
+- ROUGE-L agreement with the fp32 answers
+
+Prompts are built once from the same retrieved context, so differences
+come from the generator alone. Every precision runs on the CPU (int8 only
+runs there), so speedups compare like with like. Helps pick a
+GENERATION_PRECISION for CPU serving.
+"""
+
+import io
+import json
+import sys
+import os
+import time
+from typing import List, Dict, Tuple
+from datetime import datetime
+
+import torch
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../.."))
+from src.config import Config
+from src.generation.model_service import ModelService, PRECISIONS
+from src.generation.rag import RAGService
+from src.evaluation.metrics import MetricsEvaluator
+
+
+class GenerationBenchmark:
+    """Measures latency and answer quality of each generator precision."""
+
+    def __init__(self):
+        self.metrics_evaluator = MetricsEvaluator()
+        self.qa_path = Config.DATA_DIR / "qa_dataset.json"
+        self.results_path = Config.DATA_DIR / "generation_benchmark.json"
+
+    def build_prompts(self, sample_size: int = None) -> Tuple[List, List]:
+        """
+        Retrieves context for the benchmark questions and builds prompts.
+
+        Returns:
+            Tuple of (prompt token ids, reference answers).
+        """
+        with open(self.qa_path, "r") as f:
+            dataset = json.load(f)
+        if sample_size:
+            dataset = dataset[:sample_size]
+
+        rag = RAGService()
+        rag.retriever.initialize()
+        queries = [item["question"] for item in dataset]
+        batch_results = rag.retriever.retrieve_batch(queries)
+        prompts = [
+            rag.construct_prompt_ids(query, [c for c, s in results])
+            for query, results in zip(queries, batch_results)
+        ]
+
+        # Same reference choice as the evaluation runner
+        references = [
+            (
+                item["answer"]
+                if (item.get("answer") and len(item["answer"]) > 5)
+                else item["ground_truth_context"]
+            )
+            for item in dataset
+        ]
+        return prompts, references
+
+    def run(self, precisions=PRECISIONS, sample_size: int = 50) -> Dict:
+        """
+        Load the generator at each precision and answer every prompt.
+
+        Args:
+            precisions: Precisions to compare (fp32 is always run first,
+                as the baseline).
+            sample_size: Number of questions to use (None = all).
+
+        Returns:
+            Dictionary with per-precision metrics.
+        """
+        prompts, references = self.build_prompts(sample_size)
+        precisions = ["fp32"] + [p for p in precisions if p != "fp32"]
+        print(
+            f"Benchmarking {len(precisions)} precisions of "
+            f"{Config.GENERATION_MODEL} on {len(prompts)} questions..."
+        )
+
+        results = {}
+        baseline_answers = None
+        baseline_ms = None
+        baseline_device = None
+
+        for precision in precisions:
+            print(f"\nLoading '{precision}'...")
+            model_service = ModelService(precision=precision, device="cpu")
+            model_service.initialize()
+            if model_service.precision != precision:
+                print(f"  Skipped: '{precision}' unavailable here.")
+                results[precision] = {"skipped": True}
+                continue
+
+            answers, latencies = [], []
+            with torch.inference_mode():
+                for prompt in prompts:
+                    start = time.time()
+                    answers.append(
+                        model_service.generate(prompt, max_new_tokens=150)
+                    )
+                    latencies.append((time.time() - start) * 1000)
+            mean_ms = sum(latencies) / len(latencies)
+
+            if baseline_answers is None:
+                baseline_answers, baseline_ms = answers, mean_ms
+                baseline_device = model_service.device
+
+            # Latencies on different devices aren't comparable
+            speedup = None
+            if model_service.device == baseline_device:
+                speedup = round(baseline_ms / mean_ms, 2)
+
+            record = {
+                "device": model_service.device,
+                "model_size_mb": round(
+                    self._model_bytes(model_service.model) / 1024**2, 1
+                ),
+                "generation_ms_per_question": round(mean_ms, 1),
+                "speedup_vs_fp32": speedup,
+                "rouge_l": round(
+                    self.metrics_evaluator.calculate_rouge(
+                        references, answers
+                    ),
+                    4,
+                ),
+                "bert_score": round(
+                    self.metrics_evaluator.calculate_bertscore(
+                        references, answers
+                    ),
+                    4,
+                ),
+                "rouge_l_vs_fp32": round(
+                    self.metrics_evaluator.calculate_rouge(
+                        baseline_answers, answers
+                    ),
+                    4,
+                ),
+            }
+            results[precision] = record
+            print(f"  {record}")
+
+            # Free the model before loading the next precision
+            del model_service
+
+        output = {
+            "timestamp": datetime.now().isoformat(),
+            "generation_model": Config.GENERATION_MODEL,
+            "num_questions": len(prompts),
+            "torch_threads": torch.get_num_threads(),
+            "precisions": results,
+        }
+
+        with open(self.results_path, "w") as f:
+            json.dump(output, f, indent=2)
+        print(f"\nResults saved to {self.results_path}")
+
+        self._print_summary(results)
+        return output
+
+    def _model_bytes(self, model) -> int:
+        """Serialized state_dict size (includes packed int8 weights)."""
+        buffer = io.BytesIO()
+        torch.save(model.state_dict(), buffer)
+        return buffer.tell()
+
+    def _print_summary(self, results: Dict):
+        """Print formatted summary table."""
+        print("\n" + "=" * 70)
+        print("               GENERATION PRECISION BENCHMARK")
+        print("=" * 70)
+        print(
+            f"{'Precision':<10} {'Size MB':>8} {'ms/q':>8} {'Speedup':>8} "
+            f"{'ROUGE-L':>8} {'BERT':>7} {'vs fp32':>8}"
+        )
+        print("-" * 70)
+        for precision, data in results.items():
+            if data.get("skipped"):
+                print(f"{precision:<10} {'(not supported on this host)':>40}")
+                continue
+            speedup = data["speedup_vs_fp32"]
+            speedup = (
+                f"{speedup:>7.2f}x" if speedup is not None else f"{'n/a':>8}"
+            )
+            print(
+                f"{precision:<10} {data['model_size_mb']:>8.1f} "
+                f"{data['generation_ms_per_question']:>8.1f} "
+                f"{speedup} "
+                f"{data['rouge_l']:>8.4f} {data['bert_score']:>7.4f} "
+                f"{data['rouge_l_vs_fp32']:>8.4f}"
+            )
+        print("=" * 70)
+
+
+if __name__ == "__main__":
+    benchmark = GenerationBenchmark()
+    benchmark.run(sample_size=50)
@@ -9,6 +9,7 @@ import tqdm
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), "../.."))
 from src.config import Config
+from src.data.chunk_store import ChunkStore
 from src.generation.model_service import ModelService
 
 # Question type definitions with prompts
@@ -50,7 +51,7 @@ QUESTION_TYPES = {
 class QAGenerator:
     def __init__(self):
         self.model_service = ModelService()
-        self.corpus_path = Config.CORPUS_PATH
+        self.corpus_path = None  # Binary store if present, else corpus.json
         self.output_path = Config.DATA_DIR / "qa_dataset.json"
         self.fixed_urls_path = Config.FIXED_URLS_PATH
         self.min_question_length = 10  # Filter out too-short questions
@@ -58,8 +59,8 @@ class QAGenerator:
         self.fixed_urls = set()  # Will be loaded
 
     def load_corpus(self):
-        with open(self.corpus_path, "r") as f:
-            self.chunks = json.load(f)
+        store = ChunkStore().load(self.corpus_path)
+        self.chunks = store.get_many(range(len(store)))
 
         # Load fixed URLs to filter chunks
         if self.fixed_urls_path.exists():
@@ -112,26 +113,36 @@ class QAGenerator:
         print(f"Target types: {self.question_types}")
         self.model_service.initialize()
 
-        for i, chunk in enumerate(
-            tqdm.tqdm(selected_chunks, desc="Generating Q&A")
-        ):
-            try:
-                # Cycle through question types for balanced distribution
-                target_type = self.question_types[
-                    i % len(self.question_types)
-                ]
+        # Cycle through question types for balanced distribution
+        target_types = [
+            self.question_types[i % len(self.question_types)]
+            for i in range(len(selected_chunks))
+        ]
 
-                qa_pair = self.generate_single_qa(
-                    chunk, target_type=target_type
+        batch_size = Config.EVAL_BATCH_SIZE
+        progress = tqdm.tqdm(
+            total=len(selected_chunks), desc="Generating Q&A"
+        )
+        for start in range(0, len(selected_chunks), batch_size):
+            batch = selected_chunks[start : start + batch_size]
+            try:
+                qa_pairs = self.generate_qa_batch(
+                    batch, target_types[start : start + batch_size]
                 )
+            except Exception as e:
+                print(f"\nError generating Q&A batch: {e}")
+                failed_count += len(batch)
+                progress.update(len(batch))
+                continue
+
+            for qa_pair in qa_pairs:
                 if qa_pair and self._is_quality_qa(qa_pair):
                     qa_dataset.append(qa_pair)
                     type_counts[qa_pair["question_type"]] += 1
                 else:
                     failed_count += 1
-            except Exception as e:
-                print(f"\nError generating Q&A: {e}")
-                failed_count += 1
+            progress.update(len(batch))
+        progress.close()
 
         print(
             f"\nGenerated {len(qa_dataset)} valid Q&A pairs ({failed_count} failed/filtered)"
@@ -210,53 +221,109 @@ class QAGenerator:
         self, chunk: Dict, target_type: str = None
     ) -> Dict:
         """Generates a Q&A pair for a single chunk with specified question type."""
-        context = chunk["content"][:1500]  # Limit context size
-        title = chunk.get("title", "Unknown")
-
         # Use target type or select randomly for diversity
         if target_type is None:
             target_type = random.choice(self.question_types)
 
-        if self.model_service.is_t5:
-            # Type-specific prompts for diversity (required by assignment)
-            type_prompts = {
-                "factual": f"Generate a factual question about {title} that asks What, Who, When, or Where:\n\n{context[:700]}\n\nQuestion:",
-                "comparative": f"Generate a question comparing aspects or elements mentioned in this text about {title}:\n\n{context[:700]}\n\nQuestion:",
-                "inferential": f"Generate a Why or How question that requires reasoning about {title}:\n\n{context[:700]}\n\nQuestion:",
-                "multi_hop": f"Generate a question about relationships or influences in {title} that requires connecting multiple facts:\n\n{context[:700]}\n\nQuestion:",
-            }
+        return self.generate_qa_batch([chunk], [target_type])[0]
+
+    def generate_qa_batch(
+        self, chunks: List[Dict], target_types: List[str]
+    ) -> List[Dict]:
+        """
+        Generates Q&A pairs for many chunks with batched generation.
 
-            prompt = type_prompts.get(target_type, type_prompts["factual"])
-            question = self.model_service.generate(prompt, max_length=64)
-            question = question.strip()
+        Questions for all chunks are generated in one generate_batch call,
+        then (for T5) their answers in a second one.
 
-            # Ensure it ends with ?
-            if question and not question.endswith("?"):
-                question += "?"
+        Args:
+            chunks: Source chunks, one Q&A pair each.
+            target_types: Question type to aim for, per chunk.
 
-            # Generate answer
-            prompt_ans = f"""Answer the question based on the context.
+        Returns:
+            One Q&A pair dict per chunk.
+        """
+        # Limit context size
+        contexts = [chunk["content"][:1500] for chunk in chunks]
+
+        if self.model_service.is_t5:
+            # Type-specific prompts for diversity (required by assignment)
+            prompts = [
+                self._t5_question_prompt(chunk, context, target_type)
+                for chunk, context, target_type in zip(
+                    chunks, contexts, target_types
+                )
+            ]
+            questions = self.model_service.generate_batch(
+                prompts, max_length=64
+            )
+            questions = [
+                self._ensure_question_mark(q.strip()) for q in questions
+            ]
+
+            # Generate answers
+            answer_prompts = [
+                f"""Answer the question based on the context.
 
 Context: {context[:600]}
 Question: {question}
 Answer:"""
-            answer = self.model_service.generate(prompt_ans, max_length=100)
+                for context, question in zip(contexts, questions)
+            ]
+            answers = self.model_service.generate_batch(
+                answer_prompts, max_length=100
+            )
 
         else:
             # GPT2 Strategy - simpler prompts
-            prompt = f"""Text: {context[:800]}
+            prompts = [
+                f"""Text: {context[:800]}
 
 Write a question about the text above:
 Question:"""
-            question = self.model_service.generate(prompt, max_new_tokens=50)
-            question = question.split("\n")[0].strip()
-
-            if question and not question.endswith("?"):
-                question += "?"
+                for context in contexts
+            ]
+            questions = self.model_service.generate_batch(
+                prompts, max_new_tokens=50
+            )
+            questions = [
+                self._ensure_question_mark(q.split("\n")[0].strip())
+                for q in questions
+            ]
 
             # Use context snippet as answer for GPT2
-            answer = context[:300]
+            answers = [context[:300] for context in contexts]
 
+        return [
+            self._build_qa(chunk, question, answer, target_type)
+            for chunk, question, answer, target_type in zip(
+                chunks, questions, answers, target_types
+            )
+        ]
+
+    def _t5_question_prompt(
+        self, chunk: Dict, context: str, target_type: str
+    ) -> str:
+        """Type-specific question generation prompt for T5."""
+        title = chunk.get("title", "Unknown")
+        type_prompts = {
+            "factual": f"Generate a factual question about {title} that asks What, Who, When, or Where:\n\n{context[:700]}\n\nQuestion:",
+            "comparative": f"Generate a question comparing aspects or elements mentioned in this text about {title}:\n\n{context[:700]}\n\nQuestion:",
+            "inferential": f"Generate a Why or How question that requires reasoning about {title}:\n\n{context[:700]}\n\nQuestion:",
+            "multi_hop": f"Generate a question about relationships or influences in {title} that requires connecting multiple facts:\n\n{context[:700]}\n\nQuestion:",
+        }
+        return type_prompts.get(target_type, type_prompts["factual"])
+
+    def _ensure_question_mark(self, question: str) -> str:
+        # Ensure it ends with ?
+        if question and not question.endswith("?"):
+            question += "?"
+        return question
+
+    def _build_qa(
+        self, chunk: Dict, question: str, answer: str, target_type: str
+    ) -> Dict:
+        """Assembles a Q&A record and settles its question type."""
         # Use target type as classification (we generated with that intent)
         # But also verify with keywords for accuracy
         detected_type = self._classify_question_type(question)
@@ -270,7 +337,7 @@ Question:"""
             "question_type": final_type,
             "chunk_id": chunk["chunk_id"],
             "url": chunk["url"],
-            "title": title,
+            "title": chunk.get("title", "Unknown"),
             "ground_truth_context": chunk["content"],
         }
 
@@ -0,0 +1,170 @@
+"""
+Dense Index Benchmark for Hybrid RAG System.
+
+Compares FAISS index types against the exact flat index on the Q&A
+questions:
+- Memory footprint (serialized index size) and compression vs flat
+- Recall@k against flat results, with and without exact re-scoring
+- Mean search latency per query
+
+Helps pick a VECTOR_INDEX_TYPE for the corpus size and memory budget.
+"""
+
+import json
+import sys
+import os
+import time
+from typing import List, Dict
+from datetime import datetime
+
+import faiss
+import numpy as np
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), "../.."))
+from src.config import Config
+from src.retrieval.vector_index import (
+    VectorIndex,
+    INDEX_TYPES,
+    QUANTIZED_TYPES,
+    create_faiss_index,
+    rescore_candidates,
+)
+
+
+class IndexBenchmark:
+    """Measures memory, recall and latency of each dense index type."""
+
+    def __init__(self):
+        self.vector_index = VectorIndex()
+        self.qa_path = Config.DATA_DIR / "qa_dataset.json"
+        self.results_path = Config.DATA_DIR / "index_benchmark.json"
+
+    def load_embeddings(self) -> np.ndarray:
+        """Loads stored corpus embeddings, building the index if needed."""
+        if not Config.VECTOR_EMBEDDINGS_PATH.exists():
+            print("Stored embeddings not found, building vector index...")
+            self.vector_index.build_index()
+        return np.load(Config.VECTOR_EMBEDDINGS_PATH)
+
+    def load_queries(self, sample_size: int = None) -> List[str]:
+        """Load benchmark questions from the Q&A dataset."""
+        with open(self.qa_path, "r") as f:
+            dataset = json.load(f)
+        if sample_size:
+            dataset = dataset[:sample_size]
+        return [item["question"] for item in dataset]
+
+    def run(self, k: int = 10, sample_size: int = None) -> Dict:
+        """
+        Build every index type in memory and compare it with flat.
+
+        Args:
+            k: Number of neighbours used for recall@k.
+            sample_size: Number of questions to use (None = all).
+
+        Returns:
+            Dictionary with per-type metrics.
+        """
+        embeddings = self.load_embeddings()
+        queries = self.load_queries(sample_size)
+        query_vectors = self.vector_index.encode_queries(queries)
+        print(
+            f"Benchmarking {len(INDEX_TYPES)} index types on "
+            f"{len(embeddings)} vectors, {len(queries)} queries..."
+        )
+
+        results = {}
+        flat_ids = None
+        flat_bytes = None
+
+        for index_type in INDEX_TYPES:
+            print(f"\nBuilding '{index_type}'...")
+            start = time.time()
+            index = create_faiss_index(embeddings, index_type)
+            build_seconds = time.time() - start
+
+            size_bytes = len(faiss.serialize_index(index))
+
+            start = time.time()
+            _, ids = index.search(query_vectors, k)
+            search_ms = (time.time() - start) * 1000 / len(queries)
+
+            if index_type == "flat":
+                flat_ids, flat_bytes = ids, size_bytes
+
+            record = {
+                "size_mb": round(size_bytes / 1024**2, 2),
+                "compression_vs_flat": round(flat_bytes / size_bytes, 2),
+                "recall_at_k": round(self._recall(ids, flat_ids), 4),
+                "search_ms_per_query": round(search_ms, 3),
+                "build_seconds": round(build_seconds, 2),
+            }
+
+            if index_type in QUANTIZED_TYPES:
+                start = time.time()
+                _, candidates = index.search(
+                    query_vectors, k * Config.RESCORE_FACTOR
+                )
+                _, rescored = rescore_candidates(
+                    embeddings, query_vectors, candidates, k
+                )
+                rescore_ms = (time.time() - start) * 1000 / len(queries)
+                record["recall_at_k_rescored"] = round(
+                    self._recall(rescored, flat_ids), 4
+                )
+                record["search_ms_per_query_rescored"] = round(rescore_ms, 3)
+
+            results[index_type] = record
+            print(f"  {record}")
+
+        output = {
+            "timestamp": datetime.now().isoformat(),
+            "num_vectors": int(len(embeddings)),
+            "dimension": int(embeddings.shape[1]),
+            "num_queries": len(queries),
+            "k": k,
+            "rescore_factor": Config.RESCORE_FACTOR,
+            "index_types": results,
+        }
+
+        with open(self.results_path, "w") as f:
+            json.dump(output, f, indent=2)
+        print(f"\nResults saved to {self.results_path}")
+
+        self._print_summary(results)
+        return output
+
+    def _recall(self, ids: np.ndarray, reference_ids: np.ndarray) -> float:
+        """Mean fraction of the reference top-k recovered per query."""
+        overlaps = [
+            len(set(row[row != -1]) & set(ref)) / len(ref)
+            for row, ref in zip(ids, reference_ids)
+        ]
+        return float(np.mean(overlaps))
+
+    def _print_summary(self, results: Dict):
+        """Print formatted summary table."""
+        print("\n" + "=" * 70)
+        print("                 DENSE INDEX BENCHMARK")
+        print("=" * 70)
+        print(
+            f"{'Type':<10} {'Size MB':>9} {'Ratio':>7} {'Recall':>8} "
+            f"{'Rescored':>9} {'ms/query':>9}"
+        )
+        print("-" * 70)
+        for index_type, data in results.items():
+            rescored = data.get("recall_at_k_rescored")
+            rescored_str = f"{rescored:.4f}" if rescored is not None else "-"
+            print(
+                f"{index_type:<10} {data['size_mb']:>9.2f} "
+                f"{data['compression_vs_flat']:>6.1f}x "
+                f"{data['recall_at_k']:>8.4f} {rescored_str:>9} "
+                f"{data['search_ms_per_query']:>9.3f}"
+            )
+        print("=" * 70)
+
+
+if __name__ == "__main__":
+    benchmark = IndexBenchmark()
+    benchmark.run(k=10)
@@ -258,6 +258,15 @@ class ReportGenerator:
 
         metrics = summary.get("metrics", {})
         latency = summary.get("latency", {})
+        # Summaries from before batched evaluation only have avg_seconds
+        avg_latency = latency.get(
+            "amortized_avg_seconds", latency.get("avg_seconds", 0)
+        )
+        latency_label = "Avg Latency"
+        if latency.get("batched"):
+            latency_label += (
+                f" (amortized, batches of {latency.get('batch_size')})"
+            )
 
         return f"""
         <h2>📊 Performance Summary</h2>
@@ -275,8 +284,8 @@ class ReportGenerator:
                 <div class="metric-label">BERTScore (Semantic)</div>
             </div>
             <div class="metric-card">
-                <div class="metric-value">{latency.get("avg_seconds", 0):.2f}s</div>
-                <div class="metric-label">Avg Latency</div>
+                <div class="metric-value">{avg_latency:.2f}s</div>
+                <div class="metric-label">{latency_label}</div>
             </div>
         </div>
         <div class="card">
@@ -34,6 +34,7 @@ class EvaluationRunner:
         results = []
         failed_count = 0
         total_latency = 0.0
+        num_batches = 0
 
         # Ground Truth / Predictions Lists for Aggregate Metrics
         ground_truth_urls = []
@@ -56,37 +57,69 @@ class EvaluationRunner:
                     return url_rank
             return 0
 
-        for idx, item in enumerate(
-            tqdm.tqdm(dataset, desc="Evaluating"), start=1
-        ):
-            query = item["question"]
+        batch_size = Config.EVAL_BATCH_SIZE
+        progress = tqdm.tqdm(total=len(dataset), desc="Evaluating")
+        for start in range(0, len(dataset), batch_size):
+            batch = dataset[start : start + batch_size]
+            question_ids = range(start + 1, start + len(batch) + 1)
+            queries = [item["question"] for item in batch]
 
+            # (question_id, item, rag_output, batch size, batch latency)
+            answered = []
             try:
-                # Run RAG with timing
+                # Run RAG on the whole batch with timing; answer_questions
+                # bypasses the answer cache so every question is evaluated
                 start_time = time.time()
-                rag_output = self.rag_service.answer_question(query)
-                latency = time.time() - start_time
-                total_latency += latency
-
-                # Store for Metrics
-                ground_truth_urls.append(item["url"])
-                retrieved_chunks_for_mrr = rag_output["retrieved_chunks"]
-                retrieved_results.append(retrieved_chunks_for_mrr)
-
-                # Per-question MRR (URL-level)
-                rank = _url_rank(item["url"], retrieved_chunks_for_mrr)
-                per_question_mrr = (1.0 / rank) if rank > 0 else 0.0
-
-                ref_answers.append(
-                    item["answer"]
-                    if (item.get("answer") and len(item["answer"]) > 5)
-                    else item["ground_truth_context"]
+                rag_outputs = self.rag_service.answer_questions(queries)
+                batch_latency = time.time() - start_time
+                total_latency += batch_latency
+                num_batches += 1
+                answered = [
+                    (idx, item, rag_output, len(batch), batch_latency)
+                    for idx, item, rag_output in zip(
+                        question_ids, batch, rag_outputs
+                    )
+                ]
+            except Exception as e:
+                print(
+                    f"\nError processing batch starting at: "
+                    f"{queries[0][:50]}... - {e}; retrying its questions "
+                    f"one at a time"
                 )
-                gen_answers.append(rag_output["answer"])
-
-                # Item Result
-                results.append(
-                    {
+                for idx, item in zip(question_ids, batch):
+                    query = item["question"]
+                    try:
+                        start_time = time.time()
+                        rag_outputs = self.rag_service.answer_questions(
+                            [query]
+                        )
+                        latency = time.time() - start_time
+                    except Exception as e:
+                        print(
+                            f"\nError processing question: {query[:50]}... "
+                            f"- {e}"
+                        )
+                        failed_count += 1
+                        continue
+                    total_latency += latency
+                    num_batches += 1
+                    answered.append((idx, item, rag_outputs[0], 1, latency))
+
+            for idx, item, rag_output, size, batch_latency in answered:
+                query = item["question"]
+                try:
+                    retrieved_chunks_for_mrr = rag_output["retrieved_chunks"]
+
+                    # Per-question MRR (URL-level)
+                    rank = _url_rank(item["url"], retrieved_chunks_for_mrr)
+                    per_question_mrr = (1.0 / rank) if rank > 0 else 0.0
+
+                    # Questions are answered together, so per-question
+                    # latency is only the batch's amortized share
+                    amortized_latency = batch_latency / size
+
+                    # Item Result
+                    result = {
                         "question_id": idx,
                         "question": query,
                         "question_type": item.get("question_type", ""),
@@ -97,13 +130,33 @@ class EvaluationRunner:
                         "generated_answer": rag_output["answer"],
                         "reference_answer": item.get("answer", ""),
                         "mrr": round(per_question_mrr, 4),
-                        "latency_seconds": round(latency, 3),
+                        "batch_size": size,
+                        "batch_latency_seconds": round(batch_latency, 3),
+                        "amortized_latency_seconds": round(
+                            amortized_latency, 3
+                        ),
                     }
-                )
-            except Exception as e:
-                print(f"\nError processing question: {query[:50]}... - {e}")
-                failed_count += 1
-                continue
+                    ref_answer = (
+                        item["answer"]
+                        if (item.get("answer") and len(item["answer"]) > 5)
+                        else item["ground_truth_context"]
+                    )
+                except Exception as e:
+                    print(
+                        f"\nError processing question: {query[:50]}... - {e}"
+                    )
+                    failed_count += 1
+                    continue
+
+                # Store for Metrics (only once the item fully succeeded, so
+                # the lists stay aligned with results)
+                ground_truth_urls.append(item["url"])
+                retrieved_results.append(retrieved_chunks_for_mrr)
+                ref_answers.append(ref_answer)
+                gen_answers.append(rag_output["answer"])
+                results.append(result)
+            progress.update(len(batch))
+        progress.close()
 
         print(f"\nProcessed {len(results)}/{len(dataset)} questions ({failed_count} failed)")
         
@@ -132,6 +185,7 @@ class EvaluationRunner:
         )
         
         avg_latency = total_latency / len(results) if results else 0.0
+        avg_batch_latency = total_latency / num_batches if num_batches else 0.0
 
         print("\n" + "=" * 40)
         print("        EVALUATION RESULTS")
@@ -139,7 +193,9 @@ class EvaluationRunner:
         print(f"  MRR (Retrieval):    {mrr_score:.4f}")
         print(f"  ROUGE-L (Gen):      {rouge_score:.4f}")
         print(f"  BERTScore (Gen):    {bert_score:.4f}")
-        print(f"  Avg Latency:        {avg_latency:.3f}s")
+        print(f"  Batching:           on ({batch_size} questions/batch)")
+        print(f"  Avg Batch Latency:  {avg_batch_latency:.3f}s")
+        print(f"  Amortized Latency:  {avg_latency:.3f}s/question")
         print(f"  Questions Eval'd:   {len(results)}")
         print("=" * 40)
 
@@ -160,7 +216,13 @@ class EvaluationRunner:
                 "bert_score": round(bert_score, 4),
             },
             "latency": {
-                "avg_seconds": round(avg_latency, 3),
+                # Questions are generated in batches; per-question figures
+                # are amortized, not end-to-end latencies
+                "batched": True,
+                "batch_size": batch_size,
+                "num_batches": num_batches,
+                "avg_batch_seconds": round(avg_batch_latency, 3),
+                "amortized_avg_seconds": round(avg_latency, 3),
                 "total_seconds": round(total_latency, 3),
             },
             "config": {
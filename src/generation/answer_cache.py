@@ -0,0 +1,155 @@
+"""
+Semantic answer cache.
+
+Keeps full RAG answers for recent queries in a small FAISS inner-product
+index over their (normalized) query embeddings. A new query whose nearest
+current cached query is at least ``threshold`` cosine-similar reuses that
+answer and its sources, skipping retrieval and generation. Entries are bounded
+(LRU eviction) and tagged with the retrieval index version, so answers
+built on an older index are never served.
+
+Entries live in namespaces (one FAISS index each), so callers that cache
+differently shaped payloads for the same query never see each other's.
+Payloads are deep-copied in and out, so callers can't mutate the cache.
+"""
+
+import copy
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+import faiss
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """LRU of answers looked up by query-embedding similarity."""
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        max_size: int = 512,
+        candidates: int = 8,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            threshold: Minimum cosine similarity for a hit.
+            max_size: Maximum number of cached answers (0 disables).
+            candidates: Nearest cached queries checked per lookup, so a
+                stale nearest entry doesn't hide a current one.
+        """
+        self.threshold = threshold
+        self.max_size = max_size
+        self.candidates = candidates
+        self.lock = threading.Lock()
+        # Namespace -> index, created on first insert (needs the dimension)
+        self.indexes: Dict[str, faiss.Index] = {}
+        self.entries: "OrderedDict[int, Dict]" = OrderedDict()
+        self.next_id = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def lookup(
+        self, vector: np.ndarray, version: Hashable, namespace: str = "answer"
+    ) -> Optional[Tuple[Dict, float]]:
+        """
+        Finds the answer of the most similar cached query.
+
+        Args:
+            vector: Normalized query embedding.
+            version: Current retrieval index version.
+            namespace: Payload kind to search (as passed to put()).
+
+        Returns:
+            Tuple of (copy of the cached payload, similarity), or None on
+            a miss.
+        """
+        with self.lock:
+            hit = self._lookup(vector, version, namespace)
+            if hit is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            payload, score = hit
+        return copy.deepcopy(payload), score
+
+    def _lookup(
+        self, vector: np.ndarray, version: Hashable, namespace: str
+    ) -> Optional[Tuple[Dict, float]]:
+        index = self.indexes.get(namespace)
+        if index is None or not index.ntotal:
+            return None
+
+        scores, ids = index.search(
+            self._as_query(vector), min(self.candidates, index.ntotal)
+        )
+        # Nearest first; the first current entry above the threshold wins
+        for entry_id, score in zip(ids[0].tolist(), scores[0].tolist()):
+            if score < self.threshold:
+                break
+            entry = self.entries.get(entry_id)
+            if entry is None:
+                continue
+            if entry["version"] != version:
+                # Built on an older index; drop it
+                self._evict(entry_id)
+                continue
+            self.entries.move_to_end(entry_id)
+            return entry["payload"], score
+        return None
+
+    def put(
+        self,
+        vector: np.ndarray,
+        version: Hashable,
+        payload: Dict,
+        namespace: str = "answer",
+    ):
+        """Caches a copy of an answer payload under the query's embedding."""
+        if not self.enabled:
+            return
+        payload = copy.deepcopy(payload)
+        with self.lock:
+            index = self.indexes.get(namespace)
+            if index is None:
+                index = self.indexes[namespace] = faiss.IndexIDMap2(
+                    faiss.IndexFlatIP(vector.shape[-1])
+                )
+            index.add_with_ids(
+                self._as_query(vector),
+                np.array([self.next_id], dtype=np.int64),
+            )
+            self.entries[self.next_id] = {
+                "version": version,
+                "namespace": namespace,
+                "payload": payload,
+            }
+            self.next_id += 1
+
+            while len(self.entries) > self.max_size:
+                self._evict(next(iter(self.entries)))
+
+    def _evict(self, entry_id: int):
+        entry = self.entries.pop(entry_id)
+        self.indexes[entry["namespace"]].remove_ids(
+            np.array([entry_id], dtype=np.int64)
+        )
+
+    def _as_query(self, vector: np.ndarray) -> np.ndarray:
+        return np.ascontiguousarray(vector, dtype=np.float32).reshape(1, -1)
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for monitoring."""
+        total = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,194 @@
+"""
+Extractive context compression.
+
+Splits retrieved chunks into sentences, scores every sentence against the
+query with the retrieval encoder (MiniLM), and keeps the best-scoring
+sentences that fit a generator-token budget. Kept sentences stay in their
+chunk, in document order, and chunks keep their retrieval rank.
+
+Sentence embeddings and token lengths are cached per chunk (LRU), so a
+chunk is only split, encoded and tokenized the first time it is
+retrieved; the uncached chunks of a request are encoded in one batch.
+
+One compressor is shared by all request threads, so cache lookup, encoding
+and insertion happen under a single lock: concurrent misses on the same
+chunk don't encode it twice, and the compressor never drives the encoder
+or tokenizer from two threads at once.
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# Sentence ends: ., ! or ? followed by whitespace and a likely sentence
+# start (no NLTK data download needed)
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(\[])")
+
+
+def split_sentences(text: str) -> List[str]:
+    """Splits chunk text into sentences."""
+    return [s for s in SENTENCE_BOUNDARY.split(text.strip()) if s]
+
+
+class ContextCompressor:
+    """Keeps the query-relevant sentences of retrieved chunks."""
+
+    def __init__(self, encoder, tokenizer, cache_size: int = 2048):
+        """
+        Initialize the compressor.
+
+        Args:
+            encoder: SentenceTransformer used for retrieval (shared, so no
+                second model is loaded).
+            tokenizer: Generator tokenizer, to measure sentences in the
+                units of the prompt budget.
+            cache_size: Chunks whose sentence data is kept in memory.
+        """
+        self.encoder = encoder
+        self.tokenizer = tokenizer
+        self.cache_size = cache_size
+        self.lock = threading.Lock()
+        self.entries: "OrderedDict[str, Tuple]" = OrderedDict()
+
+    def compress(
+        self, query_vector: np.ndarray, chunks: List[Dict], max_tokens: int
+    ) -> List[Dict]:
+        """
+        Reduces chunks to their most query-relevant sentences.
+
+        Args:
+            query_vector: Normalized query embedding.
+            chunks: Retrieved chunks in rank order.
+            max_tokens: Generator-token budget for all kept sentences.
+
+        Returns:
+            Chunks (rank order) that kept at least one sentence, with
+            content replaced by the kept sentences and chunk_id cleared
+            (the original id is kept as source_chunk_id). If no sentence
+            fits whole, the best one is kept, cut to max_tokens.
+        """
+        entries = self._sentence_data(chunks)
+
+        # Every sentence of every chunk, ranked by similarity to the query
+        chunk_col = np.concatenate(
+            [np.full(len(e[0]), i) for i, e in enumerate(entries)]
+        ).astype(np.int64)
+        sentence_col = np.concatenate(
+            [np.arange(len(e[0])) for e in entries]
+        ).astype(np.int64)
+        scores = np.concatenate([e[1] @ query_vector for e in entries])
+        lengths = np.concatenate([e[2] for e in entries])
+
+        keep = set()
+        used = 0
+        order = np.argsort(-scores, kind="stable")
+        for i in order:
+            if used + lengths[i] > max_tokens:
+                # Smaller sentences further down may still fit
+                continue
+            keep.add((int(chunk_col[i]), int(sentence_col[i])))
+            used += int(lengths[i])
+
+        # Never leave the prompt without context: if nothing fits whole,
+        # keep the best sentence cut to the budget
+        truncated = {}
+        if not keep and len(order) and max_tokens > 0:
+            best = (int(chunk_col[order[0]]), int(sentence_col[order[0]]))
+            keep.add(best)
+            truncated[best] = self._truncate(
+                entries[best[0]][0][best[1]], max_tokens
+            )
+
+        compressed = []
+        for chunk_idx, (chunk, entry) in enumerate(zip(chunks, entries)):
+            sentences = [
+                truncated.get((chunk_idx, sentence_idx), sentence)
+                for sentence_idx, sentence in enumerate(entry[0])
+                if (chunk_idx, sentence_idx) in keep
+            ]
+            if sentences:
+                # Span word offsets don't apply to the compressed text
+                chunk = {
+                    key: value
+                    for key, value in chunk.items()
+                    if key not in ("parts", "focus_word")
+                }
+                compressed.append(
+                    {
+                        **chunk,
+                        "chunk_id": None,
+                        "source_chunk_id": chunk.get("chunk_id"),
+                        "content": " ".join(sentences),
+                    }
+                )
+        return compressed
+
+    def _truncate(self, sentence: str, max_tokens: int) -> str:
+        """First max_tokens generator tokens of a sentence, as text."""
+        with self.lock:
+            ids = self.tokenizer(sentence, add_special_tokens=False).input_ids
+            return self.tokenizer.decode(
+                ids[:max_tokens], skip_special_tokens=True
+            )
+
+    def _sentence_data(self, chunks: List[Dict]) -> List[Tuple]:
+        """
+        (sentences, embeddings, token lengths) per chunk, from the cache
+        or computed in one batch for all uncached chunks.
+        """
+        keys = [self._key(chunk) for chunk in chunks]
+        with self.lock:
+            return self._sentence_data_locked(keys, chunks)
+
+    def _sentence_data_locked(
+        self, keys: List[str], chunks: List[Dict]
+    ) -> List[Tuple]:
+        entries = {}
+        for key in keys:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                entries[key] = self.entries[key]
+
+        missing = {
+            key: split_sentences(chunk["content"]) or [chunk["content"]]
+            for key, chunk in zip(keys, chunks)
+            if key not in entries
+        }
+        if missing:
+            sentences = [s for split in missing.values() for s in split]
+            vectors = self.encoder.encode(
+                sentences,
+                batch_size=64,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+            ).astype(np.float32)
+            lengths = np.array(
+                [
+                    len(ids)
+                    for ids in self.tokenizer(
+                        sentences, add_special_tokens=False
+                    ).input_ids
+                ],
+                dtype=np.int64,
+            )
+
+            start = 0
+            for key, split in missing.items():
+                end = start + len(split)
+                entries[key] = (split, vectors[start:end], lengths[start:end])
+                self.entries[key] = entries[key]
+                start = end
+            while len(self.entries) > self.cache_size:
+                self.entries.popitem(last=False)
+
+        return [entries[key] for key in keys]
+
+    def _key(self, chunk: Dict) -> str:
+        """Chunk id, or a content hash for chunks without one."""
+        if chunk.get("chunk_id"):
+            return chunk["chunk_id"]
+        return hashlib.sha1(chunk["content"].encode("utf-8")).hexdigest()
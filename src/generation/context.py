@@ -0,0 +1,181 @@
+"""
+Context consolidation.
+
+The Chunker cuts documents into windows that share ``overlap`` words, and
+neighbouring windows of one article are often retrieved together, so the
+same text would reach the generator twice. Before the prompt is built,
+overlapping or adjacent chunks of the same article are merged into one
+span and exact duplicates are dropped.
+
+Spans are merged by the word offsets recorded at chunk time
+(``start_token``). Chunks from corpora built before offsets were recorded
+fall back to matching the end of one chunk against the start of another.
+
+Each span also records which words of which member make up its text
+(``parts``), so its generator token ids can be assembled from the members'
+cached ids instead of tokenizing the merged text, and the word where its
+best-ranked member starts (``focus_word``), so a span cut to fit the
+prompt keeps that member's text rather than lower-ranked text before it.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+# (chunk_id, first visible word, number of words in the chunk)
+Part = Tuple[Optional[str], int, int]
+
+
+class ContextConsolidator:
+    """Merges retrieved chunks of one article into contiguous spans."""
+
+    def __init__(self, min_text_overlap: int = 8, max_text_overlap: int = 100):
+        """
+        Initialize the consolidator.
+
+        Args:
+            min_text_overlap: Fewest shared words that count as an overlap
+                in the text fallback (guards against chance matches).
+            max_text_overlap: Most words searched for an overlap in the
+                text fallback (the Chunker's overlap is 50).
+        """
+        self.min_text_overlap = min_text_overlap
+        self.max_text_overlap = max_text_overlap
+
+    def consolidate(self, chunks: List[Dict]) -> List[Dict]:
+        """
+        Merges overlapping chunks and drops duplicates.
+
+        Args:
+            chunks: Retrieved chunks in rank order.
+
+        Returns:
+            Chunks in rank order, where a merged span takes the rank of its
+            best chunk. Merged spans list their members in ``chunk_ids``,
+            the words each contributes in ``parts`` and where the best
+            member starts in ``focus_word``; their ``chunk_id`` joins the
+            member ids with "+".
+        """
+        spans: List[Dict] = []
+        seen_content = set()
+
+        for chunk in chunks:
+            if chunk["content"] in seen_content:
+                continue
+            seen_content.add(chunk["content"])
+
+            span, position = chunk, len(spans)
+            spans.append(span)
+
+            # A chunk can bridge two spans, so repeat until nothing merges
+            merged_any = True
+            while merged_any:
+                merged_any = False
+                for i, other in enumerate(spans):
+                    if (
+                        i == position
+                        or span.get("url") is None
+                        or other.get("url") != span.get("url")
+                    ):
+                        continue
+                    keep, drop = min(i, position), max(i, position)
+                    merged = self._merge(other, span, best=spans[keep])
+                    if merged is None:
+                        continue
+                    spans[keep] = merged
+                    del spans[drop]
+                    span, position = merged, keep
+                    merged_any = True
+                    break
+
+        return spans
+
+    def _merge(self, a: Dict, b: Dict, best: Dict) -> Optional[Dict]:
+        """
+        Merges two chunks of one article, or None if they don't touch.
+        ``best`` is whichever of the two ranks higher.
+        """
+        words_a, words_b = a["content"].split(), b["content"].split()
+        start_a, start_b = a.get("start_token", -1), b.get("start_token", -1)
+
+        if start_a >= 0 and start_b >= 0:
+            if start_a > start_b:
+                a, b = b, a
+                words_a, words_b = words_b, words_a
+                start_a, start_b = start_b, start_a
+            end_a = start_a + len(words_a)
+            if start_b > end_a:
+                return None
+            # Overlapping or adjacent; b may also lie entirely inside a
+            return self._span(a, b, words_a, words_b, end_a - start_b, best)
+
+        # No positions: look for a text overlap in either order
+        overlap = self._text_overlap(words_a, words_b)
+        if overlap:
+            return self._span(a, b, words_a, words_b, overlap, best)
+        overlap = self._text_overlap(words_b, words_a)
+        if overlap:
+            return self._span(b, a, words_b, words_a, overlap, best)
+        return None
+
+    def _text_overlap(self, left: List[str], right: List[str]) -> int:
+        """Length of the longest suffix of left that prefixes right."""
+        limit = min(self.max_text_overlap, len(left), len(right))
+        for size in range(limit, self.min_text_overlap - 1, -1):
+            if left[-size:] == right[:size]:
+                return size
+        return 0
+
+    def _span(
+        self,
+        first: Dict,
+        second: Dict,
+        words_first: List[str],
+        words_second: List[str],
+        overlap: int,
+        best: Dict,
+    ) -> Dict:
+        """
+        Merged span of two chunks, first in document order, whose first
+        ``overlap`` words are the last words of first. The span's focus
+        is that of ``best`` (first or second).
+        """
+        first_ids = first.get("chunk_ids", [first.get("chunk_id")])
+        second_ids = second.get("chunk_ids", [second.get("chunk_id")])
+        chunk_ids = first_ids + [i for i in second_ids if i not in first_ids]
+        words = words_first + words_second[overlap:]
+        if best is first:
+            focus_word = first.get("focus_word", 0)
+        else:
+            # Where second's words start in the span
+            focus_word = (
+                len(words_first) - overlap + second.get("focus_word", 0)
+            )
+        return {
+            "chunk_id": "+".join(str(chunk_id) for chunk_id in chunk_ids),
+            "chunk_ids": chunk_ids,
+            "parts": self._parts(first, words_first)
+            + self._trim_parts(self._parts(second, words_second), overlap),
+            "url": first["url"],
+            "title": first.get("title", ""),
+            "content": " ".join(words),
+            "token_count": len(words),
+            "start_token": first.get("start_token", -1),
+            "focus_word": focus_word,
+        }
+
+    def _parts(self, chunk: Dict, words: List[str]) -> List[Part]:
+        """Member words of a span, or the whole of a single chunk."""
+        if "parts" in chunk:
+            return chunk["parts"]
+        return [(chunk.get("chunk_id"), 0, len(words))]
+
+    def _trim_parts(self, parts: List[Part], skip: int) -> List[Part]:
+        """Parts without their first ``skip`` visible words."""
+        trimmed = []
+        for chunk_id, start, num_words in parts:
+            visible = num_words - start
+            if skip >= visible:
+                skip -= visible
+                continue
+            trimmed.append((chunk_id, start + skip, num_words))
+            skip = 0
+        return trimmed
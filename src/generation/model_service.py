@@ -1,88 +1,491 @@
 from transformers import (
-    T5Tokenizer,
+    T5TokenizerFast,
     T5ForConditionalGeneration,
-    GPT2Tokenizer,
+    GPT2TokenizerFast,
     GPT2LMHeadModel,
+    StoppingCriteria,
+    StoppingCriteriaList,
+    TextIteratorStreamer,
 )
 import torch
+import threading
+from typing import Iterator, List, Optional, Sequence, Union
 import sys
 import os
 
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), "../.."))
 from src.config import Config
+from src.onnx_backend import load_onnx_generator
+
+PRECISIONS = ("fp32", "int8", "bf16")
+
+
+class StopOnEvent(StoppingCriteria):
+    """Stops generation at the next step once the event is set."""
+
+    def __init__(self, event: threading.Event):
+        self.event = event
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return torch.full(
+            (input_ids.shape[0],),
+            self.event.is_set(),
+            dtype=torch.bool,
+            device=input_ids.device,
+        )
+
+
+def bf16_supported(device: str) -> bool:
+    """Whether bfloat16 matmuls run natively (not emulated) on device."""
+    if device == "cuda":
+        return torch.cuda.is_available() and torch.cuda.is_bf16_supported()
+    if device == "cpu":
+        # AVX512-BF16 or AMX; without them bf16 is slower than fp32
+        checks = ("_is_avx512_bf16_supported", "_is_amx_tile_supported")
+        return any(
+            getattr(torch.cpu, name, lambda: False)() for name in checks
+        )
+    return False
 
 
 class ModelService:
-    def __init__(self):
+    def __init__(
+        self, precision: Optional[str] = None, device: Optional[str] = None
+    ):
+        """
+        Args:
+            precision: "fp32", "int8" (dynamic quantization of Linear
+                layers, CPU only) or "bf16" (default
+                Config.GENERATION_PRECISION).
+            device: Device to load the model on (default Config.DEVICE).
+        """
         self.model_name = Config.GENERATION_MODEL
-        self.device = Config.DEVICE
+        self.device = device or Config.DEVICE
+        self.precision = precision or Config.GENERATION_PRECISION
+        if self.precision not in PRECISIONS:
+            raise ValueError(
+                f"Unknown precision '{self.precision}'. "
+                f"Choose from: {', '.join(PRECISIONS)}"
+            )
+        self.backend = "torch"  # "onnx" once an ONNX export is loaded
         self.tokenizer = None
         self.model = None
         self.is_t5 = "t5" in self.model_name.lower()
+        # Draft model for the "assisted" profile, loaded on first use
+        self.assistant_model = None
+        self._assistant_lock = threading.Lock()
 
     def initialize(self):
         """Loads model and tokenizer based on config."""
-        print(f"Loading GenAI Model: {self.model_name} on {self.device}...")
+        onnx_model = None
+        if Config.INFERENCE_BACKEND == "onnx":
+            print(f"Loading GenAI Model: {self.model_name} on ONNX...")
+            onnx_model = load_onnx_generator(self.model_name, self.is_t5)
+        if onnx_model is not None:
+            self.backend = "onnx"
+            self.device = "cpu"
+        else:
+            print(
+                f"Loading GenAI Model: {self.model_name} on {self.device}..."
+            )
+
+        self.load_tokenizer()
+        if onnx_model is None:
+            if self.is_t5:
+                # T5 Loading
+                model_class = T5ForConditionalGeneration
+            else:
+                # GPT2 Loading (Causal LM)
+                model_class = GPT2LMHeadModel
+            self.model = model_class.from_pretrained(self.model_name).to(
+                self.device
+            )
+
+        if onnx_model is not None:
+            # Precision is fixed by the export (Config.ONNX_INT8)
+            self.model = onnx_model
+            self.precision = "int8" if Config.ONNX_INT8 else "fp32"
+        else:
+            self.model.eval()
+            self._apply_precision()
+        print(f"Model loaded ({self.backend}, {self.precision}).")
+
+    def load_assistant(self):
+        """
+        Loads Config.ASSISTANT_MODEL, the small model that drafts tokens
+        for the base model to verify in the "assisted" profile.
+
+        Returns:
+            The assistant model, or None if assisted decoding is
+            unavailable (callers then decode greedily, which gives the
+            same output).
+        """
+        with self._assistant_lock:
+            if self.assistant_model is not None:
+                return self.assistant_model
+
+            name = Config.ASSISTANT_MODEL
+            if not name or name == self.model_name:
+                print("No assistant model configured; decoding greedily.")
+                return None
+            if ("t5" in name.lower()) != self.is_t5:
+                print(
+                    f"Assistant {name} is not the same model family as "
+                    f"{self.model_name}; decoding greedily."
+                )
+                return None
+            if self.backend != "torch":
+                print(
+                    "Assisted decoding needs the torch backend; "
+                    "decoding greedily."
+                )
+                return None
 
+            print(f"Loading assistant model: {name} on {self.device}...")
+            model_class = (
+                T5ForConditionalGeneration if self.is_t5 else GPT2LMHeadModel
+            )
+            assistant = model_class.from_pretrained(name).to(self.device)
+            # Drafts are verified against the base model's tokens
+            if assistant.config.vocab_size != self.model.config.vocab_size:
+                raise ValueError(
+                    f"Assistant {name} has a different vocabulary than "
+                    f"{self.model_name}."
+                )
+            assistant.eval()
+            self.assistant_model = assistant
+            return self.assistant_model
+
+    def load_tokenizer(self):
+        """Loads the (fast, Rust-backed) tokenizer; no model weights."""
+        if self.tokenizer is not None:
+            return
         if self.is_t5:
-            # T5 Loading
-            self.tokenizer = T5Tokenizer.from_pretrained(
+            self.tokenizer = T5TokenizerFast.from_pretrained(
                 self.model_name, legacy=False
             )
-            self.model = T5ForConditionalGeneration.from_pretrained(
-                self.model_name
-            ).to(self.device)
         else:
-            # GPT2 Loading (Causal LM)
-            self.tokenizer = GPT2Tokenizer.from_pretrained(self.model_name)
-            self.model = GPT2LMHeadModel.from_pretrained(self.model_name).to(
-                self.device
-            )
+            self.tokenizer = GPT2TokenizerFast.from_pretrained(self.model_name)
             # GPT2 doesn't have a pad token by default, set it to eos
             self.tokenizer.pad_token = self.tokenizer.eos_token
+            # Causal LMs continue from the last position, so batches must
+            # be padded on the left
+            self.tokenizer.padding_side = "left"
 
-        print("Model loaded.")
+    def prompt_token_budget(self, max_new_tokens: int) -> int:
+        """
+        Maximum prompt length in tokens, special tokens included.
+
+        T5's encoder input is capped by the tokenizer's max length; GPT-2's
+        prompt and continuation share one context window.
+        """
+        self.load_tokenizer()
+        limit = self.tokenizer.model_max_length
+        if not self.is_t5:
+            limit -= max_new_tokens
+        return min(Config.MAX_PROMPT_TOKENS, limit)
+
+    def _encode_batch(
+        self, prompts: Sequence[Union[str, Sequence[int]]]
+    ) -> List[List[int]]:
+        """Token ids per prompt; prompts given as ids are used as is."""
+        texts = [p for p in prompts if isinstance(p, str)]
+        encoded = iter(self.tokenizer(texts).input_ids if texts else [])
+        return [
+            next(encoded) if isinstance(p, str) else list(p) for p in prompts
+        ]
+
+    def _apply_precision(self):
+        """Converts the loaded fp32 model to the requested precision."""
+        if self.precision == "int8":
+            if self.device != "cpu":
+                # Quantized kernels are CPU-only
+                print(f"int8 runs on CPU; moving model off {self.device}.")
+                self.device = "cpu"
+                self.model = self.model.to("cpu")
+            # Weights stored as int8, activations quantized on the fly
+            self.model = torch.ao.quantization.quantize_dynamic(
+                self.model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        elif self.precision == "bf16":
+            if not bf16_supported(self.device):
+                print(
+                    f"bf16 is not supported natively on {self.device}; "
+                    f"using fp32."
+                )
+                self.precision = "fp32"
+                return
+            self.model = self.model.to(torch.bfloat16)
 
     def generate(
-        self, prompt: str, max_length: int = 200, max_new_tokens: int = None
+        self,
+        prompt: Union[str, Sequence[int]],
+        max_length: int = 200,
+        max_new_tokens: int = None,
+        stop_event: Optional[threading.Event] = None,
+        profile: Optional[str] = None,
     ) -> str:
-        """Generates text from prompt."""
+        """
+        Generates text from prompt.
+
+        The prompt is text, or token ids including special tokens (as
+        built by RAGService.construct_prompt_ids), which skips tokenization.
+        Setting stop_event (e.g. from another thread when a request is
+        cancelled) ends generation after the current decoding step.
+        profile names an entry of Config.DECODING_PROFILES (default
+        Config.DECODING_PROFILE).
+        """
+        outputs = self.generate_ids(
+            prompt, max_length, max_new_tokens, stop_event, profile
+        )
+        return self.tokenizer.decode(outputs[0], skip_special_tokens=True)
+
+    def generate_ids(
+        self,
+        prompt: Union[str, Sequence[int]],
+        max_length: int = 200,
+        max_new_tokens: int = None,
+        stop_event: Optional[threading.Event] = None,
+        profile: Optional[str] = None,
+    ) -> torch.Tensor:
+        """
+        Same as generate, but returns the output token ids (batch of one;
+        T5 outputs start with the decoder start token, GPT-2 outputs with
+        the prompt).
+        """
+        if self.model is None:
+            self.initialize()
+
+        input_ids = torch.tensor(
+            [self._encode_batch([prompt])[0]], device=self.device
+        )
+
+        return self.model.generate(
+            input_ids,
+            **self._generation_kwargs(
+                max_length, max_new_tokens, stop_event, profile=profile
+            ),
+        )
+
+    def generate_stream(
+        self,
+        prompt: Union[str, Sequence[int]],
+        max_length: int = 200,
+        max_new_tokens: int = None,
+        stop_event: Optional[threading.Event] = None,
+        profile: Optional[str] = None,
+    ) -> Iterator[str]:
+        """
+        Generates text from prompt, yielding decoded text as it is produced.
+
+        Beam search only knows the answer once all beams finish, so beam
+        profiles (the T5 default) stream with greedy decoding instead;
+        other profiles are unchanged. Only new text is yielded (no prompt).
+        Closing the iterator early stops generation after the current step.
+        """
+        if self.model is None:
+            self.initialize()
+
+        input_ids = torch.tensor(
+            [self._encode_batch([prompt])[0]], device=self.device
+        )
+
+        # Stop the worker thread when either the caller or the consumer
+        # gives up
+        stop = threading.Event()
+        streamer = TextIteratorStreamer(
+            self.tokenizer, skip_prompt=True, skip_special_tokens=True
+        )
+        generation_kwargs = self._generation_kwargs(
+            max_length, max_new_tokens, stop, streaming=True, profile=profile
+        )
+        if stop_event is not None:
+            generation_kwargs["stopping_criteria"].append(
+                StopOnEvent(stop_event)
+            )
+
+        errors = []
+
+        def run():
+            try:
+                self.model.generate(
+                    input_ids, streamer=streamer, **generation_kwargs
+                )
+            except Exception as e:
+                # Surface the error in the consuming thread
+                errors.append(e)
+                streamer.end()
+
+        worker = threading.Thread(target=run, daemon=True)
+        worker.start()
+
+        finished = False
+        try:
+            for text in streamer:
+                if text:
+                    yield text
+            finished = True
+        finally:
+            if not finished:
+                # Consumer stopped early: end generation after the current
+                # step and drain until the streamer's end signal
+                stop.set()
+                for _ in streamer:
+                    pass
+            worker.join()
+
+        if errors:
+            raise errors[0]
+
+    def generate_batch(
+        self,
+        prompts: List[Union[str, Sequence[int]]],
+        max_length: int = 200,
+        max_new_tokens: int = None,
+        token_budget: Optional[int] = None,
+        max_batch_size: Optional[int] = None,
+        profile: Optional[str] = None,
+    ) -> List[str]:
+        """
+        Generates text for many prompts with padded batched generate calls.
+
+        Prompts are sorted by length and split into micro-batches whose
+        padded size (rows x longest prompt) stays within token_budget, so
+        similar-length prompts share a batch and padding stays small.
+
+        Args:
+            prompts: Prompts to complete (text or token ids).
+            max_length: Total length limit (used if max_new_tokens is None).
+            max_new_tokens: Number of tokens to generate per prompt.
+            token_budget: Max padded input tokens per micro-batch
+                (default Config.GENERATION_TOKEN_BUDGET).
+            max_batch_size: Max prompts per micro-batch
+                (default Config.GENERATION_BATCH_SIZE).
+            profile: Decoding profile (default Config.DECODING_PROFILE).
+
+        Returns:
+            Generated texts, in the order of prompts.
+        """
         if self.model is None:
             self.initialize()
+        if not prompts:
+            return []
 
-        input_ids = self.tokenizer(prompt, return_tensors="pt").input_ids.to(
-            self.device
+        token_budget = token_budget or Config.GENERATION_TOKEN_BUDGET
+        max_batch_size = max_batch_size or Config.GENERATION_BATCH_SIZE
+        generation_kwargs = self._generation_kwargs(
+            max_length, max_new_tokens, profile=profile
         )
+        if "assistant_model" in generation_kwargs:
+            # Assisted decoding verifies drafts one sequence at a time
+            max_batch_size = 1
+
+        encoded = self._encode_batch(prompts)
+        order = sorted(range(len(prompts)), key=lambda i: len(encoded[i]))
 
+        results = [None] * len(prompts)
+        for batch in self._micro_batches(
+            order, encoded, token_budget, max_batch_size
+        ):
+            inputs = self.tokenizer.pad(
+                {"input_ids": [encoded[i] for i in batch]},
+                padding=True,
+                return_tensors="pt",
+            ).to(self.device)
+            outputs = self.model.generate(
+                inputs.input_ids,
+                attention_mask=inputs.attention_mask,
+                **generation_kwargs,
+            )
+            texts = self.tokenizer.batch_decode(
+                outputs, skip_special_tokens=True
+            )
+            for i, text in zip(batch, texts):
+                results[i] = text
+
+        return results
+
+    def _micro_batches(
+        self,
+        order: List[int],
+        encoded: List[List[int]],
+        token_budget: int,
+        max_batch_size: int,
+    ) -> List[List[int]]:
+        """Groups length-sorted prompt indices under the token budget."""
+        batches, batch = [], []
+        for i in order:
+            # Sorted ascending, so the newest prompt is the longest
+            padded = (len(batch) + 1) * len(encoded[i])
+            if batch and (
+                padded > token_budget or len(batch) >= max_batch_size
+            ):
+                batches.append(batch)
+                batch = []
+            batch.append(i)
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _generation_kwargs(
+        self,
+        max_length: int,
+        max_new_tokens: Optional[int],
+        stop_event: Optional[threading.Event] = None,
+        streaming: bool = False,
+        profile: Optional[str] = None,
+    ) -> dict:
+        """Decoding arguments for model.generate from a decoding profile."""
         # Calculate max_length if not provided but max_new_tokens is
         generated_kwargs = {}
         if max_new_tokens:
             generated_kwargs["max_new_tokens"] = max_new_tokens
         else:
             generated_kwargs["max_length"] = max_length
-
-        if self.is_t5:
-            # Seq2Seq Generation
-            outputs = self.model.generate(
-                input_ids,
-                num_beams=5,
-                early_stopping=True,
-                **generated_kwargs,
+        if stop_event is not None:
+            generated_kwargs["stopping_criteria"] = StoppingCriteriaList(
+                [StopOnEvent(stop_event)]
             )
-        else:
-            # Causal LM Generation
-            outputs = self.model.generate(
-                input_ids,
-                pad_token_id=self.tokenizer.eos_token_id,
-                # Sampling params for better creativity/coherence in GPT2
-                do_sample=True,
-                top_k=50,
-                top_p=0.95,
-                **generated_kwargs,
+
+        decoding = dict(
+            Config.DECODING_PROFILES[self.resolve_profile(profile)]
+        )
+        cap = decoding.pop("max_new_tokens", None)
+        if decoding.pop("assisted", False):
+            assistant = self.load_assistant()
+            if assistant is not None:
+                generated_kwargs["assistant_model"] = assistant
+        if cap:
+            generated_kwargs.pop("max_length", None)
+            generated_kwargs["max_new_tokens"] = min(
+                max_new_tokens or cap, cap
             )
+        if streaming and decoding.get("num_beams", 1) > 1:
+            # Beams only know the answer once all finish; stream greedily
+            decoding.pop("early_stopping", None)
+            decoding["num_beams"] = 1
+        generated_kwargs.update(decoding)
 
-        return self.tokenizer.decode(outputs[0], skip_special_tokens=True)
+        if not self.is_t5:
+            generated_kwargs["pad_token_id"] = self.tokenizer.eos_token_id
+        return generated_kwargs
+
+    def resolve_profile(self, profile: Optional[str] = None) -> str:
+        """
+        Name of the decoding profile to use: profile, else
+        Config.DECODING_PROFILE, else the model default ("beam-5" for T5,
+        "sample" for GPT-2).
+        """
+        profile = profile or Config.DECODING_PROFILE
+        if profile is None:
+            profile = "beam-5" if self.is_t5 else "sample"
+        if profile not in Config.DECODING_PROFILES:
+            raise ValueError(
+                f"Unknown decoding profile '{profile}'. "
+                f"Choose from: {', '.join(Config.DECODING_PROFILES)}"
+            )
+        return profile
 
 
 if __name__ == "__main__":
@@ -99,3 +502,16 @@ if __name__ == "__main__":
     print(f"\nPrompt: {prompt}")
     answer = ms.generate(prompt)
     print(f"Answer: {answer}")
+
+    # Batched generation
+    prompts = [prompt] + [
+        prompt.replace("France", country) for country in ["Spain", "Italy"]
+    ]
+    for p, a in zip(prompts, ms.generate_batch(prompts)):
+        print(f"{p!r} -> {a!r}")
+
+    # Streaming generation
+    print("Streamed: ", end="")
+    for text in ms.generate_stream(prompt, max_new_tokens=50):
+        print(text, end="", flush=True)
+    print()
@@ -5,7 +5,11 @@ Orchestrates hybrid retrieval and LLM generation to answer user queries
 using context from the knowledge base.
 """
 
-from typing import List, Dict
+from typing import Iterator, List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import asyncio
+import threading
 import sys
 import os
 
@@ -13,6 +17,10 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), "../.."))
 from src.config import Config
 from src.generation.model_service import ModelService
+from src.generation.answer_cache import SemanticAnswerCache
+from src.generation.compression import ContextCompressor
+from src.generation.context import ContextConsolidator
+from src.generation.token_cache import ChunkTokenCache
 from src.retrieval.engine import HybridRetriever
 
 
@@ -30,17 +38,160 @@ class RAGService:
         self.model_service = ModelService()
         self.is_t5 = self.model_service.is_t5
 
+        # Bounded pool for async generation; requests queue here instead of
+        # each holding a thread
+        self.generation_executor = ThreadPoolExecutor(
+            max_workers=Config.GENERATION_WORKERS,
+            thread_name_prefix="generation",
+        )
+        self._init_lock = threading.Lock()
+
+        # Answers of recent queries, reused for near-duplicate rewordings
+        self.answer_cache = SemanticAnswerCache(
+            threshold=Config.ANSWER_CACHE_THRESHOLD,
+            max_size=Config.ANSWER_CACHE_SIZE,
+        )
+
+        # Merges overlapping retrieved chunks before prompt assembly
+        self.context_consolidator = ContextConsolidator()
+        # Sentence-level compression, created on first use
+        self.context_compressor = None
+
+        # Generator token ids per chunk, built on first prompt assembly
+        self.token_cache = None
+        self._token_cache_lock = threading.Lock()
+        self._prompt_prefix_ids = None
+        self._prompt_separator_ids = None
+
     def initialize(self):
         """Initialize retriever and model components."""
         print("Initializing RAG Service...")
         self.retriever.initialize()
         self.model_service.initialize()
+        self.get_token_cache()
         print("RAG Service Initialized.")
 
+    def get_token_cache(self) -> ChunkTokenCache:
+        """Loads (or builds) the chunk token cache for the corpus."""
+        with self._token_cache_lock:
+            if self.token_cache is None:
+                self.model_service.load_tokenizer()
+                tokenizer = self.model_service.tokenizer
+                self.token_cache = ChunkTokenCache(
+                    tokenizer,
+                    self.model_service.model_name,
+                    path=Config.CHUNK_TOKENS_PATH,
+                    extra_size=Config.TOKEN_CACHE_EXTRA_SIZE,
+                ).load_or_build(self.retriever.chunk_store)
+
+                prefix, separator, _ = self._prompt_parts("")
+                self._prompt_prefix_ids = tokenizer(
+                    prefix, add_special_tokens=False
+                ).input_ids
+                self._prompt_separator_ids = tokenizer(
+                    separator, add_special_tokens=False
+                ).input_ids
+        return self.token_cache
+
+    def ensure_initialized(self):
+        """Initializes once, even when called from several threads."""
+        with self._init_lock:
+            if self.retriever.vector_index.index is None:
+                self.initialize()
+
+    def _cached_answer(self, query: str, namespace: str):
+        """
+        Looks the query up in the semantic answer cache.
+
+        The embedding goes through the query embedding cache, so retrieval
+        after a miss doesn't encode the query again.
+
+        Args:
+            query: User question.
+            namespace: "answer" (answer_question payloads) or "details"
+                (answer_question_with_details payloads).
+
+        Returns:
+            Tuple of (cached payload or None, query vector, index version).
+        """
+        vector = self.retriever.vector_index.encode_queries([query])[0]
+        version = self.retriever.index_version()
+        hit = self.answer_cache.lookup(vector, version, namespace)
+        if hit is None:
+            return None, vector, version
+
+        payload, similarity = hit
+        print(
+            f"Answer cache hit ({similarity:.3f} similar to: "
+            f"{payload['query']})"
+        )
+        return payload, vector, version
+
+    def _prompt_parts(self, query: str):
+        """
+        Prompt template around the context, per model type.
+
+        Returns:
+            Tuple of (text before the context, separator between context
+            chunks, text after the context).
+        """
+        if self.is_t5:
+            # T5 instruction-following format
+            return (
+                "Answer the question based on the context below.\n\n"
+                "Context:\n",
+                "\n\n",
+                f"\n\nQuestion: {query}\n\nAnswer:",
+            )
+        # GPT-2 completion format
+        return (
+            "Use the following context to answer the question.\n"
+            "            \nContext:\n",
+            "\n\n",
+            f"\n\nQuestion: {query}\nAnswer:",
+        )
+
+    def consolidate_context(self, context_chunks: List[Dict]) -> List[Dict]:
+        """
+        Merges overlapping or adjacent chunks of the same article into one
+        span and drops exact duplicates (if Config.CONSOLIDATE_CONTEXT).
+        """
+        if not Config.CONSOLIDATE_CONTEXT:
+            return context_chunks
+        return self.context_consolidator.consolidate(context_chunks)
+
+    def compress_context(
+        self, query: str, context_chunks: List[Dict]
+    ) -> List[Dict]:
+        """
+        Reduces chunks to the sentences most similar to the query, within
+        Config.COMPRESSION_MAX_TOKENS (if Config.COMPRESS_CONTEXT).
+
+        Sentences are embedded with the retrieval encoder; the query
+        embedding comes from the query cache filled during retrieval.
+        """
+        if not Config.COMPRESS_CONTEXT or not context_chunks:
+            return context_chunks
+        with self._token_cache_lock:
+            if self.context_compressor is None:
+                self.model_service.load_tokenizer()
+                self.context_compressor = ContextCompressor(
+                    self.retriever.vector_index.model,
+                    self.model_service.tokenizer,
+                    cache_size=Config.COMPRESSION_CACHE_SIZE,
+                )
+        query_vector = self.retriever.vector_index.encode_queries([query])[0]
+        return self.context_compressor.compress(
+            query_vector, context_chunks, Config.COMPRESSION_MAX_TOKENS
+        )
+
     def construct_prompt(self, query: str, context_chunks: List[Dict]) -> str:
         """
         Construct generation prompt based on model type.
 
+        Context is limited by characters (Config.MAX_CONTEXT_CHARS); the
+        generation paths use construct_prompt_ids instead.
+
         Args:
             query: User question.
             context_chunks: Retrieved context chunks.
@@ -48,6 +199,10 @@ class RAGService:
         Returns:
             Formatted prompt string.
         """
+        context_chunks = self.compress_context(
+            query, self.consolidate_context(context_chunks)
+        )
+
         # Limit context length to avoid exceeding model limits
         context_parts = []
         current_len = 0
@@ -61,29 +216,92 @@ class RAGService:
             else:
                 break
 
-        context_text = "\n\n".join(context_parts)
+        prefix, separator, suffix = self._prompt_parts(query)
+        return prefix + separator.join(context_parts) + suffix
 
-        if self.is_t5:
-            # T5 instruction-following format
-            prompt = f"Answer the question based on the context below.\n\nContext:\n{context_text}\n\nQuestion: {query}\n\nAnswer:"
-        else:
-            # GPT-2 completion format
-            prompt = f"""Use the following context to answer the question.
-            
-Context:
-{context_text}
+    def construct_prompt_ids(
+        self,
+        query: str,
+        context_chunks: List[Dict],
+        max_new_tokens: int = 150,
+    ) -> List[int]:
+        """
+        Construct the generation prompt as token ids within a token budget.
 
-Question: {query}
-Answer:"""
+        Context comes from the chunk token cache, so only the question is
+        tokenized per request. Chunks are added in rank order while they
+        fit; the first one that doesn't is truncated to fill the rest of
+        the budget (if at least Config.MIN_PARTIAL_CHUNK_TOKENS fit),
+        starting at the best-ranked member of a merged span.
 
-        return prompt
+        Args:
+            query: User question.
+            context_chunks: Retrieved context chunks.
+            max_new_tokens: Tokens to be generated (GPT-2 shares its context
+                window between prompt and answer).
 
-    def answer_question(self, query: str) -> Dict:
+        Returns:
+            Prompt token ids, special tokens included.
+        """
+        context_chunks = self.compress_context(
+            query, self.consolidate_context(context_chunks)
+        )
+        token_cache = self.get_token_cache()
+        tokenizer = self.model_service.tokenizer
+        _, _, suffix = self._prompt_parts(query)
+        suffix_ids = tokenizer(suffix, add_special_tokens=False).input_ids
+        separator_ids = self._prompt_separator_ids
+
+        budget = (
+            self.model_service.prompt_token_budget(max_new_tokens)
+            - tokenizer.num_special_tokens_to_add()
+            - len(self._prompt_prefix_ids)
+        )
+        # Keep room for context even if the question is very long
+        suffix_ids = suffix_ids[-max(budget // 2, 1) :]
+        budget -= len(suffix_ids)
+
+        context_ids = []
+        for chunk in context_chunks:
+            chunk_ids = token_cache.get(chunk)
+            cost = len(chunk_ids) + (len(separator_ids) if context_ids else 0)
+            if cost > budget:
+                remaining = budget - (cost - len(chunk_ids))
+                if remaining >= Config.MIN_PARTIAL_CHUNK_TOKENS:
+                    # A merged span is cut from its best-ranked member on,
+                    # dropping lower-ranked text before it first
+                    chunk_ids = token_cache.from_word(
+                        chunk, chunk_ids, chunk.get("focus_word", 0)
+                    )
+                    if context_ids:
+                        context_ids.extend(separator_ids)
+                    context_ids.extend(chunk_ids[:remaining].tolist())
+                break
+            if context_ids:
+                context_ids.extend(separator_ids)
+            context_ids.extend(chunk_ids.tolist())
+            budget -= cost
+
+        return tokenizer.build_inputs_with_special_tokens(
+            self._prompt_prefix_ids + context_ids + suffix_ids
+        )
+
+    def answer_question(
+        self,
+        query: str,
+        use_cache: bool = True,
+        decoding_profile: Optional[str] = None,
+    ) -> Dict:
         """
         Run the full RAG pipeline: retrieve, construct prompt, generate.
 
         Args:
             query: User question.
+            use_cache: Reuse the answer of a near-identical earlier query.
+                Evaluation turns this off so every question is answered.
+            decoding_profile: Decoding profile name (default
+                Config.DECODING_PROFILE). Answers with an explicit profile
+                bypass the answer cache.
 
         Returns:
             Dictionary with query, answer, and retrieved_chunks.
@@ -91,60 +309,361 @@ Answer:"""
         if self.retriever.vector_index.index is None:
             self.initialize()
 
+        use_cache = (
+            use_cache
+            and decoding_profile is None
+            and self.answer_cache.enabled
+        )
+        if use_cache:
+            cached, vector, version = self._cached_answer(query, "answer")
+            if cached is not None:
+                return {
+                    "query": query,
+                    "answer": cached["answer"],
+                    "retrieved_chunks": cached["retrieved_chunks"],
+                }
+
         # Retrieve relevant context
         print(f"Retrieving context for: {query}")
         retrieved_chunks_scores = self.retriever.retrieve(query)
         retrieved_chunks = [c for c, s in retrieved_chunks_scores]
 
         # Construct prompt
-        prompt = self.construct_prompt(query, retrieved_chunks)
+        prompt = self.construct_prompt_ids(query, retrieved_chunks)
 
         # Generate answer
         print("Generating answer...")
-        answer = self.model_service.generate(prompt, max_new_tokens=150)
+        answer = self.model_service.generate(
+            prompt, max_new_tokens=150, profile=decoding_profile
+        )
 
-        return {
+        result = {
             "query": query,
             "answer": answer,
             "retrieved_chunks": retrieved_chunks,  # Return all TOP_N (5), not truncated to 3
         }
+        if use_cache:
+            self.answer_cache.put(vector, version, result, namespace="answer")
+        return result
 
-    def answer_question_with_details(self, query: str) -> Dict:
+    def answer_questions(
+        self, queries: List[str], decoding_profile: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Answers many questions with batched retrieval and generation.
+
+        Used by evaluation, so the semantic answer cache is bypassed.
+
+        Args:
+            queries: User questions.
+            decoding_profile: Decoding profile name (default
+                Config.DECODING_PROFILE).
+
+        Returns:
+            One dictionary (query, answer, retrieved_chunks) per query.
+        """
+        if self.retriever.vector_index.index is None:
+            self.initialize()
+
+        print(f"Retrieving context for {len(queries)} questions...")
+        batch_results = self.retriever.retrieve_batch(queries)
+        retrieved = [[c for c, s in results] for results in batch_results]
+
+        prompts = [
+            self.construct_prompt_ids(query, chunks)
+            for query, chunks in zip(queries, retrieved)
+        ]
+
+        print(f"Generating {len(prompts)} answers...")
+        answers = self.model_service.generate_batch(
+            prompts, max_new_tokens=150, profile=decoding_profile
+        )
+
+        return [
+            {"query": query, "answer": answer, "retrieved_chunks": chunks}
+            for query, answer, chunks in zip(queries, answers, retrieved)
+        ]
+
+    async def aanswer_question(
+        self,
+        query: str,
+        timeout: Optional[float] = None,
+        use_cache: bool = True,
+        decoding_profile: Optional[str] = None,
+    ) -> Dict:
+        """
+        Async version of answer_question for serving from an event loop.
+
+        Retrieval runs on the retriever's executor and generation on the
+        bounded generation executor, so many in-flight requests share the
+        loaded models without a thread per request. On cancellation or
+        timeout, queued work is dropped and a running generation stops
+        after its current decoding step.
+
+        Args:
+            query: User question.
+            timeout: Seconds before asyncio.TimeoutError
+                (default Config.ASYNC_TIMEOUT_SECONDS, None = no limit).
+            use_cache: Reuse the answer of a near-identical earlier query.
+            decoding_profile: Decoding profile name (default
+                Config.DECODING_PROFILE). Answers with an explicit profile
+                bypass the answer cache.
+
+        Returns:
+            Dictionary with query, answer, and retrieved_chunks.
+        """
+        if timeout is None:
+            timeout = Config.ASYNC_TIMEOUT_SECONDS
+
+        stop_event = threading.Event()
+        try:
+            return await asyncio.wait_for(
+                self._aanswer_question(
+                    query, stop_event, use_cache, decoding_profile
+                ),
+                timeout,
+            )
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            # The executor thread can't be interrupted; tell generate() to
+            # stop at the next decoding step instead
+            stop_event.set()
+            raise
+
+    async def _aanswer_question(
+        self,
+        query: str,
+        stop_event: threading.Event,
+        use_cache: bool,
+        decoding_profile: Optional[str],
+    ) -> Dict:
+        loop = asyncio.get_running_loop()
+        if self.retriever.vector_index.index is None:
+            await loop.run_in_executor(None, self.ensure_initialized)
+
+        use_cache = (
+            use_cache
+            and decoding_profile is None
+            and self.answer_cache.enabled
+        )
+        if use_cache:
+            cached, vector, version = await loop.run_in_executor(
+                self.retriever.executor, self._cached_answer, query, "answer"
+            )
+            if cached is not None:
+                return {
+                    "query": query,
+                    "answer": cached["answer"],
+                    "retrieved_chunks": cached["retrieved_chunks"],
+                }
+
+        print(f"Retrieving context for: {query}")
+        retrieved_chunks_scores = await self.retriever.aretrieve(query)
+        retrieved_chunks = [c for c, s in retrieved_chunks_scores]
+
+        # Tokenization and compression are CPU-bound too
+        prompt = await loop.run_in_executor(
+            self.retriever.executor,
+            self.construct_prompt_ids,
+            query,
+            retrieved_chunks,
+        )
+
+        print("Generating answer...")
+        answer = await loop.run_in_executor(
+            self.generation_executor,
+            partial(
+                self.model_service.generate,
+                prompt,
+                max_new_tokens=150,
+                stop_event=stop_event,
+                profile=decoding_profile,
+            ),
+        )
+
+        result = {
+            "query": query,
+            "answer": answer,
+            "retrieved_chunks": retrieved_chunks,
+        }
+        if use_cache:
+            self.answer_cache.put(vector, version, result, namespace="answer")
+        return result
+
+    def answer_question_with_details(
+        self,
+        query: str,
+        use_cache: bool = True,
+        decoding_profile: Optional[str] = None,
+    ) -> Dict:
         """
         Run RAG pipeline with detailed retrieval scores for UI display.
 
+        Args:
+            query: User question.
+            use_cache: Reuse the answer of a near-identical earlier query.
+            decoding_profile: Decoding profile name (default
+                Config.DECODING_PROFILE). Answers with an explicit profile
+                bypass the answer cache.
+
         Returns:
-            Dictionary with answer, chunks with individual scores, and timing.
+            Dictionary with answer, chunks with individual scores, and
+            timing. Answers served from the semantic cache have zero
+            timings and "cache_hit" set.
         """
         import time
 
         if self.retriever.vector_index.index is None:
             self.initialize()
 
-        # Retrieve with detailed scores
-        print(f"Retrieving context for: {query}")
-        retrieval_result = self.retriever.retrieve_with_details(query)
+        use_cache = (
+            use_cache
+            and decoding_profile is None
+            and self.answer_cache.enabled
+        )
+        if use_cache:
+            cached, vector, version = self._cached_answer(query, "details")
+            if cached is not None:
+                return self._cached_details(query, cached)
+
+        retrieval_result, prompt = self._detailed_context(query)
         enriched_chunks = retrieval_result["final_results"]
 
-        # Construct prompt using basic chunk structure
-        chunks_for_prompt = [
-            {"content": c["content"], "title": c["title"]}
-            for c in enriched_chunks
-        ]
-        prompt = self.construct_prompt(query, chunks_for_prompt)
-
         # Generate answer with timing
         print("Generating answer...")
         start = time.time()
-        answer = self.model_service.generate(prompt, max_new_tokens=150)
+        answer = self.model_service.generate(
+            prompt, max_new_tokens=150, profile=decoding_profile
+        )
         generation_ms = (time.time() - start) * 1000
 
-        return {
+        result = {
             "query": query,
             "answer": answer,
             "retrieved_chunks": enriched_chunks[:5],
             "timing": retrieval_result["timing"],
             "generation_ms": round(generation_ms, 2),
+            "cache_hit": False,
+        }
+        if use_cache:
+            self.answer_cache.put(vector, version, result, namespace="details")
+        return result
+
+    def stream_answer_with_details(
+        self,
+        query: str,
+        use_cache: bool = True,
+        decoding_profile: Optional[str] = None,
+    ) -> Iterator[Dict]:
+        """
+        Streaming variant of answer_question_with_details for the UI.
+
+        Yields event dicts: one "retrieval" event (retrieved_chunks and
+        timing) as soon as context is ready, a "token" event per piece of
+        generated text, then a "done" event holding the same fields as
+        answer_question_with_details plus time_to_first_token_ms.
+        Beam profiles stream greedily (see ModelService.generate_stream);
+        decoding_profile and use_cache are as in answer_question_with_details.
+        """
+        import time
+
+        if self.retriever.vector_index.index is None:
+            self.initialize()
+
+        use_cache = (
+            use_cache
+            and decoding_profile is None
+            and self.answer_cache.enabled
+        )
+        if use_cache:
+            cached, vector, version = self._cached_answer(query, "details")
+            if cached is not None:
+                result = self._cached_details(query, cached)
+                yield {
+                    "event": "retrieval",
+                    "retrieved_chunks": result["retrieved_chunks"],
+                    "timing": result["timing"],
+                }
+                yield {"event": "token", "text": result["answer"]}
+                yield dict(result, event="done", time_to_first_token_ms=0.0)
+                return
+
+        retrieval_result, prompt = self._detailed_context(query)
+        enriched_chunks = retrieval_result["final_results"][:5]
+        yield {
+            "event": "retrieval",
+            "retrieved_chunks": enriched_chunks,
+            "timing": retrieval_result["timing"],
+        }
+
+        print("Streaming answer...")
+        start = time.time()
+        first_token_ms = None
+        pieces = []
+        for text in self.model_service.generate_stream(
+            prompt, max_new_tokens=150, profile=decoding_profile
+        ):
+            if first_token_ms is None:
+                first_token_ms = (time.time() - start) * 1000
+            pieces.append(text)
+            yield {"event": "token", "text": text}
+        generation_ms = (time.time() - start) * 1000
+
+        result = {
+            "query": query,
+            "answer": "".join(pieces).strip(),
+            "retrieved_chunks": enriched_chunks,
+            "timing": retrieval_result["timing"],
+            "generation_ms": round(generation_ms, 2),
+            "cache_hit": False,
+        }
+        if use_cache:
+            self.answer_cache.put(vector, version, result, namespace="details")
+        yield dict(
+            result,
+            event="done",
+            time_to_first_token_ms=round(first_token_ms or generation_ms, 2),
+        )
+
+    def _detailed_context(self, query: str):
+        """
+        Retrieves with per-leg scores and builds the prompt.
+
+        Returns:
+            Tuple of (retrieve_with_details result, prompt).
+        """
+        # Retrieve with detailed scores
+        print(f"Retrieving context for: {query}")
+        retrieval_result = self.retriever.retrieve_with_details(query)
+
+        # Construct prompt using basic chunk structure
+        chunks_for_prompt = [
+            {
+                "chunk_id": c.get("chunk_id"),
+                "url": c["url"],
+                "content": c["content"],
+                "title": c["title"],
+                "start_token": c.get("start_token", -1),
+            }
+            for c in retrieval_result["final_results"]
+        ]
+        prompt = self.construct_prompt_ids(query, chunks_for_prompt)
+        return retrieval_result, prompt
+
+    def _cached_details(self, query: str, cached: Dict) -> Dict:
+        """Details-shaped result for an answer cache hit (zero timings)."""
+        return {
+            "query": query,
+            "answer": cached["answer"],
+            "retrieved_chunks": cached["retrieved_chunks"][:5],
+            "timing": {
+                "dense_ms": 0.0,
+                "sparse_ms": 0.0,
+                "rrf_ms": 0.0,
+                "total_ms": 0.0,
+            },
+            "generation_ms": 0.0,
+            "cache_hit": True,
+            "cached_query": cached["query"],
         }
 
 
@@ -160,3 +679,22 @@ if __name__ == "__main__":
     print("SOURCES:")
     for chunk in result["retrieved_chunks"]:
         print(f"- {chunk['title']}")
+
+    # Async API: several questions in flight, sharing the loaded models
+    async def answer_all(questions: List[str]) -> List[Dict]:
+        return await asyncio.gather(
+            *(rag.aanswer_question(q, timeout=120) for q in questions)
+        )
+
+    questions = ["Who was Aristotle?", "What is the scientific method?"]
+    for result in asyncio.run(answer_all(questions)):
+        print(f"\nQUERY: {result['query']}")
+        print(f"ANSWER: {result['answer']}")
+
+    # Streaming: print the answer as it is generated
+    print(f"\nQUERY: {query}\nANSWER: ", end="")
+    for event in rag.stream_answer_with_details(query, use_cache=False):
+        if event["event"] == "token":
+            print(event["text"], end="", flush=True)
+        elif event["event"] == "done":
+            print(f"\n(first token {event['time_to_first_token_ms']}ms)")
@@ -0,0 +1,273 @@
+"""
+Chunk token cache.
+
+Token ids of every corpus chunk under the generator's tokenizer, computed
+once (in bulk, with the fast tokenizer) so prompts can be assembled from
+ids instead of re-tokenizing retrieved context on every request. Ids are
+stored CSR-style as flat NumPy arrays, saved as .npy files and
+memory-mapped on load. Chunk ids are UUIDs whose text never changes, so
+only chunks the cache hasn't seen are ever tokenized.
+
+Merged context spans are assembled from their members' ids, cut at the
+word where each member's new text starts (tokens that begin a word carry
+the tokenizer's word-start marker).
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+ARRAY_NAMES = ("chunk_ids", "offsets", "token_ids")
+# Word-start markers of SentencePiece (T5) and byte-level BPE (GPT-2)
+WORD_START_MARKERS = ("\u2581", "\u0120")
+
+
+class ChunkTokenCache:
+    """
+    Chunk id -> token ids (without special tokens).
+
+    ``chunk_ids`` is sorted; the tokens of ``chunk_ids[i]`` are
+    ``token_ids[offsets[i]:offsets[i + 1]]``. Chunks added after the cache
+    was built are tokenized on first use and kept in a bounded in-memory
+    LRU; merged context spans are never cached.
+    """
+
+    def __init__(
+        self,
+        tokenizer,
+        tokenizer_name: str,
+        path: Optional[Path] = None,
+        extra_size: int = 4096,
+    ):
+        """
+        Initialize an empty cache.
+
+        Args:
+            tokenizer: Generator tokenizer (fast tokenizers batch much
+                faster).
+            tokenizer_name: Model name; a saved cache of another
+                tokenizer is rebuilt.
+            path: Directory to persist the cache in (None = memory only).
+            extra_size: Chunks tokenized on use that are kept in memory.
+        """
+        self.tokenizer = tokenizer
+        self.tokenizer_name = tokenizer_name
+        self.path = Path(path) if path else None
+        self.chunk_ids = np.zeros(0, dtype="S1")
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.token_ids = np.zeros(0, dtype=np.int32)
+        self.extra_size = extra_size
+        self.extra: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.word_starts = None  # Vocabulary mask, built on first merge
+        self.lock = threading.Lock()
+
+    def load_or_build(self, store) -> "ChunkTokenCache":
+        """
+        Loads the saved cache and tokenizes the store's chunks missing
+        from it (all of them on first run), then saves the result.
+
+        Args:
+            store: ChunkStore with the current corpus.
+        """
+        if self.path is not None:
+            self._load()
+
+        cached = self._positions(store.chunk_ids)
+        missing = np.flatnonzero(cached < 0)
+        if not len(missing) and len(self.chunk_ids) == len(store):
+            return self
+
+        print(f"Tokenizing {len(missing)} chunks for the generator...")
+        encoded = self.tokenizer(
+            list(store.texts(missing)), add_special_tokens=False
+        ).input_ids
+
+        # Rebuild from the store's chunks only, dropping removed ones
+        tokens: List[np.ndarray] = [None] * len(store)
+        for row in np.flatnonzero(cached >= 0):
+            tokens[row] = self._slice(cached[row])
+        for row, ids in zip(missing, encoded):
+            tokens[row] = np.asarray(ids, dtype=np.int32)
+
+        order = np.argsort(store.chunk_ids, kind="stable")
+        lengths = np.array([len(tokens[row]) for row in order], np.int64)
+        self.chunk_ids = np.asarray(store.chunk_ids)[order]
+        self.offsets = np.concatenate(([0], np.cumsum(lengths)))
+        self.token_ids = (
+            np.concatenate([tokens[row] for row in order])
+            if len(order)
+            else np.zeros(0, dtype=np.int32)
+        )
+        self.extra = OrderedDict()
+
+        if self.path is not None:
+            self.save()
+        return self
+
+    def get(self, chunk: Dict) -> np.ndarray:
+        """
+        Token ids of a chunk dict, tokenizing it if not cached.
+
+        Merged spans (with ``parts``, see ContextConsolidator) are joined
+        from their members' ids, or tokenized if that isn't possible;
+        chunks without an id (e.g. compressed ones) are always tokenized.
+        """
+        chunk_id = chunk.get("chunk_id")
+        if chunk_id is not None and "parts" in chunk:
+            ids = self._join_parts(chunk["parts"])
+            if ids is None:
+                ids = self._tokenize(chunk["content"])
+            return ids
+
+        if chunk_id is not None:
+            ids = self._cached(chunk_id)
+            if ids is not None:
+                return ids
+
+        ids = self._tokenize(chunk["content"])
+        if chunk_id is not None:
+            with self.lock:
+                self.extra[chunk_id] = ids
+                while len(self.extra) > self.extra_size:
+                    self.extra.popitem(last=False)
+        return ids
+
+    def from_word(self, chunk: Dict, ids: np.ndarray, word: int) -> np.ndarray:
+        """
+        Token ids of a chunk from its ``word``-th word on.
+
+        Args:
+            chunk: Chunk dict whose ids are ``ids`` (from get()).
+            ids: Token ids of the whole chunk.
+            word: Index of the first word to keep.
+        """
+        if not word:
+            return ids
+        words = chunk["content"].split()
+        word_starts = self._word_start_mask()
+        if len(ids) and ids.max() < len(word_starts):
+            starts = word_starts[ids]
+            starts[0] = True
+            positions = np.flatnonzero(starts)
+            if len(positions) == len(words):
+                return ids[positions[word] :]
+        return self._tokenize(" ".join(words[word:]))
+
+    def _cached(self, chunk_id: str) -> Optional[np.ndarray]:
+        """Cached token ids of a chunk id, or None."""
+        position = self._positions(np.array([chunk_id.encode()]))[0]
+        if position >= 0:
+            return self._slice(position)
+        with self.lock:
+            if chunk_id in self.extra:
+                self.extra.move_to_end(chunk_id)
+                return self.extra[chunk_id]
+        return None
+
+    def _tokenize(self, text: str) -> np.ndarray:
+        return np.asarray(
+            self.tokenizer(text, add_special_tokens=False).input_ids,
+            dtype=np.int32,
+        )
+
+    def _join_parts(self, parts: List) -> Optional[np.ndarray]:
+        """
+        Concatenates the members' ids of a merged span, each from the
+        token starting its first visible word.
+
+        Returns:
+            Token ids, or None if a member isn't cached or its tokens
+            can't be matched to its words.
+        """
+        word_starts = self._word_start_mask()
+        pieces = []
+        for i, (chunk_id, skip, num_words) in enumerate(parts):
+            ids = self._cached(chunk_id) if chunk_id is not None else None
+            if ids is None or not len(ids) or ids.max() >= len(word_starts):
+                return None
+            starts = word_starts[ids]
+            if i and not skip and not starts[0]:
+                # Chunk-initial token without the space it now follows
+                return None
+            starts[0] = True
+            positions = np.flatnonzero(starts)
+            if len(positions) != num_words:
+                return None
+            pieces.append(ids[positions[skip] :])
+        if not pieces:
+            return None
+        return np.concatenate(pieces)
+
+    def _word_start_mask(self) -> np.ndarray:
+        """Whether each vocabulary token begins a word."""
+        with self.lock:
+            if self.word_starts is None:
+                tokens = self.tokenizer.convert_ids_to_tokens(
+                    list(range(len(self.tokenizer)))
+                )
+                self.word_starts = np.array(
+                    [
+                        isinstance(token, str)
+                        and token.startswith(WORD_START_MARKERS)
+                        for token in tokens
+                    ],
+                    dtype=bool,
+                )
+            return self.word_starts
+
+    def _slice(self, position: int) -> np.ndarray:
+        return self.token_ids[
+            self.offsets[position] : self.offsets[position + 1]
+        ]
+
+    def _positions(self, keys: np.ndarray) -> np.ndarray:
+        """Positions of chunk ids in the cache, -1 where missing."""
+        positions = np.full(len(keys), -1, dtype=np.int64)
+        if not len(keys) or not len(self.chunk_ids):
+            return positions
+        found_at = np.searchsorted(self.chunk_ids, keys)
+        found_at = np.minimum(found_at, len(self.chunk_ids) - 1)
+        found = self.chunk_ids[found_at] == keys
+        positions[found] = found_at[found]
+        return positions
+
+    def save(self):
+        """Writes the arrays as .npy files plus a JSON header."""
+        self.path.mkdir(parents=True, exist_ok=True)
+        for name in ARRAY_NAMES:
+            # Replace, don't overwrite: the old file may be mapped
+            tmp_path = self.path / f".{name}.npy"
+            np.save(tmp_path, getattr(self, name))
+            os.replace(tmp_path, self.path / f"{name}.npy")
+        with open(self.path / "tokens.json", "w") as f:
+            json.dump(
+                {
+                    "tokenizer": self.tokenizer_name,
+                    "num_chunks": len(self.chunk_ids),
+                },
+                f,
+                indent=2,
+            )
+
+    def _load(self) -> bool:
+        """Memory-maps a saved cache of the same tokenizer, if any."""
+        header_path = self.path / "tokens.json"
+        if not header_path.exists():
+            return False
+        with open(header_path, "r") as f:
+            header = json.load(f)
+        if header["tokenizer"] != self.tokenizer_name:
+            return False
+
+        for name in ARRAY_NAMES:
+            setattr(
+                self,
+                name,
+                np.load(self.path / f"{name}.npy", mmap_mode="r"),
+            )
+        return True
@@ -0,0 +1,233 @@
+"""
+ONNX Runtime backend for the embedding encoder and the generator.
+
+Exports the configured models to ONNX under Config.ONNX_DIR, optionally
+with int8 dynamic quantization, and loads them into ONNX Runtime sessions
+with all graph optimizations enabled:
+- encoder/: sentence-transformers model (onnx/model.onnx, plus
+  onnx/model_qint8_<arch>.onnx when quantized)
+- generator/: optimum export of the generation model (int8/ subfolder
+  when quantized)
+- export.json: which models were exported and whether int8 files exist
+
+Selected with Config.INFERENCE_BACKEND = "onnx". The loaders return None
+(callers fall back to PyTorch) when optimum/onnxruntime are missing or
+no export of the configured model exists.
+
+Export once with: python -m src.onnx_backend
+"""
+
+import json
+import shutil
+import sys
+import os
+import time
+from typing import Optional
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from src.config import Config
+
+EXPORT_META = "export.json"
+
+
+def _session_options():
+    """ONNX Runtime session settings shared by both models."""
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = (
+        ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    )
+    return options
+
+
+def _read_export_meta() -> Optional[dict]:
+    path = Config.ONNX_DIR / EXPORT_META
+    if not path.exists():
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _encoder_file_name() -> str:
+    if Config.ONNX_INT8:
+        return f"onnx/model_qint8_{Config.ONNX_QUANTIZATION_ARCH}.onnx"
+    return "onnx/model.onnx"
+
+
+def export_models(quantize: bool = False):
+    """
+    Exports the embedding and generation models to ONNX.
+
+    Args:
+        quantize: Also write int8 dynamically quantized copies.
+    """
+    from sentence_transformers import (
+        SentenceTransformer,
+        export_dynamic_quantized_onnx_model,
+    )
+    from optimum.onnxruntime import ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    Config.ONNX_DIR.mkdir(parents=True, exist_ok=True)
+    encoder_dir = Config.ONNX_DIR / "encoder"
+    generator_dir = Config.ONNX_DIR / "generator"
+
+    # Encoder: sentence-transformers exports through optimum on load
+    print(f"Exporting {Config.EMBEDDING_MODEL_NAME} to {encoder_dir}...")
+    encoder = SentenceTransformer(
+        Config.EMBEDDING_MODEL_NAME, device="cpu", backend="onnx"
+    )
+    encoder.save(str(encoder_dir))
+    if quantize:
+        export_dynamic_quantized_onnx_model(
+            encoder, Config.ONNX_QUANTIZATION_ARCH, str(encoder_dir)
+        )
+
+    # Generator: encoder/decoder (T5) or decoder-only (GPT-2) graphs
+    print(f"Exporting {Config.GENERATION_MODEL} to {generator_dir}...")
+    model_class = _generator_class("t5" in Config.GENERATION_MODEL.lower())
+    generator = model_class.from_pretrained(
+        Config.GENERATION_MODEL, export=True
+    )
+    generator.save_pretrained(generator_dir)
+
+    if quantize:
+        int8_dir = generator_dir / "int8"
+        quantization_config = getattr(
+            AutoQuantizationConfig, Config.ONNX_QUANTIZATION_ARCH
+        )(is_static=False, per_channel=False)
+        for onnx_file in sorted(generator_dir.glob("*.onnx")):
+            print(f"Quantizing {onnx_file.name}...")
+            quantizer = ORTQuantizer.from_pretrained(
+                generator_dir, file_name=onnx_file.name
+            )
+            # Same file names in int8/, so it loads like the fp32 export
+            quantizer.quantize(
+                save_dir=int8_dir,
+                quantization_config=quantization_config,
+                file_suffix="",
+            )
+        for path in generator_dir.iterdir():
+            if path.is_file() and path.suffix != ".onnx":
+                shutil.copy(path, int8_dir / path.name)
+
+    # Written last: loaders only trust complete exports
+    with open(Config.ONNX_DIR / EXPORT_META, "w") as f:
+        json.dump(
+            {
+                "embedding_model": Config.EMBEDDING_MODEL_NAME,
+                "generation_model": Config.GENERATION_MODEL,
+                "quantized": quantize,
+                "quantization_arch": Config.ONNX_QUANTIZATION_ARCH,
+            },
+            f,
+            indent=2,
+        )
+    print("ONNX export complete.")
+
+
+def _generator_class(is_t5: bool):
+    from optimum.onnxruntime import ORTModelForCausalLM, ORTModelForSeq2SeqLM
+
+    return ORTModelForSeq2SeqLM if is_t5 else ORTModelForCausalLM
+
+
+def _usable_export(model_key: str, model_name: str) -> bool:
+    """Whether an export of model_name (with int8 files if needed) exists."""
+    meta = _read_export_meta()
+    if meta is None or meta.get(model_key) != model_name:
+        print(
+            f"No ONNX export of {model_name} in {Config.ONNX_DIR} "
+            f"(run python -m src.onnx_backend); using PyTorch."
+        )
+        return False
+    if Config.ONNX_INT8 and not (
+        meta.get("quantized")
+        and meta.get("quantization_arch") == Config.ONNX_QUANTIZATION_ARCH
+    ):
+        print(
+            f"ONNX export of {model_name} has no "
+            f"{Config.ONNX_QUANTIZATION_ARCH} int8 files; using PyTorch."
+        )
+        return False
+    return True
+
+
+def load_onnx_encoder(model_name: str):
+    """
+    Loads the exported sentence-transformers encoder on ONNX Runtime.
+
+    Returns:
+        SentenceTransformer with the ONNX backend, or None to fall back.
+    """
+    if not _usable_export("embedding_model", model_name):
+        return None
+    try:
+        from sentence_transformers import SentenceTransformer
+
+        return SentenceTransformer(
+            str(Config.ONNX_DIR / "encoder"),
+            device="cpu",
+            backend="onnx",
+            model_kwargs={
+                "file_name": _encoder_file_name(),
+                "provider": "CPUExecutionProvider",
+                "session_options": _session_options(),
+            },
+        )
+    except ImportError as e:
+        print(f"ONNX Runtime unavailable ({e}); using PyTorch.")
+        return None
+
+
+def load_onnx_generator(model_name: str, is_t5: bool):
+    """
+    Loads the exported generation model on ONNX Runtime.
+
+    The returned model supports the same generate() API as the
+    transformers model.
+
+    Returns:
+        optimum ORTModel, or None to fall back.
+    """
+    if not _usable_export("generation_model", model_name):
+        return None
+    model_dir = Config.ONNX_DIR / "generator"
+    if Config.ONNX_INT8:
+        model_dir = model_dir / "int8"
+    try:
+        return _generator_class(is_t5).from_pretrained(
+            model_dir,
+            provider="CPUExecutionProvider",
+            session_options=_session_options(),
+        )
+    except ImportError as e:
+        print(f"ONNX Runtime unavailable ({e}); using PyTorch.")
+        return None
+
+
+if __name__ == "__main__":
+    export_models(quantize=Config.ONNX_INT8)
+
+    # Compare encoder latency of both backends on CPU
+    from sentence_transformers import SentenceTransformer
+
+    queries = [f"What is the history of topic number {i}?" for i in range(64)]
+    backends = {
+        "torch": SentenceTransformer(
+            Config.EMBEDDING_MODEL_NAME, device="cpu"
+        ),
+        "onnx": load_onnx_encoder(Config.EMBEDDING_MODEL_NAME),
+    }
+    for name, encoder in backends.items():
+        if encoder is None:
+            continue
+        encoder.encode(queries[:2])  # Warm up
+        start = time.time()
+        encoder.encode(queries, batch_size=1)
+        print(
+            f"{name:>6}: {(time.time() - start) * 1000 / len(queries):.2f} "
+            f"ms/query"
+        )
@@ -0,0 +1,402 @@
+"""
+Inverted-index BM25 scorer.
+
+Stores one posting list per term (document ids plus precomputed BM25 term
+impacts) so a query only touches the documents that contain at least one of
+its terms, instead of scoring the whole corpus. Scores are identical to
+rank_bm25's BM25Okapi (same k1, b and epsilon-floored IDF).
+
+Every part of the index, including the vocabulary, is a flat NumPy array,
+so it can be saved as .npy files and memory-mapped on load. Raw term
+frequencies and document lengths are kept alongside the impacts, so
+documents can be added or removed without re-tokenizing the corpus.
+"""
+
+import json
+import math
+import os
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+
+ARRAY_NAMES = ("terms", "idf", "doc_norms", "offsets", "doc_ids", "impacts")
+# Needed for add_documents/remove_documents; absent in older saved indexes
+UPDATE_ARRAYS = ("tfs", "doc_lens")
+
+
+class InvertedBM25:
+    """
+    BM25 (Okapi) index backed by NumPy posting lists.
+
+    Terms are kept as a sorted array of UTF-8 byte strings; a term's id is
+    its position in ``terms``. Postings are stored CSR-style: the documents
+    containing term ``t`` are ``doc_ids[offsets[t]:offsets[t + 1]]`` and
+    their score contributions are the matching slice of ``impacts``.
+    """
+
+    def __init__(
+        self, k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25
+    ):
+        """
+        Initialize an empty index.
+
+        Args:
+            k1: Term frequency saturation parameter.
+            b: Document length normalization strength.
+            epsilon: Floor for negative IDF values, as a fraction of mean IDF.
+        """
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+
+        self.num_docs = 0
+        self.avgdl = 0.0
+        self.terms = np.zeros(0, dtype="S1")
+        self.idf = np.zeros(0, dtype=np.float64)
+        self.doc_norms = np.zeros(0, dtype=np.float64)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.doc_ids = np.zeros(0, dtype=np.int32)
+        self.impacts = np.zeros(0, dtype=np.float64)
+        self.tfs = np.zeros(0, dtype=np.int32)
+        self.doc_lens = np.zeros(0, dtype=np.int64)
+
+    @property
+    def updatable(self) -> bool:
+        """Whether the index keeps what add/remove_documents need."""
+        return self.tfs is not None and self.doc_lens is not None
+
+    def fit(self, tokenized_corpus: List[List[str]]) -> "InvertedBM25":
+        """Builds posting lists, IDF and length norms from tokenized docs."""
+        self.num_docs = len(tokenized_corpus)
+        doc_len = np.array([len(doc) for doc in tokenized_corpus])
+        self.avgdl = float(doc_len.sum()) / self.num_docs
+
+        # Collect (term, doc, tf) triples, numbering terms by first use
+        vocab = {}
+        term_col, doc_col, tf_col = [], [], []
+        for doc_id, doc in enumerate(tokenized_corpus):
+            freqs = {}
+            for token in doc:
+                freqs[token] = freqs.get(token, 0) + 1
+            for token, tf in freqs.items():
+                term_id = vocab.setdefault(token, len(vocab))
+                term_col.append(term_id)
+                doc_col.append(doc_id)
+                tf_col.append(tf)
+
+        # IDF with BM25Okapi's epsilon floor for very common terms
+        doc_freq = np.bincount(term_col, minlength=len(vocab))
+        idf = np.array(
+            [
+                math.log(self.num_docs - df + 0.5) - math.log(df + 0.5)
+                for df in doc_freq
+            ],
+            dtype=np.float64,
+        )
+        # Sequential sum in first-use order (like BM25Okapi's dict), not
+        # np.sum, keeps scores bit-identical
+        average_idf = sum(idf.tolist()) / len(idf) if len(idf) else 0.0
+        idf[idf < 0] = self.epsilon * average_idf
+
+        # Renumber terms by sorted byte string so lookups can binary search
+        terms = np.array([t.encode("utf-8") for t in vocab], dtype=bytes)
+        sorted_order = np.argsort(terms, kind="stable")
+        new_id = np.empty(len(vocab), dtype=np.int64)
+        new_id[sorted_order] = np.arange(len(vocab))
+        self.terms = terms[sorted_order]
+        self.idf = idf[sorted_order]
+
+        term_col = new_id[np.array(term_col, dtype=np.int64)]
+        doc_col = np.array(doc_col, dtype=np.int32)
+        tf_col = np.array(tf_col, dtype=np.float64)
+
+        # Group postings by term (stable keeps doc ids ascending per term)
+        order = np.argsort(term_col, kind="stable")
+        term_col, doc_col, tf_col = (
+            term_col[order],
+            doc_col[order],
+            tf_col[order],
+        )
+        self.offsets = np.concatenate(
+            ([0], np.cumsum(doc_freq[sorted_order]))
+        ).astype(np.int64)
+
+        # Per-document length norm, then per-posting term impact
+        self.doc_norms = self.k1 * (1 - self.b + self.b * doc_len / self.avgdl)
+        self.doc_ids = doc_col
+        self.impacts = self.idf[term_col] * (
+            tf_col * (self.k1 + 1) / (tf_col + self.doc_norms[doc_col])
+        )
+        self.tfs = tf_col.astype(np.int32)
+        self.doc_lens = doc_len.astype(np.int64)
+        return self
+
+    def add_documents(self, tokenized_docs: List[List[str]]):
+        """
+        Appends documents under the next doc ids (num_docs, num_docs + 1,
+        ...) without touching the tokens of existing documents.
+
+        New postings are merged into the posting lists, then N, avgdl, df
+        and the impacts that depend on them are re-derived in vectorized
+        passes. Scores match a full fit() up to floating-point rounding of
+        the IDF floor.
+        """
+        if not tokenized_docs:
+            return
+
+        # (term, doc, tf) triples of the new documents only
+        vocab = {}
+        term_col, doc_col, tf_col = [], [], []
+        for doc_offset, doc in enumerate(tokenized_docs):
+            freqs = {}
+            for token in doc:
+                freqs[token] = freqs.get(token, 0) + 1
+            for token, tf in freqs.items():
+                term_col.append(vocab.setdefault(token, len(vocab)))
+                doc_col.append(self.num_docs + doc_offset)
+                tf_col.append(tf)
+
+        # Extend the sorted vocabulary with unseen terms
+        new_terms = list(vocab)
+        known = self.term_ids(new_terms)
+        unseen = [t for t, i in zip(new_terms, known) if i < 0]
+        terms = np.concatenate(
+            [
+                self.terms,
+                np.array([t.encode("utf-8") for t in unseen], dtype=bytes),
+            ]
+        )
+        sorted_order = np.argsort(terms, kind="stable")
+        new_id = np.empty(len(terms), dtype=np.int64)
+        new_id[sorted_order] = np.arange(len(terms))
+
+        # Term ids of the new postings in the extended vocabulary
+        local_id = known.copy()
+        local_id[known < 0] = len(self.terms) + np.arange(len(unseen))
+        added_terms = new_id[local_id[np.array(term_col, dtype=np.int64)]]
+        old_terms = new_id[
+            np.repeat(np.arange(len(self.terms)), np.diff(self.offsets))
+        ]
+
+        # Old postings come first, so doc ids stay ascending per term
+        all_terms = np.concatenate([old_terms, added_terms])
+        order = np.argsort(all_terms, kind="stable")
+        self.doc_ids = np.concatenate(
+            [self.doc_ids, np.array(doc_col, dtype=np.int32)]
+        )[order]
+        self.tfs = np.concatenate(
+            [self.tfs, np.array(tf_col, dtype=np.int32)]
+        )[order]
+        self.terms = terms[sorted_order]
+        self.offsets = np.concatenate(
+            ([0], np.cumsum(np.bincount(all_terms, minlength=len(terms))))
+        ).astype(np.int64)
+
+        self.doc_lens = np.concatenate(
+            [
+                self.doc_lens,
+                np.array([len(doc) for doc in tokenized_docs], np.int64),
+            ]
+        )
+        self.num_docs += len(tokenized_docs)
+        self._rescore()
+
+    def remove_documents(self, doc_ids: np.ndarray):
+        """
+        Drops documents and renumbers the rest in order, the same way
+        ChunkStore.remove_rows compacts rows (doc ids stay store rows).
+
+        Terms left without postings are dropped; N, avgdl, df and impacts
+        are re-derived as in add_documents.
+        """
+        keep_doc = np.ones(self.num_docs, dtype=bool)
+        keep_doc[np.asarray(doc_ids, dtype=np.int64)] = False
+        remap = np.full(self.num_docs, -1, dtype=np.int64)
+        remap[keep_doc] = np.arange(int(keep_doc.sum()))
+
+        term_col = np.repeat(np.arange(len(self.terms)), np.diff(self.offsets))
+        live = keep_doc[self.doc_ids]
+        term_col = term_col[live]
+        self.doc_ids = remap[self.doc_ids[live]].astype(np.int32)
+        self.tfs = self.tfs[live]
+
+        doc_freq = np.bincount(term_col, minlength=len(self.terms))
+        used = doc_freq > 0
+        self.terms = self.terms[used]
+        self.offsets = np.concatenate(([0], np.cumsum(doc_freq[used]))).astype(
+            np.int64
+        )
+
+        self.doc_lens = self.doc_lens[keep_doc]
+        self.num_docs = int(keep_doc.sum())
+        self._rescore()
+
+    def _rescore(self):
+        """Re-derives IDF, length norms and impacts from tfs/doc_lens."""
+        doc_freq = np.diff(self.offsets)
+        self.avgdl = (
+            float(self.doc_lens.sum()) / self.num_docs
+            if self.num_docs
+            else 0.0
+        )
+        idf = np.log(self.num_docs - doc_freq + 0.5) - np.log(doc_freq + 0.5)
+        average_idf = float(idf.mean()) if len(idf) else 0.0
+        idf[idf < 0] = self.epsilon * average_idf
+        self.idf = idf
+
+        self.doc_norms = self.k1 * (
+            1 - self.b + self.b * self.doc_lens / max(self.avgdl, 1e-9)
+        )
+        term_col = np.repeat(np.arange(len(self.terms)), doc_freq)
+        tfs = self.tfs.astype(np.float64)
+        self.impacts = self.idf[term_col] * (
+            tfs * (self.k1 + 1) / (tfs + self.doc_norms[self.doc_ids])
+        )
+
+    def save(self, directory: Path):
+        """Writes the index as one .npy file per array plus a JSON header."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        names = ARRAY_NAMES + (UPDATE_ARRAYS if self.updatable else ())
+        for name in names:
+            # Replace, don't overwrite: other processes may have it mapped
+            tmp_path = directory / f".{name}.npy"
+            np.save(tmp_path, getattr(self, name))
+            os.replace(tmp_path, directory / f"{name}.npy")
+        with open(directory / "bm25.json", "w") as f:
+            json.dump(
+                {
+                    "k1": self.k1,
+                    "b": self.b,
+                    "epsilon": self.epsilon,
+                    "num_docs": self.num_docs,
+                    "avgdl": self.avgdl,
+                },
+                f,
+                indent=2,
+            )
+
+    @classmethod
+    def load(cls, directory: Path, mmap: bool = True) -> "InvertedBM25":
+        """
+        Loads an index saved with save().
+
+        With mmap, arrays are memory-mapped read-only: loading is near
+        constant time and processes on one host share the same pages.
+        """
+        directory = Path(directory)
+        with open(directory / "bm25.json", "r") as f:
+            header = json.load(f)
+
+        index = cls(k1=header["k1"], b=header["b"], epsilon=header["epsilon"])
+        index.num_docs = header["num_docs"]
+        index.avgdl = header["avgdl"]
+        mmap_mode = "r" if mmap else None
+        for name in ARRAY_NAMES:
+            setattr(index, name, np.load(directory / f"{name}.npy", mmap_mode))
+        for name in UPDATE_ARRAYS:
+            # Indexes saved before updates were supported lack these
+            path = directory / f"{name}.npy"
+            setattr(
+                index,
+                name,
+                np.load(path, mmap_mode) if path.exists() else None,
+            )
+        return index
+
+    def term_ids(self, tokens: List[str]) -> np.ndarray:
+        """Maps tokens to term ids, -1 for tokens not in the vocabulary."""
+        if not tokens or not len(self.terms):
+            return np.full(len(tokens), -1, dtype=np.int64)
+
+        keys = np.array([t.encode("utf-8") for t in tokens], dtype=bytes)
+        positions = np.searchsorted(self.terms, keys)
+        positions = np.minimum(positions, len(self.terms) - 1)
+        found = self.terms[positions] == keys
+        return np.where(found, positions, -1)
+
+    def score_batch(
+        self, queries_tokens: List[List[str]]
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Scores many queries in one pass over their concatenated postings.
+
+        Returns:
+            One (doc_ids, scores) tuple per query for the documents sharing
+            a term with it, ordered by doc id.
+        """
+        # Resolve every token of every query in one vocabulary lookup
+        all_ids = self.term_ids(
+            [t for tokens in queries_tokens for t in tokens]
+        )
+        query_of_token = np.repeat(
+            np.arange(len(queries_tokens)),
+            [len(tokens) for tokens in queries_tokens],
+        )
+
+        query_col, docs, impacts = [], [], []
+        for query_idx, term_id in zip(query_of_token, all_ids):
+            if term_id >= 0:
+                start, end = self.offsets[term_id], self.offsets[term_id + 1]
+                query_col.append(np.full(end - start, query_idx, np.int64))
+                docs.append(self.doc_ids[start:end])
+                impacts.append(self.impacts[start:end])
+
+        empty = (np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float64))
+        if not docs:
+            return [empty] * len(queries_tokens)
+
+        # Accumulate per (query, document) key; bincount adds in posting
+        # order, i.e. query-term order like BM25Okapi
+        keys = np.concatenate(query_col) * self.num_docs + np.concatenate(docs)
+        matched, inverse = np.unique(keys, return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(impacts))
+
+        # Keys are sorted, so each query's matches form one contiguous run
+        match_query = matched // self.num_docs
+        match_doc = (matched % self.num_docs).astype(np.int32)
+        bounds = np.searchsorted(
+            match_query, np.arange(len(queries_tokens) + 1)
+        )
+        return [
+            (match_doc[start:end], scores[start:end])
+            for start, end in zip(bounds[:-1], bounds[1:])
+        ]
+
+    def top_k_batch(
+        self, queries_tokens: List[List[str]], k: int
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Returns the k best-scoring documents with a positive score per query.
+
+        Returns:
+            One (doc_ids, scores) tuple per query, sorted by score descending.
+        """
+        results = []
+        for doc_ids, scores in self.score_batch(queries_tokens):
+            if k <= 0:
+                results.append((doc_ids[:0], scores[:0]))
+                continue
+
+            positive = scores > 0
+            doc_ids, scores = doc_ids[positive], scores[positive]
+
+            if len(scores) > k:
+                top = np.argpartition(-scores, k - 1)[:k]
+                doc_ids, scores = doc_ids[top], scores[top]
+
+            order = np.lexsort((doc_ids, -scores))
+            results.append((doc_ids[order], scores[order]))
+        return results
+
+    def top_k(
+        self, query_tokens: List[str], k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the k best-scoring documents with a positive score.
+
+        Returns:
+            Tuple of (doc_ids, scores) sorted by score descending.
+        """
+        return self.top_k_batch([query_tokens], k)[0]
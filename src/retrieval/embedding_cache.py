@@ -0,0 +1,164 @@
+"""
+Embedding cache module.
+
+Keeps query embeddings so repeated queries skip the encoder forward pass:
+an in-memory LRU bounded by entry count, optionally backed by a SQLite
+store on disk that survives restarts. The same store type also holds
+content-addressed chunk embeddings so index rebuilds only encode new text.
+Keys hash the text together with an encoder id: the embedding model name
+plus the inference backend and precision, so vectors of numerically
+different encoders are never mixed.
+"""
+
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+def normalize_query(text: str) -> str:
+    """Collapses whitespace so trivially different spellings share a key."""
+    return " ".join(text.split())
+
+
+def embedding_key(encoder_id: str, text: str) -> str:
+    """Content-addressed key: the same text under the same encoder."""
+    return hashlib.sha1(f"{encoder_id}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """Persistent key -> float32 vector store backed by SQLite."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings "
+            "(key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self.conn.commit()
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Returns stored vectors for the keys that are present."""
+        found = {}
+        with self.lock:
+            # Stay below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start : start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self.conn.execute(
+                    f"SELECT key, vector FROM embeddings "
+                    f"WHERE key IN ({placeholders})",
+                    batch,
+                )
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]):
+        """Stores (or replaces) vectors by key."""
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [
+                    (key, np.asarray(vector, dtype=np.float32).tobytes())
+                    for key, vector in items.items()
+                ],
+            )
+            self.conn.commit()
+
+
+class QueryEmbeddingCache:
+    """
+    LRU cache of query embeddings with an optional on-disk backing store.
+
+    Lookups check memory first, then disk (promoting hits into memory).
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        max_size: int = 4096,
+        path: Optional[Path] = None,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            model_name: Encoder id (model, backend, precision); part of
+                every key.
+            max_size: Maximum number of in-memory entries.
+            path: SQLite file for persistence (None = memory only).
+        """
+        self.model_name = model_name
+        self.max_size = max_size
+        self.store = EmbeddingStore(path) if path else None
+        self.lock = threading.Lock()
+        self.entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, query: str) -> str:
+        """Cache key for a query under this cache's model."""
+        return embedding_key(self.model_name, normalize_query(query))
+
+    def get_many(self, queries: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Looks up many queries at once.
+
+        Returns:
+            Dict mapping each cached query to its embedding.
+        """
+        keys = {query: self.key(query) for query in queries}
+        found = {}
+
+        with self.lock:
+            for query, key in keys.items():
+                if key in self.entries:
+                    self.entries.move_to_end(key)
+                    found[query] = self.entries[key]
+
+        missing = [q for q in keys if q not in found]
+        if self.store is not None and missing:
+            stored = self.store.get_many([keys[q] for q in missing])
+            for query in missing:
+                vector = stored.get(keys[query])
+                if vector is not None:
+                    found[query] = vector
+                    self._remember(keys[query], vector)
+
+        with self.lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, embeddings: Dict[str, np.ndarray]):
+        """Caches freshly computed query embeddings."""
+        keyed = {self.key(q): v for q, v in embeddings.items()}
+        for key, vector in keyed.items():
+            self._remember(key, vector)
+        if self.store is not None and keyed:
+            self.store.put_many(keyed)
+
+    def _remember(self, key: str, vector: np.ndarray):
+        """Inserts into the in-memory LRU, evicting the oldest entries."""
+        with self.lock:
+            self.entries[key] = vector
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for monitoring."""
+        total = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
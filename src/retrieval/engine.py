@@ -1,13 +1,27 @@
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import asyncio
+import threading
 import sys
 import os
+import time
+
+import numpy as np
 
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), "../.."))
 from src.config import Config
+from src.data.chunk_store import ChunkStore, materialize
 from src.retrieval.vector_index import VectorIndex
 from src.retrieval.sparse_index import SparseIndex
 from src.retrieval.rrf import RRFGrouper
+from src.retrieval.embedding_cache import normalize_query
+from src.retrieval.result_cache import (
+    RetrievalResultCache,
+    artifact_version,
+    copy_results,
+)
 
 
 class HybridRetriever:
@@ -20,14 +34,30 @@ class HybridRetriever:
         self.k_retrieval = k_retrieval
         self.k_final = k_final
 
-        self.vector_index = VectorIndex()
-        self.sparse_index = SparseIndex()
+        # One copy of the corpus, shared by both indexes
+        self.chunk_store = ChunkStore()
+        self.vector_index = VectorIndex(chunk_store=self.chunk_store)
+        self.sparse_index = SparseIndex(chunk_store=self.chunk_store)
         self.rrf_grouper = RRFGrouper(
             k_const=k_rrf,
             weight_dense=Config.RRF_WEIGHT_DENSE,
             weight_sparse=Config.RRF_WEIGHT_SPARSE,
         )
 
+        # Reused across requests; query encoding, FAISS and the NumPy
+        # BM25 scoring release the GIL, so the two legs overlap
+        self.executor = ThreadPoolExecutor(
+            max_workers=Config.RETRIEVAL_WORKERS,
+            thread_name_prefix="retrieval",
+        )
+
+        # Final results of repeat queries; keys carry the index version
+        self.result_cache = RetrievalResultCache(
+            max_size=Config.RESULT_CACHE_SIZE,
+            ttl_seconds=Config.RESULT_CACHE_TTL_SECONDS,
+        )
+
+        self._init_lock = threading.Lock()
         self.output_log = []
 
     def initialize(self):
@@ -42,7 +72,7 @@ class HybridRetriever:
             self.vector_index.build_index()
 
         # Load Sparse Index
-        if (Config.DATA_DIR / "bm25_index.pkl").exists():
+        if Config.BM25_INDEX_PATH.exists():
             self.sparse_index.load_index()
         else:
             print("Sparse Index not found, building...")
@@ -50,70 +80,315 @@ class HybridRetriever:
 
         print("Hybrid Retriever Initialized.")
 
-    def retrieve(self, query: str) -> List[Tuple[Dict, float]]:
+    def ensure_initialized(self):
         """
-        Performs hybrid retrieval for the query.
+        Loads the indexes once, even when called from several threads
+        (the retrieval legs would otherwise both load the shared store).
         """
-        # Dense Search
-        dense_results = self.vector_index.search(query, k=self.k_retrieval)
+        with self._init_lock:
+            if (
+                self.vector_index.index is None
+                or self.sparse_index.index is None
+            ):
+                self.initialize()
 
-        # Sparse Search
-        sparse_results = self.sparse_index.search(query, k=self.k_retrieval)
+    def add_chunks(self, chunks: List[Dict]) -> int:
+        """
+        Adds new chunks (e.g. freshly scraped articles) to the system.
+
+        Only the new chunks are encoded into the dense index and tokenized
+        into BM25 (whose statistics are updated in place). The corpus file
+        is written last, once both indexes hold the chunks.
+
+        Returns:
+            Number of chunks added.
+        """
+        self.ensure_initialized()
+        # Fail before touching the store if the index can't take new ids
+        self.vector_index.require_id_mapping()
 
-        # RRF
-        final_results = self.rrf_grouper.fuse(
-            dense_results, sparse_results, top_n_out=self.k_final
+        num_chunks = len(self.chunk_store)
+        self.chunk_store.extend(chunks)
+        added = len(self.chunk_store) - num_chunks
+        if not added:
+            return 0
+
+        self.vector_index.add_chunks(chunks)
+        self.sparse_index.add_rows(
+            np.arange(num_chunks, len(self.chunk_store))
         )
+        self.chunk_store.save()
+        return added
 
-        return final_results
+    def remove_by_url(self, url: str) -> int:
+        """
+        Removes all chunks of a document from the corpus and both indexes.
 
-    def retrieve_with_details(self, query: str) -> Dict:
+        Returns:
+            Number of chunks removed.
         """
-        Performs hybrid retrieval and returns detailed scores for each method.
+        self.ensure_initialized()
+
+        # Checks the id mapping first, then drops the rows from the shared
+        # store too; the corpus file is written once both indexes follow
+        rows = self.chunk_store.rows_for_url(url)
+        removed = self.vector_index.remove_by_url(url)
+        if not removed:
+            return 0
+
+        self.sparse_index.remove_rows(rows)
+        self.chunk_store.save()
+        return removed
+
+    def index_version(self) -> Tuple:
+        """Stamp of the index artifacts; changes on any rebuild or update."""
+        return artifact_version(
+            [
+                Config.VECTOR_DB_PATH,
+                Config.VECTOR_IDS_PATH,
+                Config.BM25_INDEX_PATH / "bm25.json",
+                Config.CORPUS_STORE_PATH / "store.json",
+            ]
+        )
+
+    def _cache_key(
+        self,
+        query: str,
+        nprobe: Optional[int],
+        ef_search: Optional[int],
+        version: Tuple,
+    ) -> Tuple:
+        """Result cache key: everything that can change the ranking."""
+        return (
+            normalize_query(query),
+            self.k_retrieval,
+            self.k_final,
+            self.rrf_grouper.k_const,
+            self.rrf_grouper.weight_dense,
+            self.rrf_grouper.weight_sparse,
+            nprobe,
+            ef_search,
+            version,
+        )
+
+    def cache_stats(self) -> Dict:
+        """Hit-rate counters of the result and query embedding caches."""
+        return {
+            "results": self.result_cache.stats(),
+            "query_embeddings": self.vector_index.query_cache.stats(),
+        }
+
+    def _search_legs(
+        self,
+        queries: List[str],
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> Tuple[List, List, float, float]:
+        """
+        Runs dense and sparse retrieval for the queries concurrently.
+
+        The dense leg runs on the executor while the sparse leg runs on the
+        calling thread, so latency is about max(dense, sparse).
 
         Returns:
-            Dict with 'final_results', 'dense_results', 'sparse_results',
-            and score breakdowns for UI display.
+            Tuple of (dense_batch, sparse_batch, dense_seconds,
+            sparse_seconds), batches holding (rows, scores) per query.
+        """
+        self.ensure_initialized()
+        dense_future = self.executor.submit(
+            _timed,
+            self.vector_index.search_ids_batch,
+            queries,
+            k=self.k_retrieval,
+            nprobe=nprobe,
+            ef_search=ef_search,
+        )
+        sparse_batch, sparse_time = _timed(
+            self.sparse_index.search_ids_batch, queries, k=self.k_retrieval
+        )
+        dense_batch, dense_time = dense_future.result()
+        return dense_batch, sparse_batch, dense_time, sparse_time
+
+    def retrieve(
+        self,
+        query: str,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[Tuple[Dict, float]]:
         """
-        import time
+        Performs hybrid retrieval for the query.
 
-        # Dense Search with timing
-        start = time.time()
-        dense_results = self.vector_index.search(query, k=self.k_retrieval)
-        dense_time = time.time() - start
+        nprobe / ef_search tune approximate dense indexes for this call.
+        """
+        return self.retrieve_batch([query], nprobe, ef_search)[0]
+
+    async def aretrieve(
+        self,
+        query: str,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> List[Tuple[Dict, float]]:
+        """
+        Async hybrid retrieval for use from an event loop.
+
+        Both legs run on the retriever's executor, so the loop is never
+        blocked and in-flight requests share its threads and the loaded
+        indexes. On cancellation or timeout, legs that haven't started are
+        dropped.
 
-        # Sparse Search with timing
+        Args:
+            query: User question.
+            nprobe / ef_search: Approximate dense index tuning.
+            timeout: Seconds before asyncio.TimeoutError
+                (default Config.ASYNC_TIMEOUT_SECONDS, None = no limit).
+
+        Returns:
+            Same (chunk, rrf_score) list as retrieve().
+        """
+        key = self._cache_key(query, nprobe, ef_search, self.index_version())
+        cached = self.result_cache.get(key)
+        if cached is not None:
+            return cached
+
+        if timeout is None:
+            timeout = Config.ASYNC_TIMEOUT_SECONDS
+        results = await asyncio.wait_for(
+            self._aretrieve(query, nprobe, ef_search), timeout
+        )
+        self.result_cache.put(key, results)
+        return results
+
+    async def _aretrieve(
+        self, query: str, nprobe: Optional[int], ef_search: Optional[int]
+    ) -> List[Tuple[Dict, float]]:
+        loop = asyncio.get_running_loop()
+        if self.vector_index.index is None or self.sparse_index.index is None:
+            await loop.run_in_executor(self.executor, self.ensure_initialized)
+        (dense_rows, _), (sparse_rows, _) = await asyncio.gather(
+            loop.run_in_executor(
+                self.executor,
+                partial(
+                    self.vector_index.search_ids,
+                    query,
+                    k=self.k_retrieval,
+                    nprobe=nprobe,
+                    ef_search=ef_search,
+                ),
+            ),
+            loop.run_in_executor(
+                self.executor,
+                partial(
+                    self.sparse_index.search_ids, query, k=self.k_retrieval
+                ),
+            ),
+        )
+
+        # Fusing ~200 ids and materializing k_final rows is cheap enough to
+        # run on the loop
+        rows, scores = self.rrf_grouper.fuse_ids(
+            dense_rows, sparse_rows, top_n_out=self.k_final
+        )
+        return materialize(self.chunk_store, rows, scores)
+
+    def retrieve_batch(
+        self,
+        queries: List[str],
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[List[Tuple[Dict, float]]]:
+        """
+        Performs hybrid retrieval for many queries at once.
+
+        Queries found in the result cache are answered from it. The rest
+        get dense and sparse candidates computed in bulk (as (row, score)
+        arrays, the two legs concurrently), fused per query; only the
+        final top-n rows are materialized.
+        """
+        version = self.index_version()
+        keys = [
+            self._cache_key(q, nprobe, ef_search, version) for q in queries
+        ]
+        batch_results = [self.result_cache.get(key) for key in keys]
+
+        # Search each distinct missing query once
+        missing = list(
+            dict.fromkeys(
+                normalize_query(q)
+                for q, results in zip(queries, batch_results)
+                if results is None
+            )
+        )
+        if not missing:
+            return batch_results
+
+        dense_batch, sparse_batch, _, _ = self._search_legs(
+            missing, nprobe, ef_search
+        )
+        fresh = {}
+        for query, (dense_rows, _), (sparse_rows, _) in zip(
+            missing, dense_batch, sparse_batch
+        ):
+            rows, scores = self.rrf_grouper.fuse_ids(
+                dense_rows, sparse_rows, top_n_out=self.k_final
+            )
+            fresh[query] = materialize(self.chunk_store, rows, scores)
+            self.result_cache.put(
+                self._cache_key(query, nprobe, ef_search, version),
+                fresh[query],
+            )
+
+        return [
+            results if results is not None else copy_results(fresh[key[0]])
+            for results, key in zip(batch_results, keys)
+        ]
+
+    def retrieve_with_details(
+        self,
+        query: str,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> Dict:
+        """
+        Performs hybrid retrieval and returns detailed scores for each method.
+
+        Returns:
+            Dict with 'final_results' (chunks enriched with rrf, dense and
+            sparse scores) and 'timing'. dense_ms and sparse_ms are per
+            leg; the legs overlap, so total_ms is wall-clock time.
+        """
         start = time.time()
-        sparse_results = self.sparse_index.search(query, k=self.k_retrieval)
-        sparse_time = time.time() - start
+        dense_batch, sparse_batch, dense_time, sparse_time = self._search_legs(
+            [query], nprobe, ef_search
+        )
+        (dense_rows, dense_scores), (sparse_rows, sparse_scores) = (
+            dense_batch[0],
+            sparse_batch[0],
+        )
 
         # RRF with timing
-        start = time.time()
-        final_results = self.rrf_grouper.fuse(
-            dense_results, sparse_results, top_n_out=self.k_final
+        rrf_start = time.time()
+        rows, rrf_scores = self.rrf_grouper.fuse_ids(
+            dense_rows, sparse_rows, top_n_out=self.k_final
         )
-        rrf_time = time.time() - start
+        rrf_time = time.time() - rrf_start
 
-        # Build score lookup tables
-        dense_scores = {
-            chunk["chunk_id"]: score for chunk, score in dense_results
-        }
-        sparse_scores = {
-            chunk["chunk_id"]: score for chunk, score in sparse_results
-        }
+        # Individual scores of the final rows (0 if a leg missed it)
+        dense_final = _scores_for(rows, dense_rows, dense_scores)
+        sparse_final = _scores_for(rows, sparse_rows, sparse_scores)
 
         # Enrich final results with individual scores
         enriched_results = []
-        for chunk, rrf_score in final_results:
-            chunk_id = chunk["chunk_id"]
+        for i, row in enumerate(rows):
             enriched_results.append(
                 {
-                    **chunk,
-                    "rrf_score": round(rrf_score, 4),
-                    "dense_score": round(dense_scores.get(chunk_id, 0), 4),
-                    "sparse_score": round(sparse_scores.get(chunk_id, 0), 4),
+                    **self.chunk_store.get(int(row)),
+                    "rrf_score": round(float(rrf_scores[i]), 4),
+                    "dense_score": round(float(dense_final[i]), 4),
+                    "sparse_score": round(float(sparse_final[i]), 4),
                 }
             )
+        total_time = time.time() - start
 
         return {
             "final_results": enriched_results,
@@ -121,13 +396,30 @@ class HybridRetriever:
                 "dense_ms": round(dense_time * 1000, 2),
                 "sparse_ms": round(sparse_time * 1000, 2),
                 "rrf_ms": round(rrf_time * 1000, 2),
-                "total_ms": round(
-                    (dense_time + sparse_time + rrf_time) * 1000, 2
-                ),
+                "total_ms": round(total_time * 1000, 2),
             },
         }
 
 
+def _timed(fn, *args, **kwargs):
+    """Calls fn, returning (result, elapsed seconds)."""
+    start = time.time()
+    result = fn(*args, **kwargs)
+    return result, time.time() - start
+
+
+def _scores_for(
+    rows: np.ndarray, candidate_rows: np.ndarray, candidate_scores: np.ndarray
+) -> np.ndarray:
+    """Looks up each row's score among a leg's candidates, 0 if absent."""
+    if not len(candidate_rows):
+        return np.zeros(len(rows))
+    matches = rows[:, None] == candidate_rows[None, :]
+    return np.where(
+        matches.any(axis=1), candidate_scores[matches.argmax(axis=1)], 0.0
+    )
+
+
 if __name__ == "__main__":
     retriever = HybridRetriever()
     retriever.initialize()
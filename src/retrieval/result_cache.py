@@ -0,0 +1,110 @@
+"""
+Retrieval result cache.
+
+LRU cache of final hybrid retrieval results with an optional TTL. Keys
+include the normalized query, every parameter that changes the ranking,
+and an index version derived from the on-disk index artifacts, so a
+rebuild or incremental update makes older entries unreachable (they age
+out of the LRU).
+
+Results are copied on the way in and out (chunk dicts included), so
+callers that annotate their results don't change later hits.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Hashable, List, Optional, Tuple
+
+
+def artifact_version(paths: List[Path]) -> Tuple:
+    """
+    Version stamp of index files: (mtime_ns, size) per path.
+
+    Artifacts are replaced on every build or update, so any rebuild
+    changes the stamp. Missing files stamp as None.
+    """
+    version = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            version.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            version.append(None)
+    return tuple(version)
+
+
+def copy_results(results: List[Tuple[Dict, float]]) -> List:
+    """Copies (chunk, score) results; chunk dicts hold only scalars."""
+    return [(dict(chunk), score) for chunk, score in results]
+
+
+class RetrievalResultCache:
+    """Thread-safe LRU of retrieval results with optional expiry."""
+
+    def __init__(
+        self, max_size: int = 1024, ttl_seconds: Optional[float] = None
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size: Maximum number of entries (0 disables caching).
+            ttl_seconds: Entry lifetime (None = until evicted).
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.Lock()
+        self.entries: "OrderedDict[Hashable, Tuple[float, List]]" = (
+            OrderedDict()
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[List]:
+        """Returns a copy of the cached results, or None."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and self._expired(entry[0]):
+                del self.entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return copy_results(entry[1])
+
+    def put(self, key: Hashable, results: List):
+        """Caches results, evicting the least recently used entries."""
+        if self.max_size <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (time.monotonic(), copy_results(results))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def _expired(self, stored_at: float) -> bool:
+        return (
+            self.ttl_seconds is not None
+            and time.monotonic() - stored_at > self.ttl_seconds
+        )
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for monitoring."""
+        total = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
@@ -5,11 +5,12 @@ Combines results from dense and sparse retrieval using RRF algorithm
 with configurable k constant and weighting parameters.
 """
 
-from typing import List, Dict, Tuple
-from collections import defaultdict
+from typing import List, Dict, Tuple, Optional
 import sys
 import os
 
+import numpy as np
+
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), "../.."))
 from src.config import Config
@@ -41,6 +42,70 @@ class RRFGrouper:
         self.weight_dense = weight_dense
         self.weight_sparse = weight_sparse
 
+    def fuse_ids(
+        self,
+        dense_ids: np.ndarray,
+        sparse_ids: np.ndarray,
+        top_n_out: Optional[int] = None,
+        preserve_top_dense: int = 1,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Combine ranked integer ids from Dense and Sparse retrieval using RRF.
+
+        Reciprocal ranks are scatter-added into one score per unique id;
+        only the top_n_out best are sorted. Ties keep first-seen order
+        (dense list first, then sparse).
+
+        Args:
+            dense_ids: Ids ranked by dense retrieval (best first).
+            sparse_ids: Ids ranked by sparse retrieval (best first).
+            top_n_out: Number of results to return.
+            preserve_top_dense: Guarantee top N dense results are included.
+
+        Returns:
+            Tuple of (ids, rrf_scores) sorted by score descending, with the
+            preserved dense ids first.
+        """
+        dense_ids = np.asarray(dense_ids, dtype=np.int64)
+        sparse_ids = np.asarray(sparse_ids, dtype=np.int64)
+        all_ids = np.concatenate([dense_ids, sparse_ids])
+        if not len(all_ids):
+            return all_ids, np.zeros(0, dtype=np.float64)
+
+        # Weighted reciprocal ranks (1-based), summed per unique id
+        weights = np.concatenate(
+            [
+                self.weight_dense
+                * (1 / (self.k_const + np.arange(1, len(dense_ids) + 1))),
+                self.weight_sparse
+                * (1 / (self.k_const + np.arange(1, len(sparse_ids) + 1))),
+            ]
+        )
+        ids, first_seen, inverse = np.unique(
+            all_ids, return_index=True, return_inverse=True
+        )
+        scores = np.bincount(inverse, weights=weights)
+
+        # Top dense results go first regardless of fused score
+        preserved = np.asarray(
+            list(dict.fromkeys(dense_ids[:preserve_top_dense].tolist())),
+            dtype=np.int64,
+        )
+        is_preserved = np.isin(ids, preserved)
+        rest = np.flatnonzero(~is_preserved)
+
+        n = len(ids) if top_n_out is None else max(top_n_out, 0)
+        n_rest = max(n - len(preserved), 0)
+        if 0 < n_rest < len(rest):
+            # Keep everything tied with the n-th score, so tie-breaking by
+            # first-seen order stays exact
+            kth = np.partition(-scores[rest], n_rest - 1)[n_rest - 1]
+            rest = rest[-scores[rest] <= kth]
+        rest = rest[np.lexsort((first_seen[rest], -scores[rest]))][:n_rest]
+
+        order = np.concatenate([np.searchsorted(ids, preserved), rest])[:n]
+        return ids[order], scores[order]
+
     def fuse(
         self,
         dense_results: List[Tuple[Dict, float]],
@@ -60,55 +125,20 @@ class RRFGrouper:
         Returns:
             List of (chunk, rrf_score) sorted by score descending.
         """
-        # Map chunks by ID and accumulate RRF scores
+        # Number chunks by first appearance, then fuse on integer ids
         chunk_map = {}
-        rrf_scores = defaultdict(float)
-        
-        # Track top dense results to preserve
-        top_dense_ids = set()
-        for i, (chunk, score) in enumerate(dense_results[:preserve_top_dense]):
-            top_dense_ids.add(chunk["chunk_id"])
-
-        # Process Dense results (1-based ranking)
-        for rank, (chunk, score) in enumerate(dense_results, 1):
-            chunk_id = chunk["chunk_id"]
-            chunk_map[chunk_id] = chunk
-            rrf_scores[chunk_id] += self.weight_dense * (
-                1 / (self.k_const + rank)
-            )
-
-        # Process Sparse results (1-based ranking)
-        for rank, (chunk, score) in enumerate(sparse_results, 1):
-            chunk_id = chunk["chunk_id"]
-            chunk_map[chunk_id] = chunk
-            rrf_scores[chunk_id] += self.weight_sparse * (
-                1 / (self.k_const + rank)
-            )
-
-        # Sort by RRF score descending
-        sorted_ids = sorted(
-            rrf_scores.keys(), key=lambda x: rrf_scores[x], reverse=True
+        for chunk, _ in dense_results + sparse_results:
+            chunk_map.setdefault(chunk["chunk_id"], chunk)
+        codes = {chunk_id: i for i, chunk_id in enumerate(chunk_map)}
+        chunks = list(chunk_map.values())
+
+        ids, scores = self.fuse_ids(
+            [codes[chunk["chunk_id"]] for chunk, _ in dense_results],
+            [codes[chunk["chunk_id"]] for chunk, _ in sparse_results],
+            top_n_out=top_n_out,
+            preserve_top_dense=preserve_top_dense,
         )
-        
-        # Ensure top dense results are in final output
-        final_ids = []
-        for cid in top_dense_ids:
-            if cid not in final_ids:
-                final_ids.append(cid)
-        
-        # Add remaining by RRF score
-        for cid in sorted_ids:
-            if cid not in final_ids:
-                final_ids.append(cid)
-
-        if top_n_out is not None:
-            final_ids = final_ids[:top_n_out]
-
-        final_results = []
-        for cid in final_ids:
-            final_results.append((chunk_map[cid], rrf_scores[cid]))
-
-        return final_results
+        return [(chunks[i], float(score)) for i, score in zip(ids, scores)]
 
 
 if __name__ == "__main__":
@@ -132,11 +162,18 @@ if __name__ == "__main__":
     # C: 1/(60+2) = 0.01612
     # Expected order: B, A, C
 
-    results = grouper.fuse(dense, sparse)
+    # Pure RRF ordering (the default preserve_top_dense=1 would pin A)
+    results = grouper.fuse(dense, sparse, preserve_top_dense=0)
 
     print("RRF Results:")
     for chunk, score in results:
         print(f"{chunk['chunk_id']}: {score:.5f}")
 
     assert results[0][0]["chunk_id"] == "B", "RRF ordering incorrect"
+
+    # Same fusion on integer ids: A=0, B=1, C=2
+    ids, scores = grouper.fuse_ids([0, 1], [1, 2], preserve_top_dense=0)
+    assert ids.tolist() == [1, 0, 2], "RRF id ordering incorrect"
+    ids, _ = grouper.fuse_ids([0, 1], [1, 2])
+    assert ids.tolist() == [0, 1, 2], "Top dense result not preserved"
     print("RRF Test Passed")
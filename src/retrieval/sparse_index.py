@@ -1,8 +1,7 @@
 import json
-import pickle
 import string
-from typing import List, Dict, Tuple
-from rank_bm25 import BM25Okapi
+import numpy as np
+from typing import List, Dict, Tuple, Optional
 import nltk
 from nltk.stem import PorterStemmer
 import sys
@@ -12,13 +11,19 @@ from pathlib import Path
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), "../.."))
 from src.config import Config
+from src.data.chunk_store import ChunkStore, materialize
+from src.retrieval.bm25 import InvertedBM25
 
 
 class SparseIndex:
-    def __init__(self):
+    def __init__(self, chunk_store: Optional[ChunkStore] = None):
         self.index = None
-        self.chunks = []
-        self.model_path = Config.DATA_DIR / "bm25_index.pkl"
+        # Metadata store, shared with the vector index when given;
+        # BM25 document ids are store rows
+        self.chunk_store = (
+            chunk_store if chunk_store is not None else ChunkStore()
+        )
+        self.model_path = Config.BM25_INDEX_PATH
 
         # Simple preprocessing
         # We need NLTK punkt for tokenization usually, but let's use a simple splitter to avoid downloading big NLTK data if possible,
@@ -41,73 +46,137 @@ class SparseIndex:
         # Stem
         return [self.stemmer.stem(t) for t in tokens]
 
-    def build_index(self, corpus_path: Path = Config.CORPUS_PATH):
+    def build_index(self, corpus_path: Optional[Path] = None):
         """Builds BM25 index from corpus."""
-        if not corpus_path.exists():
-            raise FileNotFoundError(f"Corpus not found at {corpus_path}")
-
-        print("Loading corpus for Sparse Index...")
-        with open(corpus_path, "r") as f:
-            self.chunks = json.load(f)
+        if not len(self.chunk_store):
+            print("Loading corpus for Sparse Index...")
+            self.chunk_store.load(corpus_path)
 
         tokenized_corpus = []
-        print(f"Tokenizing {len(self.chunks)} chunks...")
-        for chunk in self.chunks:
-            tokenized_corpus.append(self.preprocess(chunk["content"]))
+        print(f"Tokenizing {len(self.chunk_store)} chunks...")
+        for text in self.chunk_store.texts():
+            tokenized_corpus.append(self.preprocess(text))
 
         print("Building BM25 Index...")
-        self.index = BM25Okapi(tokenized_corpus)
+        self.index = InvertedBM25().fit(tokenized_corpus)
 
-        # Save index + chunks reference
-        # BM25 object is pickleable
         print(f"Saving index to {self.model_path}...")
-        with open(self.model_path, "wb") as f:
-            pickle.dump(
-                {
-                    "index": self.index,
-                    "chunk_ids": [c["chunk_id"] for c in self.chunks],
-                    # We don't save full chunks to save space, will reload corpus on load
-                },
+        self.save_index()
+        print("Sparse Index built.")
+
+    def save_index(self):
+        """Writes the BM25 arrays and the chunk ids they were built on."""
+        # We don't save full chunks to save space, will reload corpus on load
+        self.index.save(self.model_path)
+        with open(self.model_path / "chunk_ids.json", "w") as f:
+            json.dump(
+                [chunk_id.decode() for chunk_id in self.chunk_store.chunk_ids],
                 f,
             )
-        print("Sparse Index built.")
 
-    def load_index(self):
-        """Loads BM25 index."""
-        if self.model_path.exists():
-            with open(self.model_path, "rb") as f:
-                data = pickle.load(f)
-                self.index = data["index"]
+    def add_rows(self, rows: np.ndarray):
+        """
+        Indexes chunk store rows appended since the last build or update.
 
-            # Load chunks
-            with open(Config.CORPUS_PATH, "r") as f:
-                self.chunks = json.load(f)
+        Only the new chunks are tokenized. Indexes saved before updates
+        were supported are rebuilt once instead.
+        """
+        if self.index is None:
+            self.load_index()
+        rows = np.asarray(rows, dtype=np.int64)
+        expected = np.arange(self.index.num_docs, len(self.chunk_store))
+        if not self.index.updatable or not np.array_equal(rows, expected):
+            self.build_index()
+            return
+
+        self.index.add_documents(
+            [self.preprocess(text) for text in self.chunk_store.texts(rows)]
+        )
+        self.save_index()
+        print(f"Added {len(rows)} chunks to the sparse index.")
+
+    def remove_rows(self, rows: np.ndarray):
+        """
+        Drops chunks that were removed from the (shared) chunk store.
+
+        Args:
+            rows: Their rows before the store was compacted; the remaining
+                documents are renumbered the same way the store's rows are.
+        """
+        if self.index is None or not self.index.updatable:
+            self.build_index()
+            return
+        self.index.remove_documents(rows)
+        if self.index.num_docs != len(self.chunk_store):
+            print("Sparse index out of sync with the corpus, rebuilding...")
+            self.build_index()
+            return
+        self.save_index()
+        print(f"Removed {len(rows)} chunks from the sparse index.")
+
+    def load_index(self, mmap: Optional[bool] = None):
+        """
+        Loads BM25 index.
+
+        Args:
+            mmap: Memory-map the posting arrays (default Config.INDEX_MMAP).
+        """
+        if (self.model_path / "bm25.json").exists():
+            if mmap is None:
+                mmap = Config.INDEX_MMAP
+            self.index = InvertedBM25.load(self.model_path, mmap=mmap)
+
+            # Load chunks unless a shared store already holds them
+            if not len(self.chunk_store):
+                self.chunk_store.load()
+
+            # Postings address chunks by row, so the corpus must not have
+            # changed since the build
+            with open(self.model_path / "chunk_ids.json", "r") as f:
+                chunk_ids = json.load(f)
+            if len(chunk_ids) != len(self.chunk_store) or not np.array_equal(
+                np.array([c.encode() for c in chunk_ids], dtype=bytes),
+                self.chunk_store.chunk_ids,
+            ):
+                print("Corpus changed since sparse index build, rebuilding...")
+                self.build_index()
         else:
             print("Sparse index not found. Please build it.")
 
     def search(self, query: str, k: int = 60) -> List[Tuple[Dict, float]]:
         """Retrieves top-k chunks using BM25."""
+        return self.search_batch([query], k=k)[0]
+
+    def search_batch(
+        self, queries: List[str], k: int = 60
+    ) -> List[List[Tuple[Dict, float]]]:
+        """Retrieves top-k chunks for many queries with one bulk BM25 pass."""
+        return [
+            materialize(self.chunk_store, rows, scores)
+            for rows, scores in self.search_ids_batch(queries, k=k)
+        ]
+
+    def search_ids(
+        self, query: str, k: int = 60
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Like search(), but returns (chunk store rows, scores) arrays."""
+        return self.search_ids_batch([query], k=k)[0]
+
+    def search_ids_batch(
+        self, queries: List[str], k: int = 60
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Retrieves top-k chunk store rows for many queries.
+
+        Only documents containing a query term are scored; zero-score
+        documents are never returned.
+        """
         if self.index is None:
             self.load_index()
 
-        query_tokens = self.preprocess(query)
-        doc_scores = self.index.get_scores(query_tokens)
-
-        # Get top k indices
-        # argsort returns ascending, so we take last k and reverse
-        top_n = np.argsort(doc_scores)[-k:][::-1]
-
-        results = []
-        for idx in top_n:
-            score = doc_scores[idx]
-            # BM25 scores can be 0 if no closure match
-            if score > 0:
-                results.append((self.chunks[idx], float(score)))
-
-        return results
-
+        queries_tokens = [self.preprocess(query) for query in queries]
+        return self.index.top_k_batch(queries_tokens, k)
 
-import numpy as np  # Needed for argsort
 
 if __name__ == "__main__":
     si = SparseIndex()
@@ -3,7 +3,7 @@ import faiss
 import numpy as np
 import torch
 from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional
 import sys
 import os
 from pathlib import Path
@@ -11,83 +11,596 @@ from pathlib import Path
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), "../.."))
 from src.config import Config
+from src.data.chunk_store import ChunkStore, materialize
+from src.onnx_backend import load_onnx_encoder
+from src.retrieval.embedding_cache import (
+    EmbeddingStore,
+    QueryEmbeddingCache,
+    embedding_key,
+    normalize_query,
+)
+
+INDEX_TYPES = ("flat", "ivf", "hnsw", "sq8", "fp16", "ivf_pq")
+IVF_TYPES = ("ivf", "ivf_pq")
+# Types that store lossy codes instead of the original float32 vectors
+QUANTIZED_TYPES = ("sq8", "fp16", "ivf_pq")
+
+
+def _ivf_nlist(num_vectors: int) -> int:
+    """Caps nlist for small corpora (FAISS wants ~39 points per centroid)."""
+    return max(1, min(Config.IVF_NLIST, num_vectors // 39))
+
+
+def create_faiss_index(
+    embeddings: np.ndarray, index_type: str, ids: Optional[np.ndarray] = None
+) -> faiss.Index:
+    """
+    Builds a FAISS index of the given type over normalized embeddings.
+
+    All types use inner product, i.e. cosine similarity on normalized vectors.
+    When ids are given, vectors are stored under those ids (IVF indexes map
+    ids natively, others are wrapped in an IndexIDMap2), so the index
+    supports add_with_ids / remove_ids.
+    """
+    dimension = embeddings.shape[1]
+
+    if index_type == "flat":
+        # Exact brute-force search
+        index = faiss.IndexFlatIP(dimension)
+    elif index_type == "ivf":
+        # Coarse quantizer partitions vectors into nlist cells; queries only
+        # scan the nprobe closest cells.
+        quantizer = faiss.IndexFlatIP(dimension)
+        index = faiss.IndexIVFFlat(
+            quantizer,
+            dimension,
+            _ivf_nlist(len(embeddings)),
+            faiss.METRIC_INNER_PRODUCT,
+        )
+        index.train(embeddings)
+        index.nprobe = Config.IVF_NPROBE
+    elif index_type == "ivf_pq":
+        # IVF cells with product-quantized residuals: PQ_M bytes per vector
+        quantizer = faiss.IndexFlatIP(dimension)
+        index = faiss.IndexIVFPQ(
+            quantizer,
+            dimension,
+            _ivf_nlist(len(embeddings)),
+            Config.PQ_M,
+            Config.PQ_NBITS,
+            faiss.METRIC_INNER_PRODUCT,
+        )
+        index.train(embeddings)
+        index.nprobe = Config.IVF_NPROBE
+    elif index_type in ("sq8", "fp16"):
+        # Per-dimension scalar quantization: 1 or 2 bytes per component
+        qtype = (
+            faiss.ScalarQuantizer.QT_8bit
+            if index_type == "sq8"
+            else faiss.ScalarQuantizer.QT_fp16
+        )
+        index = faiss.IndexScalarQuantizer(
+            dimension, qtype, faiss.METRIC_INNER_PRODUCT
+        )
+        index.train(embeddings)
+    elif index_type == "hnsw":
+        # Navigable small-world graph, no training needed
+        index = faiss.IndexHNSWFlat(
+            dimension, Config.HNSW_M, faiss.METRIC_INNER_PRODUCT
+        )
+        index.hnsw.efConstruction = Config.HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = Config.HNSW_EF_SEARCH
+    else:
+        raise ValueError(
+            f"Unknown index type '{index_type}', expected one of {INDEX_TYPES}"
+        )
+
+    if ids is None:
+        index.add(embeddings)
+        return index
+
+    if index_type not in IVF_TYPES:
+        index = faiss.IndexIDMap2(index)
+    index.add_with_ids(embeddings, ids.astype(np.int64))
+    return index
+
+
+def _save_embeddings(embeddings: np.ndarray) -> np.ndarray:
+    """
+    Writes the re-scoring matrix and returns it memory-mapped.
+
+    The file is written aside and renamed into place, so processes that
+    still map the old file keep a consistent view.
+    """
+    path = Config.VECTOR_EMBEDDINGS_PATH
+    tmp_path = path.with_name(f".{path.name}")
+    np.save(tmp_path, embeddings)
+    os.replace(tmp_path, path)
+    return np.load(path, mmap_mode="r")
+
+
+def rescore_candidates(
+    embeddings: np.ndarray,
+    query_vectors: np.ndarray,
+    candidate_ids: np.ndarray,
+    k: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Re-ranks approximate candidates by exact inner product.
+
+    Args:
+        embeddings: Full-precision vectors, row-aligned with index ids.
+        query_vectors: (n_queries, dim) normalized queries.
+        candidate_ids: (n_queries, n_candidates) ids, -1 for empty slots.
+        k: Results to keep per query.
+
+    Returns:
+        Tuple of (scores, ids) arrays of shape (n_queries, k).
+    """
+    scores = np.full((len(query_vectors), k), -np.inf, dtype=np.float32)
+    top_ids = np.full((len(query_vectors), k), -1, dtype=np.int64)
+
+    for row, (query_vector, candidates) in enumerate(
+        zip(query_vectors, candidate_ids)
+    ):
+        candidates = candidates[candidates != -1]
+        exact = embeddings[candidates] @ query_vector
+        order = np.argsort(-exact)[:k]
+        scores[row, : len(order)] = exact[order]
+        top_ids[row, : len(order)] = candidates[order]
+
+    return scores, top_ids
 
 
 class VectorIndex:
-    def __init__(self):
+    def __init__(
+        self,
+        index_type: Optional[str] = None,
+        chunk_store: Optional[ChunkStore] = None,
+    ):
         self.model_name = Config.EMBEDDING_MODEL_NAME
         self.device = Config.DEVICE
+        self.index_type = index_type or Config.VECTOR_INDEX_TYPE
 
-        print(
-            f"Loading embedding model: {self.model_name} on {self.device}..."
+        self.model = None
+        backend = "torch"
+        if Config.INFERENCE_BACKEND == "onnx":
+            print(f"Loading embedding model: {self.model_name} on ONNX...")
+            self.model = load_onnx_encoder(self.model_name)
+            if self.model is not None:
+                self.device = "cpu"
+                backend = "onnx"
+        if self.model is None:
+            print(
+                f"Loading embedding model: {self.model_name} "
+                f"on {self.device}..."
+            )
+            self.model = SentenceTransformer(
+                self.model_name, device=self.device
+            )
+        # Identifies the encoder in embedding cache keys: vectors of the
+        # PyTorch, ONNX and int8 ONNX encoders differ numerically
+        precision = (
+            "int8" if backend == "onnx" and Config.ONNX_INT8 else "fp32"
         )
-        self.model = SentenceTransformer(self.model_name, device=self.device)
+        self.encoder_id = f"{self.model_name}|{backend}|{precision}"
         self.index = None
-        self.chunks = []  # Metadata store
+        # Metadata store, shared with the sparse index when given
+        self.chunk_store = (
+            chunk_store if chunk_store is not None else ChunkStore()
+        )
+        # FAISS id -> chunk store row (-1 once removed); ids are stable
+        # across adds/removes
+        self.id_rows = np.zeros(0, dtype=np.int64)
+        self.next_id = 0
+        # Float32 embeddings on disk (memory-mapped), used for re-scoring
+        self.embeddings = None
+        self.mmapped = False  # Index pages mapped read-only from disk
+        self.query_cache = QueryEmbeddingCache(
+            self.encoder_id,
+            max_size=Config.QUERY_CACHE_SIZE,
+            path=Config.QUERY_CACHE_PATH,
+        )
+        # Content-addressed chunk embeddings, opened on first encode
+        self.chunk_embedding_store = None
 
-    def build_index(self, corpus_path: Path = Config.CORPUS_PATH):
+    def build_index(self, corpus_path: Optional[Path] = None):
         """Loads corpus, encodes chunks, and builds FAISS index."""
-        if not corpus_path.exists():
-            raise FileNotFoundError(f"Corpus not found at {corpus_path}")
-
-        print("Loading corpus...")
-        with open(corpus_path, "r") as f:
-            self.chunks = json.load(f)
-
-        texts = [chunk["content"] for chunk in self.chunks]
-        print(f"Encoding {len(texts)} chunks...")
-
-        # Batch encoding
-        embeddings = self.model.encode(
-            texts,
-            batch_size=32,
-            show_progress_bar=True,
-            convert_to_numpy=True,
-            normalize_embeddings=True,  # Important for cosine similarity
-        )
+        if not len(self.chunk_store):
+            print("Loading corpus...")
+            self.chunk_store.load(corpus_path)
+
+        embeddings = self.encode_chunks(list(self.chunk_store.texts()))
 
         # Create FAISS Index
-        # IndexFlatIP (Inner Product) is equivalent to Cosine Similarity on normalized vectors
-        dimension = embeddings.shape[1]
-        self.index = faiss.IndexFlatIP(dimension)
-        self.index.add(embeddings)
+        # Inner Product equals Cosine Similarity on normalized vectors
+        print(f"Building '{self.index_type}' index...")
+        ids = np.arange(len(self.chunk_store), dtype=np.int64)
+        self.index = create_faiss_index(embeddings, self.index_type, ids=ids)
+        self.id_rows = ids.copy()
+        self.next_id = len(ids)
 
         print(f"Index built with {self.index.ntotal} vectors.")
 
-        # Save index
-        faiss.write_index(self.index, str(Config.VECTOR_DB_PATH))
+        # Full-precision embeddings are kept on disk for exact re-scoring;
+        # row i holds the vector stored under FAISS id i
+        self.embeddings = _save_embeddings(embeddings)
+        self.mmapped = False
+        self.save_index()
+
+    def save_index(self):
+        """Writes the FAISS index, its type and the id -> chunk mapping."""
+        # Write aside and rename: other processes may have the file mapped
+        tmp_path = Config.VECTOR_DB_PATH.with_name(
+            f".{Config.VECTOR_DB_PATH.name}"
+        )
+        faiss.write_index(self.index, str(tmp_path))
+        os.replace(tmp_path, Config.VECTOR_DB_PATH)
+        with open(Config.VECTOR_META_PATH, "w") as f:
+            json.dump(
+                {
+                    "index_type": self.index_type,
+                    "embedding_model": self.model_name,
+                    "ntotal": self.index.ntotal,
+                },
+                f,
+                indent=2,
+            )
+
+        # Chunk metadata lives in corpus.json; the mapping ties each FAISS
+        # id to a chunk_id, so corpus order no longer has to match the index
+        ids = np.flatnonzero(self.id_rows >= 0)
+        with open(Config.VECTOR_IDS_PATH, "w") as f:
+            json.dump(
+                {
+                    "next_id": self.next_id,
+                    "ids": ids.tolist(),
+                    "chunk_ids": [
+                        self.chunk_store.chunk_id(row)
+                        for row in self.id_rows[ids]
+                    ],
+                },
+                f,
+            )
         print(f"Index saved to {Config.VECTOR_DB_PATH}")
 
-    def load_index(self):
-        """Loads existing index and corpus metadata which matches it."""
-        if Config.VECTOR_DB_PATH.exists():
+    def add_chunks(self, chunks: List[Dict]) -> int:
+        """
+        Encodes and adds new chunks under fresh ids, without a rebuild.
+
+        Chunks missing from the chunk store are appended to it; chunks
+        whose row is already indexed are skipped. Callers must also write
+        the corpus (see HybridRetriever.add_chunks), which is where
+        metadata is resolved from on load.
+
+        Returns:
+            Number of chunks added.
+        """
+        if self.index is None:
+            self.load_index()
+        self.require_id_mapping()
+
+        rows = np.unique(self.chunk_store.extend(chunks))
+        indexed = self.id_rows[self.id_rows >= 0]
+        new_rows = rows[~np.isin(rows, indexed)]
+        if not len(new_rows):
+            return 0
+
+        embeddings = self.encode_chunks(list(self.chunk_store.texts(new_rows)))
+        ids = np.arange(
+            self.next_id, self.next_id + len(new_rows), dtype=np.int64
+        )
+        self.index.add_with_ids(embeddings, ids)
+
+        self.id_rows = np.concatenate([self.id_rows, new_rows])
+        self.next_id += len(new_rows)
+
+        # Keep the re-scoring matrix row-aligned with ids
+        if self.embeddings is not None:
+            self.embeddings = _save_embeddings(
+                np.concatenate([self.embeddings, embeddings])
+            )
+
+        self.save_index()
+        print(f"Added {len(new_rows)} chunks to the vector index.")
+        return len(new_rows)
+
+    def remove_by_url(self, url: str) -> int:
+        """
+        Removes every chunk of a document from the index.
+
+        The document's rows are dropped from the chunk store as well, so
+        other indexes sharing the store must follow (see
+        SparseIndex.remove_rows). HNSW graphs cannot
+        delete vectors; their ids are only unmapped and filtered out of
+        search results until a rebuild.
+
+        Returns:
+            Number of chunks removed.
+        """
+        if self.index is None:
+            self.load_index()
+        self.require_id_mapping()
+
+        rows = self.chunk_store.rows_for_url(url)
+        if not len(rows):
+            return 0
+
+        ids = np.flatnonzero(np.isin(self.id_rows, rows))
+        if len(ids):
+            try:
+                self.index.remove_ids(ids.astype(np.int64))
+            except RuntimeError:
+                print(f"'{self.index_type}' index can't delete; masking ids.")
+
+        # Compact the store, then follow the surviving rows
+        remap = self.chunk_store.remove_rows(rows)
+        mapped = self.id_rows >= 0
+        self.id_rows[mapped] = remap[self.id_rows[mapped]]
+
+        self.save_index()
+        print(f"Removed {len(rows)} chunks of {url} from the vector index.")
+        return len(rows)
+
+    def require_id_mapping(self):
+        """
+        Prepares the index for add/remove.
+
+        Positional indexes from older builds can't add or remove ids, and
+        memory-mapped indexes are read-only, so those get a private copy.
+        """
+        if not Config.VECTOR_IDS_PATH.exists():
+            raise RuntimeError(
+                "Vector index predates id mapping; run build_index() once "
+                "(cached chunk embeddings make this cheap)."
+            )
+        if self.mmapped:
             self.index = faiss.read_index(str(Config.VECTOR_DB_PATH))
-            # creating parallel path for metadata since FAISS doesn't store it
-            # In a real DB like Chroma/Pinecone, meatadata is attached. Here we just rely on order matching in corpus.json
-            with open(Config.CORPUS_PATH, "r") as f:
-                self.chunks = json.load(f)
+            self.mmapped = False
+
+    def encode_chunks(self, texts: List[str]) -> np.ndarray:
+        """
+        Returns normalized chunk embeddings, encoding only unseen content.
+
+        Embeddings are cached on disk keyed by a hash of the chunk text and
+        the encoder (model, backend and precision), so rebuilds after a
+        small corpus refresh reuse every unchanged chunk.
+        """
+        if self.chunk_embedding_store is None:
+            self.chunk_embedding_store = EmbeddingStore(
+                Config.CHUNK_EMBEDDING_CACHE_PATH
+            )
+        store = self.chunk_embedding_store
+        keys = [embedding_key(self.encoder_id, text) for text in texts]
+        cached = store.get_many(list(dict.fromkeys(keys)))
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                missing[key] = text
+        print(
+            f"Encoding {len(missing)} new chunks "
+            f"({len(cached)} reused from cache)..."
+        )
+
+        if missing:
+            # Batch encoding
+            vectors = self.model.encode(
+                list(missing.values()),
+                batch_size=32,
+                show_progress_bar=True,
+                convert_to_numpy=True,
+                normalize_embeddings=True,  # Important for cosine similarity
+            )
+            fresh = dict(zip(missing.keys(), vectors))
+            store.put_many(fresh)
+            cached.update(fresh)
+
+        return np.stack([cached[key] for key in keys]).astype(np.float32)
+
+    def load_index(self, mmap: Optional[bool] = None):
+        """
+        Loads existing index and corpus metadata which matches it.
+
+        Args:
+            mmap: Memory-map the index instead of reading it into process
+                memory (default Config.INDEX_MMAP). Mapped indexes are
+                read-only until the first add/remove.
+        """
+        if mmap is None:
+            mmap = Config.INDEX_MMAP
+
+        if Config.VECTOR_DB_PATH.exists():
+            self.mmapped = False
+            if mmap:
+                try:
+                    self.index = faiss.read_index(
+                        str(Config.VECTOR_DB_PATH),
+                        faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY,
+                    )
+                    self.mmapped = True
+                except RuntimeError:
+                    print("Index can't be memory-mapped, reading it instead.")
+            if not self.mmapped:
+                self.index = faiss.read_index(str(Config.VECTOR_DB_PATH))
+
+            # Indexes built before the meta file existed are always flat
+            index_type = "flat"
+            if Config.VECTOR_META_PATH.exists():
+                with open(Config.VECTOR_META_PATH, "r") as f:
+                    index_type = json.load(f).get("index_type", "flat")
+            if index_type != self.index_type:
+                print(
+                    f"Loaded '{index_type}' index (configured "
+                    f"'{self.index_type}'); rebuild to switch types."
+                )
+            self.index_type = index_type
+
+            # Memory-mapped: only re-scored rows are paged in
+            if Config.VECTOR_EMBEDDINGS_PATH.exists():
+                self.embeddings = np.load(
+                    Config.VECTOR_EMBEDDINGS_PATH, mmap_mode="r"
+                )
+
+            # FAISS doesn't store metadata; resolve ids through the saved
+            # id -> chunk_id mapping against the chunk store
+            if not len(self.chunk_store):
+                self.chunk_store.load()
+
+            if Config.VECTOR_IDS_PATH.exists():
+                with open(Config.VECTOR_IDS_PATH, "r") as f:
+                    mapping = json.load(f)
+                self.next_id = mapping["next_id"]
+                self.id_rows = np.full(self.next_id, -1, dtype=np.int64)
+                self.id_rows[mapping["ids"]] = (
+                    self.chunk_store.rows_for_chunk_ids(mapping["chunk_ids"])
+                )
+                missing = len(mapping["ids"]) - int(
+                    np.count_nonzero(self.id_rows >= 0)
+                )
+                if missing:
+                    print(f"Warning: {missing} indexed chunks not in corpus.")
+            else:
+                # Older indexes are positional: FAISS row i is corpus[i]
+                self.id_rows = np.arange(len(self.chunk_store), dtype=np.int64)
+                self.next_id = len(self.chunk_store)
         else:
             print("Index file not found. Please build it first.")
 
-    def search(self, query: str, k: int = 60) -> List[Tuple[Dict, float]]:
-        """Encodes query and retrieves top-k chunks with scores."""
+    def encode_queries(self, queries: List[str]) -> np.ndarray:
+        """
+        Returns normalized query embeddings, using the query cache.
+
+        Only queries missing from the cache go through the encoder, in a
+        single forward pass.
+        """
+        queries = [normalize_query(q) for q in queries]
+        cached = self.query_cache.get_many(queries)
+        missing = list(dict.fromkeys(q for q in queries if q not in cached))
+
+        if missing:
+            vectors = self.model.encode(
+                missing, convert_to_numpy=True, normalize_embeddings=True
+            )
+            fresh = dict(zip(missing, vectors))
+            self.query_cache.put_many(fresh)
+            cached.update(fresh)
+
+        return np.stack([cached[q] for q in queries]).astype(np.float32)
+
+    def _search_params(
+        self, k: int, nprobe: Optional[int], ef_search: Optional[int]
+    ) -> Optional[faiss.SearchParameters]:
+        """Per-request search parameters for approximate index types."""
+        if self.index_type in IVF_TYPES:
+            return faiss.SearchParametersIVF(
+                nprobe=nprobe or Config.IVF_NPROBE
+            )
+        if self.index_type == "hnsw":
+            # efSearch below k would truncate the result list
+            return faiss.SearchParametersHNSW(
+                efSearch=max(ef_search or Config.HNSW_EF_SEARCH, k)
+            )
+        return None
+
+    def search(
+        self,
+        query: str,
+        k: int = 60,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[Tuple[Dict, float]]:
+        """
+        Encodes query and retrieves top-k chunks with scores.
+
+        nprobe (IVF) and ef_search (HNSW) override the configured
+        speed/recall trade-off for this call; flat indexes ignore them.
+        """
+        return self.search_batch([query], k, nprobe, ef_search)[0]
+
+    def search_batch(
+        self,
+        queries: List[str],
+        k: int = 60,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[List[Tuple[Dict, float]]]:
+        """
+        Retrieves top-k chunks for many queries at once.
+
+        Uncached queries are encoded in one forward pass, then all queries
+        are searched with a single FAISS call over the query matrix.
+        """
+        return [
+            materialize(self.chunk_store, rows, scores)
+            for rows, scores in self.search_ids_batch(
+                queries, k, nprobe, ef_search
+            )
+        ]
+
+    def search_ids(
+        self,
+        query: str,
+        k: int = 60,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Like search(), but returns (chunk store rows, scores) arrays."""
+        return self.search_ids_batch([query], k, nprobe, ef_search)[0]
+
+    def search_ids_batch(
+        self,
+        queries: List[str],
+        k: int = 60,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Retrieves top-k chunk store rows for many queries at once.
+
+        Returns:
+            One (rows, scores) tuple per query, best first. No chunk
+            metadata is touched; see ChunkStore to resolve rows.
+        """
         if self.index is None:
             self.load_index()
 
-        query_vector = self.model.encode(
-            [query], convert_to_numpy=True, normalize_embeddings=True
+        query_vectors = self.encode_queries(queries)
+
+        # Compressed indexes over-fetch a shortlist for exact re-scoring
+        rescore = (
+            Config.VECTOR_RESCORE
+            and self.index_type in QUANTIZED_TYPES
+            and self.embeddings is not None
+        )
+        fetch_k = k * Config.RESCORE_FACTOR if rescore else k
+        # Over-fetch past ids masked out of indexes that can't delete
+        fetch_k += max(
+            0, self.index.ntotal - int(np.count_nonzero(self.id_rows >= 0))
         )
 
-        distances, indices = self.index.search(query_vector, k)
+        distances, indices = self.index.search(
+            query_vectors,
+            fetch_k,
+            params=self._search_params(fetch_k, nprobe, ef_search),
+        )
+        if rescore:
+            distances, indices = rescore_candidates(
+                self.embeddings, query_vectors, indices, fetch_k
+            )
 
-        results = []
-        for i in range(k):
-            idx = indices[0][i]
-            score = distances[0][i]
-            if idx != -1 and idx < len(self.chunks):
-                results.append((self.chunks[idx], float(score)))
+        # FAISS ids -> store rows; empty slots and removed ids become -1
+        valid = (indices >= 0) & (indices < len(self.id_rows))
+        rows = np.full(indices.shape, -1, dtype=np.int64)
+        rows[valid] = self.id_rows[indices[valid]]
 
-        return results
+        batch_results = []
+        for row_ids, row_scores in zip(rows, distances):
+            keep = row_ids >= 0
+            batch_results.append(
+                (row_ids[keep][:k], row_scores[keep][:k].astype(np.float64))
+            )
+        return batch_results
 
 
 if __name__ == "__main__":
@@ -0,0 +1,60 @@
+"""Shared setup for the unit tests."""
+
+import os
+import sys
+
+import pytest
+
+# Add repo root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+
+class FakeEncoding:
+    def __init__(self, input_ids):
+        self.input_ids = input_ids
+
+
+class FakeTokenizer:
+    """
+    Subword tokenizer stand-in that splits words into 3-character pieces.
+
+    SentencePiece style marks every word start with "▁"; byte-level BPE
+    style marks word starts with "Ġ" except at the start of the text.
+    """
+
+    def __init__(self, style: str):
+        self.marker = "▁" if style == "sentencepiece" else "Ġ"
+        self.mark_first = style == "sentencepiece"
+        self.vocab = {}
+        self.inputs = []  # Texts passed to __call__
+
+    def __call__(self, text, add_special_tokens=True):
+        self.inputs.append(text)
+        if isinstance(text, list):
+            return FakeEncoding([self.encode(t) for t in text])
+        return FakeEncoding(self.encode(text))
+
+    def encode(self, text):
+        ids = []
+        for i, word in enumerate(text.split(" ")):
+            mark = self.marker if (i or self.mark_first) else ""
+            pieces = [word[j : j + 3] for j in range(0, len(word), 3)]
+            pieces[0] = mark + pieces[0]
+            ids += [self.vocab.setdefault(p, len(self.vocab)) for p in pieces]
+        return ids
+
+    def decode(self, ids, skip_special_tokens=False):
+        text = "".join(self.convert_ids_to_tokens(list(ids)))
+        return text.replace(self.marker, " ").strip()
+
+    def convert_ids_to_tokens(self, ids):
+        tokens = {i: token for token, i in self.vocab.items()}
+        return [tokens[i] for i in ids]
+
+    def __len__(self):
+        return len(self.vocab)
+
+
+@pytest.fixture(params=["sentencepiece", "byte_bpe"])
+def tokenizer(request):
+    return FakeTokenizer(request.param)
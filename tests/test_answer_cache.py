@@ -0,0 +1,78 @@
+"""Tests for the semantic answer cache."""
+
+import numpy as np
+
+from src.generation.answer_cache import SemanticAnswerCache
+
+
+def unit(*values):
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_similar_query_hits_and_dissimilar_misses():
+    cache = SemanticAnswerCache(threshold=0.95)
+    cache.put(unit(1, 0, 0), "v1", {"answer": "a"})
+
+    payload, similarity = cache.lookup(unit(1, 0.1, 0), "v1")
+    assert payload == {"answer": "a"} and similarity >= 0.95
+    assert cache.lookup(unit(1, 1, 0), "v1") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_namespaces_are_separate():
+    cache = SemanticAnswerCache()
+    cache.put(unit(1, 0), "v1", {"shape": "answer"}, namespace="answer")
+
+    assert cache.lookup(unit(1, 0), "v1", namespace="details") is None
+    cache.put(unit(1, 0), "v1", {"shape": "details"}, namespace="details")
+    assert cache.lookup(unit(1, 0), "v1", "answer")[0]["shape"] == "answer"
+    assert cache.lookup(unit(1, 0), "v1", "details")[0]["shape"] == "details"
+
+
+def test_stale_entries_are_dropped():
+    cache = SemanticAnswerCache()
+    cache.put(unit(1, 0), "v1", {"answer": "old"})
+
+    assert cache.lookup(unit(1, 0), "v2") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_stale_nearest_entry_does_not_hide_a_current_one():
+    cache = SemanticAnswerCache(threshold=0.9)
+    cache.put(unit(1, 0.1), "v2", {"answer": "current"})
+    cache.put(unit(1, 0), "v1", {"answer": "stale"})
+
+    payload, _ = cache.lookup(unit(1, 0), "v2")
+    assert payload == {"answer": "current"}
+
+
+def test_payloads_are_copied_in_and_out():
+    cache = SemanticAnswerCache()
+    payload = {"answer": "a", "retrieved_chunks": [{"content": "c"}]}
+    cache.put(unit(1, 0), "v1", payload)
+    payload["retrieved_chunks"][0]["content"] = "edited"
+
+    hit, _ = cache.lookup(unit(1, 0), "v1")
+    hit["retrieved_chunks"].clear()
+    hit, _ = cache.lookup(unit(1, 0), "v1")
+    assert hit["retrieved_chunks"] == [{"content": "c"}]
+
+
+def test_lru_eviction_across_namespaces():
+    cache = SemanticAnswerCache(max_size=2)
+    cache.put(unit(1, 0, 0), "v1", {"answer": "a"})
+    cache.put(unit(0, 1, 0), "v1", {"answer": "b"}, namespace="details")
+    cache.lookup(unit(1, 0, 0), "v1")  # a is now most recent
+    cache.put(unit(0, 0, 1), "v1", {"answer": "c"})
+
+    assert cache.lookup(unit(0, 1, 0), "v1", "details") is None
+    assert cache.lookup(unit(1, 0, 0), "v1") is not None
+    assert cache.stats()["size"] == 2
+
+
+def test_zero_size_disables_caching():
+    cache = SemanticAnswerCache(max_size=0)
+    cache.put(unit(1, 0), "v1", {"answer": "a"})
+    assert not cache.enabled
+    assert cache.lookup(unit(1, 0), "v1") is None
@@ -0,0 +1,123 @@
+"""Tests for the inverted-index BM25 scorer."""
+
+import random
+
+import numpy as np
+import pytest
+
+from src.retrieval.bm25 import InvertedBM25
+
+
+def make_docs(num_docs: int, seed: int = 0):
+    """Random tokenized documents with a few very common terms."""
+    rng = random.Random(seed)
+    vocab = [f"t{i}" for i in range(150)] + ["the"] * 40
+    return [
+        [rng.choice(vocab) for _ in range(rng.randint(3, 40))]
+        for _ in range(num_docs)
+    ]
+
+
+@pytest.fixture
+def docs():
+    return make_docs(200)
+
+
+@pytest.fixture
+def queries():
+    rng = random.Random(1)
+    vocab = [f"t{i}" for i in range(160)] + ["the"]
+    return [[rng.choice(vocab) for _ in range(4)] for _ in range(30)]
+
+
+def dense_scores(index, num_docs, queries):
+    """score_batch results as one full score vector per query."""
+    rows = []
+    for doc_ids, scores in index.score_batch(queries):
+        row = np.zeros(num_docs)
+        row[doc_ids] = scores
+        rows.append(row)
+    return rows
+
+
+def test_scores_match_rank_bm25(docs, queries):
+    rank_bm25 = pytest.importorskip("rank_bm25")
+    reference = rank_bm25.BM25Okapi(docs)
+    index = InvertedBM25().fit(docs)
+
+    for query, scores in zip(queries, dense_scores(index, len(docs), queries)):
+        np.testing.assert_array_equal(scores, reference.get_scores(query))
+
+
+def test_top_k_is_best_positive_scores(docs, queries):
+    index = InvertedBM25().fit(docs)
+
+    for query, scores in zip(queries, dense_scores(index, len(docs), queries)):
+        doc_ids, top_scores = index.top_k(query, k=5)
+        order = np.lexsort((np.arange(len(docs)), -scores))
+        expected = [i for i in order if scores[i] > 0][:5]
+        assert doc_ids.tolist() == expected
+        np.testing.assert_array_equal(top_scores, scores[expected])
+
+
+def test_unknown_terms_match_nothing(docs):
+    index = InvertedBM25().fit(docs)
+
+    assert index.term_ids(["t1", "missing"]).tolist()[1] == -1
+    doc_ids, scores = index.top_k(["missing", "also-missing"], k=5)
+    assert not len(doc_ids) and not len(scores)
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_save_load_roundtrip(tmp_path, docs, queries, mmap):
+    index = InvertedBM25().fit(docs)
+    index.save(tmp_path)
+    loaded = InvertedBM25.load(tmp_path, mmap=mmap)
+
+    for expected, actual in zip(
+        dense_scores(index, len(docs), queries),
+        dense_scores(loaded, len(docs), queries),
+    ):
+        np.testing.assert_array_equal(actual, expected)
+
+
+def test_add_documents_matches_full_fit(docs, queries):
+    extra = make_docs(60, seed=2) + [["brandnewterm", "t1"]]
+    index = InvertedBM25().fit(docs)
+    index.add_documents(extra[:30])
+    index.add_documents(extra[30:])
+    full = InvertedBM25().fit(docs + extra)
+
+    assert np.array_equal(index.terms, full.terms)
+    num_docs = len(docs) + len(extra)
+    for expected, actual in zip(
+        dense_scores(full, num_docs, queries + [["brandnewterm"]]),
+        dense_scores(index, num_docs, queries + [["brandnewterm"]]),
+    ):
+        np.testing.assert_allclose(actual, expected, rtol=1e-9, atol=1e-12)
+
+
+def test_remove_documents_matches_full_fit(docs, queries):
+    removed = np.array(sorted(random.Random(3).sample(range(len(docs)), 40)))
+    index = InvertedBM25().fit(docs)
+    index.remove_documents(removed)
+    removed_set = set(removed.tolist())
+    kept = [doc for i, doc in enumerate(docs) if i not in removed_set]
+    full = InvertedBM25().fit(kept)
+
+    assert index.num_docs == len(kept)
+    assert np.array_equal(index.terms, full.terms)
+    for expected, actual in zip(
+        dense_scores(full, len(kept), queries),
+        dense_scores(index, len(kept), queries),
+    ):
+        np.testing.assert_allclose(actual, expected, rtol=1e-9, atol=1e-12)
+
+
+def test_saved_index_stays_updatable(tmp_path, docs):
+    InvertedBM25().fit(docs).save(tmp_path)
+    assert InvertedBM25.load(tmp_path).updatable
+
+    # Indexes saved before term frequencies were kept can only be rebuilt
+    (tmp_path / "tfs.npy").unlink()
+    assert not InvertedBM25.load(tmp_path).updatable
@@ -0,0 +1,107 @@
+"""Tests for the columnar chunk store."""
+
+import json
+
+import numpy as np
+import pytest
+
+from src.config import Config
+from src.data.chunk_store import ChunkStore, materialize
+
+
+def make_chunks(num_chunks: int, start: int = 0):
+    return [
+        {
+            "chunk_id": f"id-{i}",
+            "url": f"https://example.org/{i // 3}",
+            "title": f"Article {i // 3}",
+            "content": f"Chunk {i} text with ünïcode ✓",
+            "token_count": 6,
+            "start_token": (i % 3) * 4,
+        }
+        for i in range(start, start + num_chunks)
+    ]
+
+
+@pytest.fixture
+def chunks():
+    return make_chunks(10)
+
+
+def test_rows_round_trip_to_chunk_dicts(chunks):
+    store = ChunkStore.from_chunks(chunks)
+
+    assert len(store) == len(chunks)
+    assert store.get_many(range(len(store))) == chunks
+    assert list(store.texts([2, 0])) == [
+        chunks[2]["content"],
+        chunks[0]["content"],
+    ]
+
+
+def test_extend_skips_stored_and_duplicate_ids(chunks):
+    store = ChunkStore.from_chunks(chunks[:5])
+    rows = store.extend(chunks[3:8] + [chunks[6]])
+
+    assert rows.tolist() == [3, 4, 5, 6, 7, 6]
+    assert len(store) == 8
+    assert store.get(7) == chunks[7]
+
+
+def test_row_lookups(chunks):
+    store = ChunkStore.from_chunks(chunks)
+
+    rows = store.rows_for_chunk_ids(["id-4", "missing", "id-0"])
+    assert rows.tolist() == [4, -1, 0]
+    assert store.rows_for_url("https://example.org/1").tolist() == [3, 4, 5]
+    assert not len(store.rows_for_url("https://example.org/missing"))
+
+
+def test_remove_rows_compacts_and_remaps(chunks):
+    store = ChunkStore.from_chunks(chunks)
+    remap = store.remove_rows(np.array([1, 4, 5]))
+
+    kept = [c for i, c in enumerate(chunks) if i not in (1, 4, 5)]
+    assert remap.tolist() == [0, -1, 1, 2, -1, -1, 3, 4, 5, 6]
+    assert store.get_many(range(len(store))) == kept
+    assert store.rows_for_chunk_ids(["id-6", "id-4"]).tolist() == [3, -1]
+
+
+def test_materialize_pairs_rows_with_scores(chunks):
+    store = ChunkStore.from_chunks(chunks)
+    results = materialize(store, np.array([3, 1]), np.array([0.5, 0.25]))
+
+    assert results == [(chunks[3], 0.5), (chunks[1], 0.25)]
+    assert all(isinstance(score, float) for _, score in results)
+
+
+@pytest.mark.parametrize("compression", ["zlib", None])
+@pytest.mark.parametrize("mmap", [True, False])
+def test_binary_store_round_trip(tmp_path, monkeypatch, compression, mmap):
+    monkeypatch.setattr(Config, "CORPUS_COMPRESSION", compression)
+    monkeypatch.setattr(Config, "CORPUS_BLOCK_ROWS", 4)
+    monkeypatch.setattr(Config, "INDEX_MMAP", mmap)
+    chunks = make_chunks(10)
+    ChunkStore.from_chunks(chunks).save(tmp_path)
+
+    store = ChunkStore().load(tmp_path)
+    assert store.get_many(range(len(store))) == chunks
+
+    # Loaded stores can still be edited
+    store.extend(make_chunks(2, start=10))
+    store.remove_rows(np.array([0]))
+    assert store.get_many(range(len(store))) == make_chunks(11, start=1)
+
+
+def test_load_falls_back_to_json_without_writing(tmp_path, monkeypatch):
+    corpus_path = tmp_path / "corpus.json"
+    store_path = tmp_path / "corpus_store"
+    monkeypatch.setattr(Config, "CORPUS_PATH", corpus_path)
+    monkeypatch.setattr(Config, "CORPUS_STORE_PATH", store_path)
+    chunks = make_chunks(5)
+    with open(corpus_path, "w") as f:
+        json.dump(chunks, f)
+
+    store = ChunkStore().load()
+    assert store.get_many(range(len(store))) == chunks
+    assert not store_path.exists()
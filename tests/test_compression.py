@@ -0,0 +1,121 @@
+"""Tests for extractive context compression."""
+
+import numpy as np
+import pytest
+
+from src.generation.compression import ContextCompressor, split_sentences
+
+TOPICS = ("cats", "dogs", "birds")
+
+
+class FakeEncoder:
+    """Embeds a sentence by which topic words it mentions."""
+
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, sentences, **kwargs):
+        self.batches.append(list(sentences))
+        vectors = np.array(
+            [[topic in s for topic in TOPICS] + [1e-3] for s in sentences],
+            dtype=np.float32,
+        )
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def query(topic: str) -> np.ndarray:
+    vector = np.zeros(len(TOPICS) + 1, dtype=np.float32)
+    vector[TOPICS.index(topic)] = 1.0
+    return vector
+
+
+@pytest.fixture
+def encoder():
+    return FakeEncoder()
+
+
+@pytest.fixture
+def chunks():
+    return [
+        {
+            "chunk_id": "a",
+            "content": "Dogs bark at night. Some cats sleep all day. "
+            "Birds sing.",
+        },
+        {
+            "chunk_id": "b",
+            "content": "Wild cats hunt birds. Dogs fetch sticks.",
+            "parts": [("b", 0, 7)],
+            "focus_word": 0,
+        },
+    ]
+
+
+def test_split_sentences():
+    assert split_sentences(' One. Two? (Three) 3.5 stays! "Four" ') == [
+        "One.",
+        "Two?",
+        "(Three) 3.5 stays!",
+        '"Four"',
+    ]
+    assert split_sentences("e.g. lower case continues") == [
+        "e.g. lower case continues"
+    ]
+
+
+def test_keeps_relevant_sentences_in_document_order(
+    encoder, tokenizer, chunks
+):
+    compressor = ContextCompressor(encoder, tokenizer)
+    compressed = compressor.compress(query("cats"), chunks, max_tokens=17)
+
+    assert [c["content"] for c in compressed] == [
+        "Some cats sleep all day.",
+        "Wild cats hunt birds.",
+    ]
+    assert [c["source_chunk_id"] for c in compressed] == ["a", "b"]
+    assert all(c["chunk_id"] is None for c in compressed)
+    assert "parts" not in compressed[1]
+    assert "focus_word" not in compressed[1]
+
+
+def test_respects_token_budget(encoder, tokenizer, chunks):
+    compressor = ContextCompressor(encoder, tokenizer)
+
+    for max_tokens in range(1, 40):
+        compressed = compressor.compress(query("dogs"), chunks, max_tokens)
+        used = sum(
+            len(tokenizer.encode(sentence))
+            for c in compressed
+            for sentence in split_sentences(c["content"])
+        )
+        assert compressed and used <= max_tokens
+
+
+def test_best_sentence_is_cut_when_nothing_fits(encoder, tokenizer, chunks):
+    compressor = ContextCompressor(encoder, tokenizer)
+    [compressed] = compressor.compress(query("cats"), chunks, max_tokens=3)
+
+    assert compressed["source_chunk_id"] == "a"
+    assert len(tokenizer.encode(compressed["content"])) <= 3
+    assert "Some cats sleep all day.".startswith(compressed["content"])
+    assert compressor.compress(query("cats"), chunks, max_tokens=0) == []
+
+
+def test_sentence_data_is_cached(encoder, tokenizer, chunks):
+    compressor = ContextCompressor(encoder, tokenizer, cache_size=2)
+    compressor.compress(query("cats"), chunks, max_tokens=20)
+    compressor.compress(query("dogs"), chunks[::-1], max_tokens=20)
+    assert len(encoder.batches) == 1
+
+    # Chunks without an id are keyed by content
+    extra = {"chunk_id": None, "content": "Birds fly south."}
+    compressor.compress(query("birds"), [extra], max_tokens=20)
+    compressor.compress(query("birds"), [dict(extra)], max_tokens=20)
+    assert encoder.batches[1:] == [["Birds fly south."]]
+
+    # Least recently used chunk "b" was evicted
+    compressor.compress(query("cats"), chunks, max_tokens=20)
+    assert encoder.batches[2:] == [
+        ["Wild cats hunt birds.", "Dogs fetch sticks."]
+    ]
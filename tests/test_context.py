@@ -0,0 +1,145 @@
+"""Tests for context consolidation."""
+
+import random
+
+import pytest
+
+from src.generation.context import ContextConsolidator
+
+random.seed(0)
+WORDS = [
+    "".join(random.choice("abcdefgh") for _ in range(random.randint(1, 8)))
+    for _ in range(400)
+]
+
+
+def make_chunk(i: int, start: int, num_words: int, positions: bool = True):
+    chunk = {
+        "chunk_id": f"c{i}",
+        "url": "https://example.org/a",
+        "title": "A",
+        "content": " ".join(WORDS[start : start + num_words]),
+    }
+    if positions:
+        chunk["start_token"] = start
+    return chunk
+
+
+def span_text(start: int, end: int) -> str:
+    return " ".join(WORDS[start:end])
+
+
+@pytest.fixture
+def consolidator():
+    return ContextConsolidator()
+
+
+def test_overlapping_chunks_merge_in_document_order(consolidator):
+    chunks = [make_chunk(1, 50, 100), make_chunk(0, 0, 100)]
+    [span] = consolidator.consolidate(chunks)
+
+    assert span["content"] == span_text(0, 150)
+    assert span["chunk_ids"] == ["c0", "c1"]
+    assert span["chunk_id"] == "c0+c1"
+    assert span["start_token"] == 0
+
+
+def test_adjacent_chunks_merge_and_distant_ones_do_not(consolidator):
+    chunks = [
+        make_chunk(0, 0, 50),
+        make_chunk(1, 200, 50),
+        make_chunk(2, 50, 50),
+    ]
+    spans = consolidator.consolidate(chunks)
+
+    assert [span["content"] for span in spans] == [
+        span_text(0, 100),
+        span_text(200, 250),
+    ]
+
+
+def test_bridging_chunk_joins_two_spans(consolidator):
+    chunks = [
+        make_chunk(0, 0, 60),
+        make_chunk(2, 100, 60),
+        make_chunk(1, 50, 60),
+    ]
+    [span] = consolidator.consolidate(chunks)
+
+    assert span["content"] == span_text(0, 160)
+    assert span["chunk_ids"] == ["c0", "c1", "c2"]
+
+
+def test_other_articles_and_duplicates(consolidator):
+    other = dict(make_chunk(1, 50, 100), url="https://example.org/b")
+    chunks = [make_chunk(0, 0, 100), other, make_chunk(2, 0, 100)]
+    spans = consolidator.consolidate(chunks)
+
+    assert [span["chunk_id"] for span in spans] == ["c0", "c1"]
+
+
+def test_contained_chunk_adds_no_text(consolidator):
+    chunks = [make_chunk(0, 0, 100), make_chunk(1, 20, 30)]
+    [span] = consolidator.consolidate(chunks)
+
+    assert span["content"] == span_text(0, 100)
+
+
+def test_text_overlap_without_positions(consolidator):
+    chunks = [
+        make_chunk(1, 40, 50, positions=False),
+        make_chunk(0, 0, 60, positions=False),
+    ]
+    [span] = consolidator.consolidate(chunks)
+
+    assert span["content"] == span_text(0, 90)
+    assert span["chunk_ids"] == ["c0", "c1"]
+
+
+def test_short_text_overlap_is_not_merged(consolidator):
+    chunks = [
+        make_chunk(0, 0, 60, positions=False),
+        make_chunk(1, 55, 50, positions=False),
+    ]
+    assert len(consolidator.consolidate(chunks)) == 2
+
+
+def test_parts_cover_span_words(consolidator):
+    chunks = [
+        make_chunk(2, 150, 100),
+        make_chunk(0, 0, 100),
+        make_chunk(1, 50, 100),
+        make_chunk(3, 120, 20),
+    ]
+    [span] = consolidator.consolidate(chunks)
+
+    assert span["content"] == span_text(0, 250)
+    assert span["parts"] == [("c0", 0, 100), ("c1", 50, 100), ("c2", 0, 100)]
+    visible = sum(num_words - skip for _, skip, num_words in span["parts"])
+    assert visible == len(span["content"].split())
+
+
+@pytest.mark.parametrize(
+    "order, focus_word",
+    [
+        ([make_chunk(1, 250, 100), make_chunk(0, 0, 300)], 250),
+        ([make_chunk(0, 0, 300), make_chunk(1, 250, 100)], 0),
+        (
+            [
+                make_chunk(2, 200, 100),
+                make_chunk(0, 0, 100),
+                make_chunk(1, 100, 100),
+            ],
+            200,
+        ),
+    ],
+)
+def test_focus_word_points_at_best_ranked_chunk(
+    consolidator, order, focus_word
+):
+    [span] = consolidator.consolidate(order)
+
+    assert span["focus_word"] == focus_word
+    best = order[0]["content"].split()
+    words = span["content"].split()
+    assert words[focus_word : focus_word + len(best)] == best
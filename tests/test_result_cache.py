@@ -0,0 +1,62 @@
+"""Tests for the retrieval result cache."""
+
+from src.retrieval import result_cache
+from src.retrieval.result_cache import RetrievalResultCache, artifact_version
+
+
+def results(name: str):
+    return [({"chunk_id": name, "content": name}, 1.0)]
+
+
+def test_hit_and_lru_eviction():
+    cache = RetrievalResultCache(max_size=2)
+    cache.put("a", results("a"))
+    cache.put("b", results("b"))
+    assert cache.get("a") == results("a")  # a is now most recent
+
+    cache.put("c", results("c"))
+    assert cache.get("b") is None
+    assert cache.get("a") == results("a")
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 1
+
+
+def test_entries_expire(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(result_cache.time, "monotonic", lambda: now[0])
+    cache = RetrievalResultCache(ttl_seconds=10)
+    cache.put("a", results("a"))
+
+    now[0] = 109.0
+    assert cache.get("a") is not None
+    now[0] = 111.0
+    assert cache.get("a") is None
+
+
+def test_callers_cannot_change_cached_results():
+    cache = RetrievalResultCache()
+    stored = results("a")
+    cache.put("a", stored)
+    stored[0][0]["content"] = "edited before the hit"
+
+    hit = cache.get("a")
+    hit[0][0]["note"] = "annotated by a caller"
+    hit.append(results("b")[0])
+    assert cache.get("a") == results("a")
+
+
+def test_zero_size_disables_caching():
+    cache = RetrievalResultCache(max_size=0)
+    cache.put("a", results("a"))
+    assert cache.get("a") is None
+
+
+def test_artifact_version_changes_when_a_file_is_replaced(tmp_path):
+    path = tmp_path / "index.bin"
+    missing = tmp_path / "missing.bin"
+    path.write_bytes(b"v1")
+    before = artifact_version([path, missing])
+
+    path.write_bytes(b"version 2")
+    after = artifact_version([path, missing])
+    assert before != after
+    assert after[1] is None
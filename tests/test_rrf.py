@@ -0,0 +1,93 @@
+"""Tests for Reciprocal Rank Fusion."""
+
+import random
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+from src.retrieval.rrf import RRFGrouper
+
+
+def reference_fuse(grouper, dense_ids, sparse_ids, top_n_out, preserve):
+    """Straightforward dict-based RRF, as fuse() used to compute it."""
+    scores = defaultdict(float)
+    for rank, doc_id in enumerate(dense_ids, 1):
+        scores[doc_id] += grouper.weight_dense / (grouper.k_const + rank)
+    for rank, doc_id in enumerate(sparse_ids, 1):
+        scores[doc_id] += grouper.weight_sparse / (grouper.k_const + rank)
+
+    preserved = list(dict.fromkeys(dense_ids[:preserve]))
+    ranked = sorted(scores, key=lambda doc_id: scores[doc_id], reverse=True)
+    order = preserved + [d for d in ranked if d not in preserved]
+    if top_n_out is not None:
+        order = order[:top_n_out]
+    return order, [scores[doc_id] for doc_id in order]
+
+
+def test_known_ordering():
+    grouper = RRFGrouper(k_const=60)
+    # A=0 (dense 1), B=1 (dense 2, sparse 1), C=2 (sparse 2)
+    ids, scores = grouper.fuse_ids([0, 1], [1, 2], preserve_top_dense=0)
+
+    assert ids.tolist() == [1, 0, 2]
+    np.testing.assert_allclose(
+        scores, [1 / 62 + 1 / 61, 1 / 61, 1 / 62], rtol=1e-12
+    )
+    ids, _ = grouper.fuse_ids([0, 1], [1, 2])
+    assert ids.tolist() == [0, 1, 2]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_fuse_ids_matches_reference(seed):
+    rng = random.Random(seed)
+    grouper = RRFGrouper(
+        k_const=rng.choice([1, 60]),
+        weight_dense=rng.choice([1.0, 0.7]),
+        weight_sparse=rng.choice([1.0, 1.3]),
+    )
+    pool = list(range(rng.randint(1, 80)))
+    dense_ids = rng.sample(pool, rng.randint(0, len(pool)))
+    sparse_ids = rng.sample(pool, rng.randint(0, len(pool)))
+    top_n_out = rng.choice([None, 1, 5, 10, 200])
+    preserve = rng.choice([0, 1])
+
+    ids, scores = grouper.fuse_ids(
+        dense_ids,
+        sparse_ids,
+        top_n_out=top_n_out,
+        preserve_top_dense=preserve,
+    )
+    expected_ids, expected_scores = reference_fuse(
+        grouper, dense_ids, sparse_ids, top_n_out, preserve
+    )
+    assert ids.tolist() == expected_ids
+    np.testing.assert_allclose(scores, expected_scores, rtol=1e-12)
+
+
+def test_ties_keep_first_seen_order():
+    grouper = RRFGrouper(k_const=60)
+    # Every id has the same score; dense ids come before sparse ones
+    ids, _ = grouper.fuse_ids([5, 3], [], preserve_top_dense=0)
+    assert ids.tolist() == [5, 3]
+    ids, _ = grouper.fuse_ids([7], [2], preserve_top_dense=0)
+    assert ids.tolist() == [7, 2]
+
+
+def test_fuse_equals_fuse_ids_on_chunks():
+    grouper = RRFGrouper(k_const=60)
+    chunks = [{"chunk_id": c, "content": c} for c in "ABCDE"]
+    dense = [(chunks[i], 1.0) for i in (0, 1, 3)]
+    sparse = [(chunks[i], 1.0) for i in (3, 4, 1, 2)]
+
+    results = grouper.fuse(dense, sparse, top_n_out=4)
+    ids, scores = grouper.fuse_ids([0, 1, 3], [3, 4, 1, 2], top_n_out=4)
+    assert [chunk["chunk_id"] for chunk, _ in results] == [
+        "ABCDE"[i] for i in ids
+    ]
+    assert [score for _, score in results] == scores.tolist()
+
+
+def test_empty_inputs():
+    ids, scores = RRFGrouper().fuse_ids([], [])
+    assert not len(ids) and not len(scores)
@@ -0,0 +1,184 @@
+"""Tests for the chunk token cache."""
+
+import random
+
+import numpy as np
+
+from src.data.chunk_store import ChunkStore
+from src.generation.context import ContextConsolidator
+from src.generation.token_cache import ChunkTokenCache
+
+random.seed(0)
+WORDS = [
+    "".join(random.choice("abcdefgh") for _ in range(random.randint(1, 8)))
+    for _ in range(400)
+]
+
+
+def make_chunk(i: int, content: str = None):
+    return {
+        "chunk_id": f"id-{i:03d}",
+        "url": f"https://example.org/{i}",
+        "title": f"Article {i}",
+        "content": content or f"chunk number {i} about tokenization",
+        "token_count": 5,
+        "start_token": 0,
+    }
+
+
+def make_window(i: int, start: int, num_words: int, positions: bool = True):
+    chunk = {
+        "chunk_id": f"w{i}",
+        "url": "https://example.org/a",
+        "content": " ".join(WORDS[start : start + num_words]),
+    }
+    if positions:
+        chunk["start_token"] = start
+    return chunk
+
+
+def make_store(ids):
+    return ChunkStore.from_chunks([make_chunk(i) for i in ids])
+
+
+def test_build_matches_direct_tokenization(tokenizer):
+    store = make_store([3, 1, 2])
+    cache = ChunkTokenCache(tokenizer, "fake").load_or_build(store)
+
+    for row in range(len(store)):
+        chunk = store.get(row)
+        assert cache.get(chunk).tolist() == tokenizer.encode(chunk["content"])
+
+
+def test_saved_cache_is_reused(tokenizer, tmp_path):
+    ChunkTokenCache(tokenizer, "fake", tmp_path).load_or_build(
+        make_store([0, 1, 2])
+    )
+    calls = len(tokenizer.inputs)
+
+    cache = ChunkTokenCache(tokenizer, "fake", tmp_path)
+    cache.load_or_build(make_store([0, 1, 2]))
+    assert len(tokenizer.inputs) == calls
+    assert isinstance(cache.token_ids, np.memmap)
+    assert cache.get(make_chunk(1)).tolist() == tokenizer.encode(
+        make_chunk(1)["content"]
+    )
+    assert len(tokenizer.inputs) == calls
+
+
+def test_rebuild_tokenizes_only_new_chunks(tokenizer, tmp_path):
+    ChunkTokenCache(tokenizer, "fake", tmp_path).load_or_build(
+        make_store([0, 1, 2])
+    )
+
+    tokenizer.inputs.clear()
+    cache = ChunkTokenCache(tokenizer, "fake", tmp_path)
+    cache.load_or_build(make_store([1, 2, 4]))
+
+    assert tokenizer.inputs == [[make_chunk(4)["content"]]]
+    assert cache.chunk_ids.tolist() == [b"id-001", b"id-002", b"id-004"]
+
+
+def test_other_tokenizer_rebuilds(tokenizer, tmp_path):
+    ChunkTokenCache(tokenizer, "fake", tmp_path).load_or_build(
+        make_store([0, 1])
+    )
+    calls = len(tokenizer.inputs)
+
+    ChunkTokenCache(tokenizer, "other", tmp_path).load_or_build(
+        make_store([0, 1])
+    )
+    assert len(tokenizer.inputs) == calls + 1
+
+
+def test_unseen_chunks_are_kept_in_bounded_lru(tokenizer):
+    cache = ChunkTokenCache(tokenizer, "fake", extra_size=2)
+    cache.load_or_build(make_store([0]))
+
+    for i in (1, 2):
+        cache.get(make_chunk(i))
+    cache.get(make_chunk(1))  # id-001 is now most recent
+    cache.get(make_chunk(3))
+    assert list(cache.extra) == ["id-001", "id-003"]
+
+    calls = len(tokenizer.inputs)
+    cache.get(make_chunk(1))
+    assert len(tokenizer.inputs) == calls
+
+
+def test_chunks_without_id_are_not_cached(tokenizer):
+    cache = ChunkTokenCache(tokenizer, "fake")
+    chunk = {"content": "compressed sentence text"}
+
+    assert cache.get(chunk).tolist() == tokenizer.encode(chunk["content"])
+    assert not cache.extra
+
+
+def warm(cache, tokenizer, chunks):
+    """Caches the chunks and adds all their pieces to the vocabulary."""
+    for chunk in chunks:
+        cache.get(chunk)
+    tokenizer.encode(" ".join(WORDS))
+
+
+def test_merged_span_ids_equal_direct_tokenization(tokenizer):
+    windows = [
+        make_window(0, 0, 100),
+        make_window(1, 50, 100),
+        make_window(2, 120, 100),
+        make_window(3, 130, 20),
+    ]
+    cache = ChunkTokenCache(tokenizer, "fake")
+    warm(cache, tokenizer, windows)
+    [span] = ContextConsolidator().consolidate(windows[2:] + windows[:2])
+    cached = dict(cache.extra)
+
+    tokenizer.inputs.clear()
+    assert cache.get(span).tolist() == tokenizer.encode(span["content"])
+    assert not tokenizer.inputs  # Joined from the members' ids
+    assert dict(cache.extra) == cached  # Spans are not cached
+
+
+def test_adjacent_span_ids_equal_direct_tokenization(tokenizer):
+    windows = [make_window(0, 0, 100), make_window(1, 100, 100)]
+    cache = ChunkTokenCache(tokenizer, "fake")
+    warm(cache, tokenizer, windows)
+    [span] = ContextConsolidator().consolidate(windows)
+
+    # Byte-level BPE chunks start without a word marker, so those spans
+    # are tokenized instead
+    assert cache.get(span).tolist() == tokenizer.encode(span["content"])
+
+
+def test_text_overlap_span_ids_equal_direct_tokenization(tokenizer):
+    windows = [
+        make_window(0, 0, 60, positions=False),
+        make_window(1, 40, 50, positions=False),
+    ]
+    cache = ChunkTokenCache(tokenizer, "fake")
+    warm(cache, tokenizer, windows)
+    [span] = ContextConsolidator().consolidate(windows[::-1])
+
+    tokenizer.inputs.clear()
+    assert cache.get(span).tolist() == tokenizer.encode(span["content"])
+    assert not tokenizer.inputs
+
+
+def test_span_with_uncached_member_is_tokenized(tokenizer):
+    windows = [make_window(0, 0, 100), make_window(1, 50, 100)]
+    [span] = ContextConsolidator().consolidate(windows)
+    cache = ChunkTokenCache(tokenizer, "fake")
+
+    assert cache.get(span).tolist() == tokenizer.encode(span["content"])
+    assert tokenizer.inputs[-1] == span["content"]
+
+
+def test_from_word_drops_leading_words(tokenizer):
+    chunk = make_window(0, 0, 100)
+    cache = ChunkTokenCache(tokenizer, "fake")
+    warm(cache, tokenizer, [chunk])
+    ids = cache.get(chunk)
+
+    assert cache.from_word(chunk, ids, 0) is ids
+    tail = cache.from_word(chunk, ids, 40).tolist()
+    assert tokenizer.decode(tail) == " ".join(WORDS[40:100])